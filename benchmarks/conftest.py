@@ -0,0 +1,39 @@
+import pytest
+from md2notionpage import core, ratelimit
+from md2notionpage.core import set_parse_cache_size
+from md2notionpage.mock_server import MockNotionServer
+from corpora import corpora
+
+
+@pytest.fixture(scope="session", params=sorted(corpora))
+def corpus(request):
+    """
+    The name and Markdown text of each synthetic corpus.
+    """
+    return request.param, corpora[request.param]()
+
+@pytest.fixture
+def uncached():
+    """
+    Measure parsing without the memoized parse results, which would turn repeated rounds into cache hits.
+    """
+    set_parse_cache_size(0)
+    yield
+    set_parse_cache_size()
+
+@pytest.fixture
+def mock_notion(monkeypatch, request):
+    """
+    A MockNotionServer installed as the Notion client, with the latency and 429 share of the test's
+    mock_options marker. The process-wide rate limiter is turned off, so that the benchmark measures
+    the client and not the configured rate.
+    """
+    marker = request.node.get_closest_marker("mock_options")
+    server = MockNotionServer(**(marker.kwargs if marker else {})).start()
+    monkeypatch.setattr(core, "notion", server.client())
+    monkeypatch.setattr(ratelimit, "rate_limiter", None)
+    yield server
+    server.stop()
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "mock_options(**kwargs): MockNotionServer arguments of the mock_notion fixture")
@@ -0,0 +1,91 @@
+"""
+Synthetic Markdown corpora for the benchmarks. Every corpus is generated from a fixed seed,
+so that the same size gives the same document on every run.
+"""
+
+import random
+
+words = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+markup = ["**bold**", "*italic*", "`code`", "~struck~", "[link](https://example.com)", "$x^2$", "__under__"]
+
+def sentence(rng, length=12):
+    return " ".join(rng.choice(markup) if rng.random() < 0.15 else rng.choice(words) for _ in range(length))
+
+def long_paragraphs(count=50, length=1500, seed=0):
+    """
+    Paragraphs of about length words, each several times Notion's 2000 character limit.
+    """
+    rng = random.Random(seed)
+    return "\n\n".join(sentence(rng, length) for _ in range(count))
+
+def deep_lists(count=50, depth=12, width=2, seed=0):
+    """
+    Lists nested depth levels deep with width items per level, deeper than Notion accepts in one request.
+    """
+    rng = random.Random(seed)
+    lines = []
+
+    def add(level):
+        for _ in range(width):
+            lines.append(" " * level + "- " + sentence(rng, 6))
+            if level + 1 < depth and rng.random() < 0.6:
+                add(level + 1)
+
+    for _ in range(count):
+        add(0)
+        lines.append("")
+    return "\n".join(lines)
+
+def huge_tables(count=2, rows=2000, columns=5, seed=0):
+    """
+    Tables of rows rows each.
+    """
+    rng = random.Random(seed)
+    tables = []
+    for _ in range(count):
+        header = "| " + " | ".join(f"Column {i}" for i in range(columns)) + " |"
+        delimiter = "|" + "---|" * columns
+        body = ["| " + " | ".join(rng.choice(words) for _ in range(columns)) + " |" for _ in range(rows)]
+        tables.append("\n".join([header, delimiter] + body))
+    return "\n\n\n".join(tables)
+
+def many_code_fences(count=2000, lines=8, seed=0):
+    """
+    Many short fenced code blocks between paragraphs.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for i in range(count):
+        code = "\n".join(f"x_{i}_{j} = {rng.randint(0, 1000)}  # {rng.choice(words)}" for j in range(lines))
+        parts.append(f"Step {i}: {sentence(rng, 8)}\n\n```python\n{code}\n```")
+    return "\n\n".join(parts)
+
+def pathological_inline(count=2000, seed=0):
+    """
+    Lines full of unbalanced and overlapping inline markers.
+    """
+    rng = random.Random(seed)
+    tokens = ["*", "_", "**", "__", "`", "$", "~", "[", "](", ")", "*a_", "_b*", "**c__"] + words
+    return "\n\n".join(" ".join(rng.choice(tokens) for _ in range(60)) for _ in range(count))
+
+def mixed_document(sections=200, seed=0):
+    """
+    A document mixing every kind of block, like a generated handbook.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for i in range(sections):
+        parts.append(f"## Section {i}\n\n{sentence(rng, 40)}\n\n> {sentence(rng, 10)}")
+        parts.append("\n".join(f"- {sentence(rng, 6)}\n - {sentence(rng, 4)}" for _ in range(3)))
+        parts.append(f"```sql\nSELECT * FROM table_{i} WHERE id = {i};\n```")
+        parts.append("| a | b |\n|---|---|\n| 1 | 2 |\n")
+    return "\n\n".join(parts)
+
+corpora = {
+    "long_paragraphs": long_paragraphs,
+    "deep_lists": deep_lists,
+    "huge_tables": huge_tables,
+    "many_code_fences": many_code_fences,
+    "pathological_inline": pathological_inline,
+    "mixed_document": mixed_document,
+}
@@ -0,0 +1,22 @@
+from md2notionpage.core import parse_md, process_inline_formatting
+from corpora import pathological_inline, long_paragraphs
+
+
+def test_parse_md(benchmark, corpus, uncached):
+    name, markdown = corpus
+    benchmark.extra_info["corpus"] = name
+    benchmark.extra_info["characters"] = len(markdown)
+    blocks = benchmark(parse_md, markdown, compact=True)
+    assert blocks
+
+def test_parse_md_json(benchmark, uncached):
+    markdown = long_paragraphs(count=20)
+    benchmark(parse_md, markdown)
+
+def test_process_inline_formatting_pathological(benchmark, uncached):
+    lines = pathological_inline(count=500).split("\n\n")
+    benchmark(lambda: [process_inline_formatting(line) for line in lines])
+
+def test_process_inline_formatting_cached(benchmark):
+    lines = pathological_inline(count=500).split("\n\n")
+    benchmark(lambda: [process_inline_formatting(line) for line in lines])
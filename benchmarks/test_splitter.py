@@ -0,0 +1,15 @@
+from md2notionpage.core import parse_md, split_rich_text, iter_split_blocks, iter_upload_batches
+from corpora import long_paragraphs
+
+
+def test_split_rich_text(benchmark):
+    rich_texts = [block["paragraph"]["rich_text"] for block in parse_md(long_paragraphs(), compact=True)]
+    chunks = benchmark(lambda: [split_rich_text(rich_text) for rich_text in rich_texts])
+    assert all(len(rich_text) > 1 for rich_text in chunks)
+
+def test_split_and_batch(benchmark, corpus):
+    name, markdown = corpus
+    benchmark.extra_info["corpus"] = name
+    blocks = parse_md(markdown, compact=True)
+    batches = benchmark(lambda: list(iter_upload_batches(iter_split_blocks(blocks))))
+    assert batches
@@ -0,0 +1,29 @@
+import pytest
+from md2notionpage import md2notionpage
+from corpora import mixed_document, deep_lists
+
+
+def upload(benchmark, server, markdown, **kwargs):
+    url = benchmark.pedantic(md2notionpage, args=(markdown, "Benchmark", "parent-page-id"), kwargs=kwargs, rounds=3)
+    benchmark.extra_info["requests"] = server.request_count
+    benchmark.extra_info["rate_limited"] = server.rate_limited_count
+    assert url.startswith(server.base_url)
+
+def test_upload(benchmark, mock_notion):
+    upload(benchmark, mock_notion, mixed_document())
+
+@pytest.mark.mock_options(latency=0.02)
+def test_upload_with_latency(benchmark, mock_notion):
+    upload(benchmark, mock_notion, mixed_document())
+
+@pytest.mark.mock_options(latency=0.02)
+def test_upload_with_latency_pipelined(benchmark, mock_notion):
+    upload(benchmark, mock_notion, mixed_document(), pipeline=True)
+
+@pytest.mark.mock_options(rate_limited=0.05, seed=1)
+def test_upload_with_rate_limiting(benchmark, mock_notion):
+    upload(benchmark, mock_notion, mixed_document())
+
+@pytest.mark.mock_options(latency=0.02)
+def test_upload_deep_lists(benchmark, mock_notion):
+    upload(benchmark, mock_notion, deep_lists(count=20), nested_workers=4)
@@ -1 +1,3 @@
 from .core import create_notion_page_from_md as md2notionpage
+from .async_core import create_notion_page_from_md_async as md2notionpage_async
+from .sync import sync_notion_page_from_md
@@ -0,0 +1,144 @@
+"""
+async_core.py
+
+This module provides an asyncio counterpart of create_notion_page_from_md built on notion_client.AsyncClient,
+so that many pages can be published concurrently from one event loop. Parsing, splitting and batching are
+shared with the synchronous functions in core.py.
+
+Functions:
+    - create_notion_page_from_md_async(markdown_text, title, parent_page_id, cover_url, ...): Create a Notion page from Markdown text.
+    - create_notion_pages_from_md_async(pages, concurrency): Create several Notion pages concurrently.
+
+Environment Variables:
+    - NOTION_SECRET: Authentication token for the Notion API.
+
+Example Usage:
+    import asyncio
+    from md2notionpage import md2notionpage_async
+    notion_page_url = asyncio.run(md2notionpage_async("# My Page", "My Notion Page", "YOUR_PARENT_PAGE_ID"))
+"""
+
+import asyncio
+import contextlib
+import pprint
+from notion_client import AsyncClient
+from .core import parse_md, iter_split_blocks, iter_upload_batches, deferred_children_jobs, page_request_arguments, client_options, to_notion_blocks
+from .ratelimit import send_async
+from . import metrics
+
+# A client used by every call instead of one of its own, e.g. a stand-in in tests. The connections of an AsyncClient
+# belong to the event loop that opened them, so by default each call opens a client and closes it when it is done.
+async_notion = None
+
+async def open_client(stack, client=None):
+    """
+    Return client if given, else async_notion if set, else a new AsyncClient that is closed along with stack.
+    """
+    if client is not None:
+        return client
+    if async_notion is not None:
+        return async_notion
+    return await stack.enter_async_context(AsyncClient(**client_options()))
+
+def prepare_batches(markdown_text, table_mode='latex'):
+    """
+    Parse Markdown text into batches of (block, deferred children) pairs, ready to be appended to a page.
+    """
+    return list(iter_upload_batches(iter_split_blocks(parse_md(markdown_text, compact=True, table_mode=table_mode)), plain_first_batch=True))
+
+async def limited(semaphore, request, *args, **kwargs):
+    """
+    Await an AsyncClient method through the process-wide rate limiter, holding the semaphore while it runs if one is given.
+    """
+    if semaphore is None:
+        return await send_async(request, *args, **kwargs)
+    async with semaphore:
+        return await send_async(request, *args, **kwargs)
+
+async def append_children(client, semaphore, parent_id, blocks):
+    """
+    Append blocks to a parent block, returning (parent block ID, blocks) jobs for the children deferred further.
+    """
+    jobs = []
+    for batch in iter_upload_batches(blocks):
+        response = await limited(semaphore, client.blocks.children.append, parent_id, children=to_notion_blocks(block for block, _ in batch))
+        jobs.extend(deferred_children_jobs(batch, response))
+    return jobs
+
+async def append_deferred_children(client, semaphore, jobs):
+    """
+    Append deferred children, the children of different parents concurrently, and those of a block
+    as soon as it is created, see md2notionpage.core.append_deferred_children.
+    """
+    async def append_subtree(parent_id, blocks):
+        await append_deferred_children(client, semaphore, await append_children(client, semaphore, parent_id, blocks))
+
+    await asyncio.gather(*(append_subtree(parent_id, blocks) for parent_id, blocks in jobs))
+
+async def create_notion_page_from_md_async(markdown_text, title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', print_page_info=False, semaphore=None, table_mode='latex', client=None):
+    """
+    Create a Notion page from Markdown text without blocking the event loop.
+
+    Parsing runs in the default executor and every API request is awaited on an AsyncClient.
+    The arguments are those of create_notion_page_from_md, plus:
+
+    :param semaphore: (Optional) A semaphore limiting the number of API requests in flight, typically shared by
+        all pages published concurrently. Defaults to None, meaning no limit.
+    :type semaphore: asyncio.Semaphore
+    :param client: (Optional) The AsyncClient to send the requests with, opened in the running event loop.
+        Defaults to a client opened for this call and closed when it returns.
+    :type client: notion_client.AsyncClient
+    :return: The URL of the created Notion page.
+    :rtype: str
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        client = await open_client(stack, client)
+
+        # Fail on invalid arguments before parsing
+        page_request_arguments(title, parent_page_id, cover_url, parent_type, properties, title_property_name)
+
+        document_id = metrics.new_document_id()
+        loop = asyncio.get_running_loop()
+        with metrics.timed("parse", title, document_id):
+            batches = await loop.run_in_executor(None, prepare_batches, markdown_text, table_mode)
+
+        with metrics.timed("upload", title, document_id):
+            # The first batch is sent along with the page itself
+            create_arguments = page_request_arguments(title, parent_page_id, cover_url, parent_type, properties, title_property_name,
+                                                      children=to_notion_blocks(block for block, _ in batches[0]) if batches else [])
+            with metrics.timed("create_page", title, document_id):
+                created_page = await limited(semaphore, client.pages.create, **create_arguments)
+
+            # Batches of one page are appended in order
+            for batch in batches[1:]:
+                with metrics.timed("append", title, document_id):
+                    response = await limited(semaphore, client.blocks.children.append, created_page["id"], children=to_notion_blocks(block for block, _ in batch))
+                    await append_deferred_children(client, semaphore, deferred_children_jobs(batch, response))
+
+    if print_page_info:
+        pprint.pprint(created_page)
+
+    return created_page["url"]
+
+async def create_notion_pages_from_md_async(pages, concurrency=10, return_exceptions=False):
+    """
+    Create several Notion pages concurrently.
+
+    :param pages: The pages to create, each a dict of keyword arguments of create_notion_page_from_md_async.
+    :type pages: iterable
+    :param concurrency: (Optional) Maximum number of API requests in flight across all pages. Defaults to 10.
+    :type concurrency: int
+    :param return_exceptions: (Optional) Return the exception of a failed page in place of its URL instead of
+        raising it. Defaults to False.
+    :type return_exceptions: bool
+    :return: The URLs of the created pages, in the order of pages.
+    :rtype: list
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    async with contextlib.AsyncExitStack() as stack:
+        # One client, and one connection pool, shared by all pages
+        client = await open_client(stack)
+        return await asyncio.gather(
+            *(create_notion_page_from_md_async(semaphore=semaphore, client=client, **page) for page in pages),
+            return_exceptions=return_exceptions
+        )
@@ -0,0 +1,118 @@
+"""
+cache.py
+
+This module provides an on-disk publish cache, so that documents that have not changed since they were last
+published are skipped without parsing them or sending any API requests. The cache is a JSON manifest mapping
+a hash of the Markdown source and of the page arguments (title, parent, cover, ...) to the ID and URL of the
+page created from them.
+
+Classes:
+    - PublishCache(path): A JSON manifest of published pages, safe to share between threads.
+
+Functions:
+    - publish_key(markdown_text, title, parent_page_id, cover_url, ...): Return the cache key of a document.
+
+Example Usage:
+    from md2notionpage import md2notionpage
+    from md2notionpage.cache import PublishCache
+    cache = PublishCache(".md2notionpage-cache.json")
+    notion_page_url = md2notionpage(markdown_text, title, parent_page_id, cache=cache)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from .images import local_image_hashes
+
+def publish_key(markdown_text, title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', table_mode='latex', image_dir=None):
+    """
+    Return the cache key of a document: a SHA-256 hash of its Markdown text and of every argument that affects the created page,
+    see create_notion_page_from_md for the arguments. Leading and trailing whitespace, which parse_md strips, is ignored.
+    When image_dir is given, the content of the local images the text refers to is hashed too, so that a
+    document whose image changed is published again.
+
+    :return: A hexadecimal digest.
+    :rtype: str
+    """
+    arguments = [title, parent_page_id, cover_url, parent_type, properties, title_property_name, table_mode]
+    if image_dir is not None:
+        arguments.append(local_image_hashes(markdown_text, image_dir))
+    arguments = json.dumps(arguments, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256()
+    digest.update(arguments.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(markdown_text.strip().encode("utf-8"))
+    return digest.hexdigest()
+
+class PublishCache:
+    """
+    A JSON manifest of published pages keyed by publish_key.
+
+    The manifest is read when the cache is created and written again, atomically, after every new entry,
+    so that an interrupted run keeps the pages it has already published. It also keeps the state of
+    sync_notion_page_from_md between syncs, in synced.
+
+    :param path: The path of the manifest file. It is created on the first put if it does not exist.
+    :type path: str
+    """
+
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.synced = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest.get("version") != self.version:
+                raise ValueError(f"Unsupported publish cache version in {path}: {manifest.get('version')!r}")
+            self.pages = manifest.get("pages", {})
+            self.synced = manifest.get("synced", {})
+
+    def get(self, key):
+        """
+        Return the entry of a published document, a dict with "page_id" and "url", or None.
+        """
+        with self.lock:
+            return self.pages.get(key)
+
+    def put(self, key, page):
+        """
+        Record the page created for a document and write the manifest.
+
+        :param key: The publish_key of the document.
+        :type key: str
+        :param page: The created Notion page object.
+        :type page: dict
+        """
+        with self.lock:
+            self.pages[key] = {"page_id": page["id"], "url": page["url"], "published": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+            self.save()
+
+    def put_synced(self, state):
+        """
+        Record the state of a sync (see sync_notion_page_from_md) and write the manifest.
+
+        :param state: The state, a copy of synced updated by the sync.
+        :type state: dict
+        """
+        with self.lock:
+            self.synced = state
+            self.save()
+
+    def save(self):
+        # Write to a temporary file first so that the manifest is never left half written
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".md2notionpage-cache-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump({"version": self.version, "pages": self.pages, "synced": self.synced}, file, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
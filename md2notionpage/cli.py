@@ -1,15 +1,265 @@
 
 import argparse
+import atexit
+import glob
 import os
 import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 load_dotenv()
 
 from notion_client.errors import APIResponseError
 from .core import create_notion_page_from_md as md2notionpage
+from .core import create_notion_page_from_blocks, get_client, parse_md
+from .ratelimit import set_rate_limit
+from .cache import PublishCache, publish_key
+from .sync import sync_notion_page_from_md
+from .metrics import MetricsCollector, add_hooks
+from .spool import SpoolWriter, replay_spool
+
+def parse_markdown_file(path, table_mode='latex'):
+    """
+    Read and parse a Markdown file into Notion blocks. Runs in a worker process of publish-dir.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        return parse_md(file.read(), compact=True, table_mode=table_mode)
+
+def record_metrics(path):
+    """
+    Collect metrics of the run and write them to path when the program exits, in the Prometheus text format
+    if path ends with .prom and as a JSON summary otherwise.
+    """
+    collector = MetricsCollector()
+    add_hooks(collector)
+
+    def write_metrics():
+        if path.endswith('.prom'):
+            collector.write_prometheus(path)
+        else:
+            collector.write_json(path)
+        print(f'Metrics written to {path}')
+
+    # Also written when the run fails
+    atexit.register(write_metrics)
+    return collector
+
+def publish_dir(argv):
+    parser = argparse.ArgumentParser(prog='md2notionpage publish-dir', description='Convert every Markdown file in a directory tree to a Notion page.')
+    parser.add_argument('directory', type=str, help='Directory to search for Markdown files.')
+    parser.add_argument('--parent', type=str, help='ID of the parent Notion page or database. If not provided, uses NOTION_PARENT_PAGE_ID env var.')
+    parser.add_argument('--pattern', type=str, default='**/*.md', help='Glob pattern of the files to publish, relative to the directory. Defaults to "**/*.md".')
+    parser.add_argument('--workers', type=int, default=4, help='Number of pages uploaded concurrently. Defaults to 4.')
+    parser.add_argument('--parse_workers', type=int, default=None, help='Number of processes parsing files. Defaults to the number of CPUs.')
+    parser.add_argument('--title_property_name', type=str, default='Name', help='The name of the title property in the database (used with --parent_type database). Defaults to "Name". (optional).')
+    parser.add_argument('--cover_url', type=str, default='', help='Cover URL for every Notion page (optional).')
+    parser.add_argument('--parent_type', type=str.lower, choices=['page', 'database'], default='page', help='"page" or "database"')
+    parser.add_argument('--rate_limit', type=float, default=3.0, help='Average Notion API requests per second across all workers. Defaults to 3.')
+    parser.add_argument('--cache', type=str, help='Publish cache file. Files published before with the same content and arguments are skipped (optional).')
+    parser.add_argument('--metrics', type=str, metavar='PATH', help='Write per-stage durations, request latencies, bytes, block counts, retries and 429s to PATH: in the Prometheus text format if it ends with .prom, as JSON otherwise (optional).')
+    parser.add_argument('--table_mode', type=str.lower, choices=['latex', 'native'], default='latex', help='Show tables as LaTeX equations ("latex") or as Notion tables ("native"). Defaults to "latex".')
+    parser.add_argument('--spool', type=str, metavar='PATH', help='Write the requests to the newline-delimited JSON file PATH instead of sending them, to send them later with "md2notionpage replay PATH" (optional).')
+
+    args = parser.parse_args(argv)
+    if args.spool and args.cache:
+        parser.error('--spool cannot be combined with --cache')
+    set_rate_limit(args.rate_limit)
+    if args.metrics:
+        record_metrics(args.metrics)
+
+    parent_page_id = args.parent or os.getenv("NOTION_PARENT_PAGE_ID")
+    if not parent_page_id:
+        print("❌ Error: Parent Page ID not provided and NOTION_PARENT_PAGE_ID not set.")
+        print("\n💡 Hint: Set NOTION_PARENT_PAGE_ID in your .env file or pass it with --parent.")
+        sys.exit(1)
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory {args.directory} not found.")
+        sys.exit(1)
+
+    paths = sorted(path for path in glob.glob(os.path.join(args.directory, args.pattern), recursive=True) if os.path.isfile(path))
+    if not paths:
+        print(f"No files matching {args.pattern} in {args.directory}.")
+        return
+
+    # One client shared by all upload threads
+    get_client()
+
+    cache = PublishCache(args.cache) if args.cache else None
+    # One spool file shared by all upload threads, each page written as a whole
+    spool = SpoolWriter(args.spool) if args.spool else None
+    cache_keys = {}
+    created = []
+    unchanged = []
+    failed = []
+
+    def title_of(path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def upload(path, blocks):
+        return create_notion_page_from_blocks(blocks, title_of(path), parent_page_id, cover_url=args.cover_url, parent_type=args.parent_type,
+                                              title_property_name=args.title_property_name, cache=cache, cache_key=cache_keys.get(path),
+                                              image_dir=os.path.dirname(os.path.abspath(path)), spool=spool, document_id=path)
+
+    if cache is not None:
+        # Unchanged files are neither parsed nor uploaded
+        changed = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as file:
+                markdown_text = file.read()
+            cache_keys[path] = publish_key(markdown_text, title_of(path), parent_page_id, args.cover_url, args.parent_type,
+                                           None, args.title_property_name, args.table_mode, os.path.dirname(os.path.abspath(path)))
+            cached_page = cache.get(cache_keys[path])
+            if cached_page is None:
+                changed.append(path)
+            else:
+                unchanged.append(path)
+                print(f'Notion page unchanged: {path} -> {cached_page["url"]}')
+        paths = changed
+
+    def report(path, future):
+        try:
+            url = future.result()
+        except Exception as e:
+            failed.append((path, e))
+            resume_token = getattr(e, 'resume_token', None)
+            print(f'❌ {path}: {e}' + (f' (resume token: {resume_token})' if resume_token else ''))
+        else:
+            created.append((path, url))
+            if spool is not None:
+                print(f'Notion requests written: {path} -> {url}')
+            else:
+                print(f'Notion page created: {path} -> {url}')
+
+    # Files are parsed in worker processes and each parsed file is uploaded as soon as it is ready. A new file is
+    # only parsed when another one is done, so that parsing cannot run ahead of uploading and hold every parsed
+    # file in memory: at most one file per parse process and upload thread is in flight.
+    parse_workers = args.parse_workers or os.cpu_count() or 1
+    remaining = iter(paths)
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, ThreadPoolExecutor(max_workers=args.workers) as upload_pool:
+        in_flight = {}
+
+        def parse_next():
+            path = next(remaining, None)
+            if path is not None:
+                in_flight[parse_pool.submit(parse_markdown_file, path, args.table_mode)] = (path, True)
+
+        for _ in range(parse_workers + args.workers):
+            parse_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, parsing = in_flight.pop(future)
+                if not parsing:
+                    report(path, future)
+                    parse_next()
+                    continue
+                try:
+                    in_flight[upload_pool.submit(upload, path, future.result())] = (path, False)
+                except Exception as e:
+                    failed.append((path, e))
+                    print(f'❌ {path}: {e}')
+                    parse_next()
+
+    if spool is not None:
+        spool.close()
+        print(f'\n{len(created)} page(s) written to {args.spool}, {len(failed)} failed.')
+    elif cache is not None:
+        print(f'\n{len(created)} page(s) created, {len(unchanged)} unchanged, {len(failed)} failed.')
+    else:
+        print(f'\n{len(created)} page(s) created, {len(failed)} failed.')
+    for path, e in sorted(failed, key=lambda failure: failure[0]):
+        print(f'  {path}: {e}')
+
+    if failed:
+        sys.exit(1)
+
+def print_resume_hint(error):
+    resume_token = getattr(error, 'resume_token', None)
+    if resume_token:
+        print("\n💡 The blocks uploaded so far are kept. To continue the upload on the same page, run the same command with:")
+        print(f"   --resume {resume_token}")
+
+def replay(argv):
+    parser = argparse.ArgumentParser(prog='md2notionpage replay', description='Send the requests written with --spool, creating the pages they describe.')
+    parser.add_argument('spool_file', type=str, help='Spool file written with --spool.')
+    parser.add_argument('--workers', type=int, default=4, help='Number of pages uploaded concurrently. Defaults to 4.')
+    parser.add_argument('--rate_limit', type=float, default=3.0, help='Average Notion API requests per second across all workers. Defaults to 3.')
+    parser.add_argument('--image_dir', type=str, help='Directory to resolve local image paths against, instead of the directory of each Markdown file when it was spooled (optional).')
+    parser.add_argument('--metrics', type=str, metavar='PATH', help='Write per-stage durations, request latencies, bytes, block counts, retries and 429s to PATH: in the Prometheus text format if it ends with .prom, as JSON otherwise (optional).')
+    parser.add_argument('--progress', type=str, metavar='PATH', help='Record the requests sent in PATH, and skip those an earlier replay with the same PATH already sent, so that a failed replay resumes where it stopped (optional).')
+
+    args = parser.parse_args(argv)
+    set_rate_limit(args.rate_limit)
+    if args.metrics:
+        record_metrics(args.metrics)
+
+    if not os.path.exists(args.spool_file):
+        print(f"Error: File {args.spool_file} not found.")
+        sys.exit(1)
+
+    try:
+        pages = replay_spool(args.spool_file, workers=args.workers, image_dir=args.image_dir, return_exceptions=True, progress=args.progress)
+    except ValueError as e:
+        print(f'❌ {args.spool_file}: {e}')
+        sys.exit(1)
+
+    failed = [(title, result) for title, result in pages if isinstance(result, Exception)]
+    for title, result in pages:
+        if isinstance(result, Exception):
+            print(f'❌ {title}: {result}')
+        else:
+            print(f'Notion page created: {title} -> {result}')
+    print(f'\n{len(pages) - len(failed)} page(s) created, {len(failed)} failed.')
+
+    if failed:
+        if args.progress:
+            print(f"\n💡 To send the remaining requests, run the same command again with --progress {args.progress}")
+        else:
+            print("\n💡 Pass --progress <file> to replay again without creating the finished pages twice.")
+        sys.exit(1)
+
+def serve(argv):
+    parser = argparse.ArgumentParser(prog='md2notionpage serve', description='Run a local stand-in for the Notion API. Point md2notionpage at it with NOTION_BASE_URL.')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on. Defaults to 127.0.0.1.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on. Defaults to 8765.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds every response is delayed by. Defaults to 0.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many seconds are added to the latency at random. Defaults to 0.')
+    parser.add_argument('--rate_limit', type=float, default=None, help='Requests per second accepted before answering 429 rate_limited, like Notion\'s limit of 3. Defaults to no limit.')
+    parser.add_argument('--rate_limited', type=float, default=0.0, help='Share of the requests answered with 429 rate_limited at random, from 0 to 1. Defaults to 0.')
+    parser.add_argument('--failures', type=float, default=0.0, help='Share of the requests failed at random, from 0 to 1. Defaults to 0.')
+    parser.add_argument('--failure_status', type=int, default=503, choices=[409, 500, 502, 503, 504], help='HTTP status of the failed requests. Defaults to 503.')
+    parser.add_argument('--database', action='store_true', help='Create a database with a "Name" title property and print its ID.')
+
+    args = parser.parse_args(argv)
+    from .mock_server import MockNotionServer
+    server = MockNotionServer(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit, rate_limited=args.rate_limited,
+                              failures=args.failures, failure_status=args.failure_status, record=False, host=args.host, port=args.port)
+    print(f'Serving a Notion API stand-in on {server.base_url}')
+    print(f'   NOTION_BASE_URL={server.base_url} md2notionpage FILE.md any-page-id')
+    if args.database:
+        print(f'Database ID: {server.add_database()}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    stats = server.stats()
+    print(f"\n{stats['requests']} request(s): {stats['rate_limited']} rate limited, {stats['failed']} failed, "
+          f"{stats['rejected']} rejected; {stats['blocks']} block(s) created.")
 
 def main():
-    parser = argparse.ArgumentParser(description='Convert a Markdown file to a Notion page.')
+    if len(sys.argv) > 1 and sys.argv[1] == 'publish-dir':
+        publish_dir(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'replay':
+        replay(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description='Convert a Markdown file to a Notion page. Use "md2notionpage publish-dir DIR" to convert a directory of files, "md2notionpage replay FILE" to send requests written with --spool, or "md2notionpage serve" to run a local Notion API stand-in.')
     parser.add_argument('markdown_file', type=str, help='Path to the Markdown file to convert.')
     parser.add_argument('parent_page_id', nargs='?', help='ID of the parent Notion page. If not provided, uses NOTION_PARENT_PAGE_ID env var.')
     parser.add_argument('--title', type=str, help='Title for the Notion page (optional).')
@@ -17,12 +267,26 @@ def main():
     parser.add_argument('--cover_url', type=str, default='', help='Cover URL for the Notion page (optional).')
     parser.add_argument('--parent_type', type=str.lower, choices=['page', 'database'], default='page', help='"page" or "database"')
     parser.add_argument('--print_page_info', action='store_true', help='Print info about the newly created page')
+    parser.add_argument('--pipeline', action='store_true', help='Parse the file in a background thread while blocks are being uploaded (optional).')
+    parser.add_argument('--rate_limit', type=float, default=3.0, help='Average Notion API requests per second. Defaults to 3.')
+    parser.add_argument('--resume', type=str, help='Resume token printed by an interrupted upload of the same file, to continue it on the same page (optional).')
+    parser.add_argument('--cache', type=str, help='Publish cache file. If the file was published before with the same content and arguments, nothing is uploaded. With --sync, nested blocks whose children did not change since the last sync are not listed again (optional).')
+    parser.add_argument('--parse_workers', type=int, help='Parse the file in this many processes, for very large files (optional).')
+    parser.add_argument('--sync', type=str, metavar='PAGE_ID', help='Update the existing page PAGE_ID to match the file, patching only the blocks that changed, instead of creating a page (optional).')
+    parser.add_argument('--metrics', type=str, metavar='PATH', help='Write per-stage durations, request latencies, bytes, block counts, retries and 429s to PATH: in the Prometheus text format if it ends with .prom, as JSON otherwise (optional).')
+    parser.add_argument('--table_mode', type=str.lower, choices=['latex', 'native'], default='latex', help='Show tables as LaTeX equations ("latex") or as Notion tables ("native"). Defaults to "latex".')
+    parser.add_argument('--spool', type=str, metavar='PATH', help='Write the requests to the newline-delimited JSON file PATH instead of sending them, to send them later with "md2notionpage replay PATH" (optional).')
 
     args = parser.parse_args()
+    if args.spool and (args.sync or args.resume or args.cache):
+        parser.error('--spool cannot be combined with --sync, --resume or --cache')
+    set_rate_limit(args.rate_limit)
+    if args.metrics:
+        record_metrics(args.metrics)
 
     # Determine Parent Page ID
     parent_page_id = args.parent_page_id or os.getenv("NOTION_PARENT_PAGE_ID")
-    if not parent_page_id:
+    if not parent_page_id and not args.sync:
         print("❌ Error: Parent Page ID not provided and NOTION_PARENT_PAGE_ID not set.")
         print("\n💡 Hint: Set NOTION_PARENT_PAGE_ID in your .env file or pass it as an argument.")
         print("\n⚠️  Don't forget: After setting up your integration, you must:")
@@ -37,15 +301,55 @@ def main():
             print(f"Error: File {args.markdown_file} not found.")
             sys.exit(1)
             
-        with open(args.markdown_file, 'r', encoding='utf-8') as file:
-            markdown_content = file.read()
-
         # If title is not given, take it from the file base name
         title = args.title if args.title else os.path.splitext(os.path.basename(args.markdown_file))[0]
+        # Images given by a path are uploaded, relative paths being relative to the file
+        image_dir = os.path.dirname(os.path.abspath(args.markdown_file))
 
-        # Create the Notion page
-        notion_page_url = md2notionpage(markdown_content, title, parent_page_id, cover_url=args.cover_url, parent_type=args.parent_type, 
-                                        print_page_info=args.print_page_info, title_property_name=args.title_property_name)
+        if args.sync:
+            # The cache remembers the children written to nested blocks, so that unchanged ones are not listed again
+            cache = PublishCache(args.cache) if args.cache else None
+            state = dict(cache.synced) if cache is not None else None
+            with open(args.markdown_file, 'r', encoding='utf-8') as file:
+                changes = sync_notion_page_from_md(file.read(), args.sync, table_mode=args.table_mode, state=state, image_dir=image_dir)
+            if cache is not None:
+                cache.put_synced(state)
+            print(f'Notion page synced: {changes["updated"]} updated, {changes["inserted"]} inserted, '
+                  f'{changes["deleted"]} deleted, {changes["unchanged"]} unchanged block(s).')
+            return
+
+        if args.spool:
+            # Parsed, split and batched as for an upload, but written to the spool file
+            with open(args.markdown_file, 'r', encoding='utf-8') as file:
+                markdown_text = file if not args.parse_workers else file.read()
+                with SpoolWriter(args.spool) as spool:
+                    md2notionpage(markdown_text, title, parent_page_id, cover_url=args.cover_url, parent_type=args.parent_type,
+                                  title_property_name=args.title_property_name, pipeline=args.pipeline, parse_workers=args.parse_workers,
+                                  table_mode=args.table_mode, image_dir=image_dir, spool=spool, document_id=args.markdown_file)
+            print(f'Notion requests written to {args.spool}. Send them with: md2notionpage replay {args.spool}')
+            return
+
+        cache = PublishCache(args.cache) if args.cache else None
+        if cache is not None or args.parse_workers:
+            # The whole text is needed for the cache key and for splitting it between processes
+            with open(args.markdown_file, 'r', encoding='utf-8') as file:
+                markdown_text = file.read()
+            if cache is not None:
+                cached_page = cache.get(publish_key(markdown_text, title, parent_page_id, args.cover_url, args.parent_type, None, args.title_property_name, args.table_mode, image_dir))
+                if cached_page is not None:
+                    print(f'Notion page unchanged: {cached_page["url"]}')
+                    return
+            notion_page_url = md2notionpage(markdown_text, title, parent_page_id, cover_url=args.cover_url, parent_type=args.parent_type,
+                                            print_page_info=args.print_page_info, title_property_name=args.title_property_name,
+                                            pipeline=args.pipeline, resume_token=args.resume, cache=cache, parse_workers=args.parse_workers,
+                                            table_mode=args.table_mode, image_dir=image_dir, document_id=args.markdown_file)
+        else:
+            # Create the Notion page, streaming the Markdown content from the file
+            with open(args.markdown_file, 'r', encoding='utf-8') as file:
+                notion_page_url = md2notionpage(file, title, parent_page_id, cover_url=args.cover_url, parent_type=args.parent_type, 
+                                                print_page_info=args.print_page_info, title_property_name=args.title_property_name,
+                                                pipeline=args.pipeline, resume_token=args.resume, table_mode=args.table_mode, image_dir=image_dir,
+                                                document_id=args.markdown_file)
         print(f'Notion page created: {notion_page_url}')
 
     except APIResponseError as e:
@@ -86,6 +390,11 @@ def main():
             print("2. Click '...' (more options) → 'Add connections'")
             print("3. Select your integration from the list")
         
+        elif error_code == 'rate_limited':
+            print(f"\n❌ Error: Rate limited")
+            print(f"\nNotion kept rejecting requests with 429 rate_limited after several retries.")
+            print("\n💡 Try again later or lower --rate_limit.")
+
         elif "Invalid page cover URL" in error_msg or "cover" in error_msg.lower():
             print(f"\n❌ Error: Invalid cover image URL")
             print(f"\nThe cover URL you provided is not valid or accessible.")
@@ -98,11 +407,13 @@ def main():
         
         else:
             print(f'\n❌ Notion API Error: {e}')
-        
+
+        print_resume_hint(e)
         sys.exit(1)
 
     except Exception as e:
         print(f'\nAn error occurred: {str(e)}')
+        print_resume_hint(e)
         sys.exit(1)
 
 if __name__ == '__main__':
@@ -5,9 +5,21 @@ This module provides functionality to convert Markdown text into Notion pages. I
 
 Functions:
     - create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url): Create a Notion page from Markdown text.
-    - parse_md(markdown_text): Parse Markdown text and convert it into Notion blocks.
+    - create_notion_page_from_blocks(blocks, title, parent_page_id, cover_url): Create a Notion page from parsed Notion blocks.
+    - parse_md(markdown_text, compact=False, table_mode="latex"): Parse Markdown text and convert it into Notion blocks.
+    - parse_md_parallel(markdown_text, workers): Parse a large Markdown text into the same Notion blocks on several cores.
     - parse_markdown_to_notion_blocks(markdown): Parse Markdown text and convert it into a list of Notion blocks.
-    - process_inline_formatting(text): Process inline formatting in Markdown text and convert it to Notion rich text formatting.
+    - iter_notion_blocks(fileobj_or_lines): Parse Markdown lazily from a file or lines, yielding Notion blocks as they complete.
+    - process_inline_formatting(text, legacy=False): Process inline formatting in Markdown text and convert it to Notion rich text formatting.
+    - convert_markdown_table_to_latex_chunks(text, max_len): Convert a Markdown table into LaTeX expressions of bounded length.
+    - convert_markdown_table_to_table_block(text): Convert a Markdown table into a native Notion table block.
+    - parse_cache_info(): Return the hit and miss counters of the memoized parse results.
+    - to_notion_blocks(blocks): Materialize compact blocks to Notion JSON.
+    - set_batch_limits(batch_size, max_bytes): Set the block count and byte size ceilings of upload requests.
+    - page_request_arguments(title, parent_page_id, ...): Build the keyword arguments of the pages.create request of a page.
+
+Classes:
+    - RichText: A rich text segment in compact form, sharing its annotations with other segments.
 
 Dependencies:
     - notion_client: Client library for interacting with the Notion API.
@@ -17,6 +29,7 @@ Dependencies:
 
 Environment Variables:
     - NOTION_SECRET: Authentication token for the Notion API.
+    - NOTION_BASE_URL: (Optional) Root URL of the API, for a local stand-in server.
 
 Example Usage:
     from md2notionpage import md2notionpage
@@ -26,16 +39,48 @@ Example Usage:
     notion_page_url = md2notionpage(markdown_text, title, parent_page_id)
 """
 
-import os, re, glob, base64, json, pprint
+import os, re, glob, base64, json, pprint, itertools, queue, threading, functools, collections
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from json.encoder import encode_basestring as encode_json_string
 from notion_client import Client
+from notion_client.client import ClientOptions
+from .ratelimit import send
+from .cache import publish_key
+from .images import resolve_local_images
+from . import metrics
 from os import environ
-from copy import deepcopy
 
 
 
 # Initialize the Notion client (lazy initialization)
 
 notion = None
+notion_lock = threading.Lock()
+
+def client_options():
+    """
+    Return the keyword arguments for creating a Notion client.
+
+    The client's own retries are turned off where the installed notion_client has them, so that
+    every attempt goes through the rate limiter in ratelimit.send.
+    """
+    options = {"auth": environ.get("NOTION_SECRET")}
+    if environ.get("NOTION_BASE_URL"):
+        # A stand-in server, see mock_server.py
+        options["base_url"] = environ["NOTION_BASE_URL"]
+    if "retry" in getattr(ClientOptions, "__dataclass_fields__", {}):
+        options["retry"] = False
+    return options
+
+def get_client():
+    """
+    Return the shared Notion client, creating it on first use. Safe to call from several threads.
+    """
+    global notion
+    with notion_lock:
+        if notion is None:
+            notion = Client(**client_options())
+    return notion
 
 def replace_part(parts, pattern, replace_function):
     # Process italic matches
@@ -54,10 +99,216 @@ def replace_part(parts, pattern, replace_function):
             new_text_parts.append(part)
     return new_text_parts
 
-def process_inline_formatting(text):
+# Inline markup passes in the priority order of the legacy implementation, each with the characters
+# that must occur in the text for the pass to match anything. A pass only scans the text left unmatched
+# by the passes before it, so that e.g. "2*3 and **b**" keeps its bold span.
+inline_passes = (
+    (re.compile(r'__\*(?P<bold_italic>.+?)\*__|\*\*_(?P<bold_italic_>.+?)_\*\*'), "*"),
+    (re.compile(r'\$(?P<katex>.+?)\$'), "$"),
+    (re.compile(r'\*\*(?P<bold>.+?)\*\*|__(?P<bold_>.+?)__'), "*_"),
+    (re.compile(r'\*(?P<italic>.+?)\*|_(?P<italic_>.+?)_'), "*_"),
+    (re.compile(r'\~(?P<overline>.+?)\~'), "~"),
+    (re.compile(r'`(?P<code>.+?)`'), "`"),
+    (re.compile(r'\[(?P<link_text>.+?)\]\((?P<link>.+?)\)'), "["),
+)
+
+# Compact rich text: parsed documents hold millions of rich text segments, so the parser builds
+# small slotted objects that share one interned Annotations tuple per combination of flags,
+# and the Notion JSON is only built for the batch being sent (see to_notion_blocks).
+class Annotations(collections.namedtuple("Annotations", "bold italic strikethrough code")):
+    """
+    Annotation flags of a text segment. Instances are interned by make_annotations, also when unpickled.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return make_annotations, tuple(self)
+
+annotation_flyweights = {}
+
+def make_annotations(bold=False, italic=False, strikethrough=False, code=False):
+    """
+    Return the shared Annotations tuple with the given flags.
+    """
+    key = (bold, italic, strikethrough, code)
+    annotations = annotation_flyweights.get(key)
+    if annotations is None:
+        annotations = annotation_flyweights.setdefault(key, Annotations(*key))
+    return annotations
+
+class RichText:
+    """
+    A rich text segment in compact form, materialized to a Notion rich text object with to_notion().
+
+    Segments are shared between blocks and parse results, so they are never modified once built.
+
+    :param type: "text" or "equation".
+    :type type: str
+    :param content: The text, or the expression of an equation.
+    :type content: str
+    :param annotations: (Optional) Annotations from make_annotations. None for a bare text object
+        without annotations. Defaults to None.
+    :type annotations: Annotations
+    :param url: (Optional) Link URL of a text segment. Defaults to None.
+    :type url: str
+    """
+
+    __slots__ = ("type", "content", "annotations", "url")
+
+    def __init__(self, type, content, annotations=None, url=None):
+        self.type = type
+        self.content = content
+        self.annotations = annotations
+        self.url = url
+
+    def __eq__(self, other):
+        if not isinstance(other, RichText):
+            return NotImplemented
+        return (self.type, self.content, self.annotations, self.url) == (other.type, other.content, other.annotations, other.url)
+
+    def __hash__(self):
+        return hash((self.type, self.content, self.annotations, self.url))
+
+    def __repr__(self):
+        return f"RichText({self.type!r}, {self.content!r}, {self.annotations!r}, {self.url!r})"
+
+    def __reduce__(self):
+        return RichText, (self.type, self.content, self.annotations, self.url)
+
+    def sliced(self, start, end):
+        """
+        Return a text segment holding content[start:end] with the same annotations and link.
+        """
+        return RichText(self.type, self.content[start:end], self.annotations, self.url)
+
+    def to_notion(self):
+        """
+        Return the Notion rich text object of this segment.
+        """
+        if self.type == "equation":
+            return {"type": "equation", "equation": {"expression": self.content}}
+        if self.annotations is None:
+            return {"type": "text", "text": {"content": self.content}}
+        return make_text_object(self.content, *self.annotations, url=self.url)
+
+plain_annotations = make_annotations()
+
+# Annotation flags set by each inline markup group
+inline_annotations = {
+    "bold_italic": make_annotations(bold=True, italic=True),
+    "bold_italic_": make_annotations(bold=True, italic=True),
+    "bold": make_annotations(bold=True),
+    "bold_": make_annotations(bold=True),
+    "italic": make_annotations(italic=True),
+    "italic_": make_annotations(italic=True),
+    "overline": make_annotations(strikethrough=True),
+    "code": make_annotations(code=True),
+}
+
+def make_text_object(content, bold=False, italic=False, strikethrough=False, code=False, url=None):
+    """
+    Build a fully annotated Notion rich text object of type text.
+    """
+    return {
+        "type": "text",
+        "text": {
+            "content": content,
+            "link": {"url": url} if url else None
+        },
+        "annotations": {
+            "bold": bold,
+            "italic": italic,
+            "strikethrough": strikethrough,
+            "underline": False,
+            "code": code,
+            "color": "default"
+        },
+        "plain_text": content,
+        "href": url
+    }
+
+def process_inline_formatting(text, legacy=False, compact=False):
     """
     Process inline formatting in Markdown text and convert it to Notion rich text formatting.
 
+    The result is identical to the legacy multi-pass implementation: the kinds of markup are matched
+    in the same priority order, each on the text left unmatched by the ones before. But the text is
+    scanned once from left to right (see scan_inline_formatting) instead of being split again by every
+    pass, a kind of markup whose characters do not occur in the text is skipped, and the segments are
+    built directly instead of by per-call closures.
+
+    Results are memoized by text (see parse_cache_info).
+
+    :param text: The Markdown text to be processed.
+    :type text: str
+    :param legacy: (Optional) Use the legacy multi-pass implementation. Defaults to False.
+    :type legacy: bool
+    :param compact: (Optional) Return shared RichText segments instead of new Notion rich text objects. Defaults to False.
+    :type compact: bool
+    :return: A list of Notion rich text objects representing the processed text.
+    :rtype: list
+    """
+    if legacy:
+        return process_inline_formatting_legacy(text)
+    if compact:
+        return list(inline_formatting_cache(text))
+    return [seg.to_notion() for seg in inline_formatting_cache(text)]
+
+def inline_match_segment(match):
+    """
+    Return the RichText segment of a match of one of the inline_passes.
+    """
+    group = match.lastgroup
+    if group == "katex":
+        return RichText("equation", match.group(group))
+    if group == "link":
+        return RichText("text", match.group("link_text"), plain_annotations, match.group(group))
+    return RichText("text", match.group(group), inline_annotations[group])
+
+def scan_inline_formatting(text):
+    """
+    Convert Markdown text to a tuple of RichText segments, see process_inline_formatting.
+
+    The text is scanned once from left to right. The legacy passes each match only in the text left
+    unmatched by the passes before it, so the next match of every pass is kept, searched for no further
+    than the next match of the pass before it: the deepest of these is the next segment, and only it
+    and the passes after it are searched again, from its end.
+    """
+    patterns = [pattern for pattern, markers in inline_passes if any(marker in text for marker in markers)]
+    matches = [None] * len(patterns)
+    segments = []
+    position = 0
+    # matches[:searched] are still the next matches of their passes
+    searched = 0
+    while True:
+        bound = len(text)
+        level = None
+        for index, pattern in enumerate(patterns):
+            if index >= searched:
+                matches[index] = pattern.search(text, position, bound)
+            if matches[index] is not None:
+                bound = matches[index].start()
+                level = index
+        if level is None:
+            break
+        match = matches[level]
+        if position != match.start():
+            segments.append(RichText("text", text[position:match.start()]))
+        segments.append(inline_match_segment(match))
+        position = match.end()
+        searched = level
+    if position != len(text):
+        segments.append(RichText("text", text[position:]))
+    return tuple(segments)
+
+def process_inline_formatting_legacy(text):
+    """
+    Process inline formatting in Markdown text and convert it to Notion rich text formatting.
+
+    This is the original multi-pass implementation: one regex pass per kind of markup, in priority order.
+    It is kept for differential testing of process_inline_formatting.
+
     :param text: The Markdown text to be processed.
     :type text: str
     :return: A list of Notion rich text objects representing the processed text.
@@ -223,82 +474,259 @@ def process_inline_formatting(text):
     # Remove empty strings from the list and return the processed text parts
     return [({"type": "text", "text": {"content": part}} if type(part) == str else part) for part in text_parts if part != '']
 
-# katex
-def convert_markdown_table_to_latex(text):
-    split_column = text.split('\n')
-    has_header = False
+# katex: Notion rejects equation expressions over 1000 characters, so long tables are cut into several equations
+max_equation_length = 1000
+# A delimiter row such as "|---|" or "| :--- |", which makes the row above it a header row
+table_header_delimiter_pattern = re.compile(r'\|\s*:?-+:?\s*\|')
+table_cell_pattern = re.compile(r'(?<=\|).*?(?=\|)')
+
+def convert_markdown_table_to_latex_chunks(text, max_len=max_equation_length):
+    """
+    Convert a Markdown table into LaTeX array expressions of at most max_len characters each.
+
+    The rows are cut into consecutive arrays, each repeating the header row if the table has one. A header
+    and a single row longer than max_len still make one array.
+
+    :param text: The lines of the Markdown table.
+    :type text: str
+    :param max_len: (Optional) Maximum length of an expression, or None for a single expression. Defaults to 1000.
+    :type max_len: int
+    :return: The expressions, in order.
+    :rtype: tuple
+    """
+    rows = text.split('\n')
     # Check if the second line is a delimiter
-    if re.match(r'\|\s*-+\s*\|', split_column[1]):
+    has_header = len(rows) > 1 and bool(table_header_delimiter_pattern.match(rows[1]))
+    if has_header:
         # Remove the delimiter line
-        split_column.pop(1)
-        has_header = True
-    table_content = ""
-    for i, row in enumerate(split_column):
-        modified_content = re.findall(r'(?<=\|).*?(?=\|)', row)
-        new_text = ""
-        for j, cell in enumerate(modified_content):
-            cell_text = f"\\textsf{{{cell.strip()}}}"
-            if i == 0 and has_header:
-                cell_text = f"\\textsf{{\\textbf{{{cell.strip()}}}}}"
-            if j == len(modified_content) - 1:
-                cell_text += " \\\\\\hline\n"
-            else:
-                cell_text += " & "
-            new_text += cell_text
-        table_content += new_text
+        rows.pop(1)
+
+    # Every row ends with a line, and the cells of a header row are bold
+    latex_rows = []
+    for i, row in enumerate(rows):
+        cell_format = "\\textsf{\\textbf{%s}}" if i == 0 and has_header else "\\textsf{%s}"
+        cells = [cell_format % cell.strip() for cell in table_cell_pattern.findall(row)]
+        latex_rows.append(" & ".join(cells) + " \\\\\\hline\n" if cells else "")
+
+    table_column = "|c" * len(rows[0].split('|'))
+    head = f"\\def\\arraystretch{{1.4}}\\begin{{array}}{{{table_column}|}}\\hline\n"
+    if has_header:
+        head += latex_rows.pop(0)
+    tail = "\\end{array}"
+    if max_len is None:
+        return (head + "".join(latex_rows) + tail,)
+
+    expressions = []
+    chunk = []
+    size = len(head) + len(tail)
+    for latex_row in latex_rows:
+        if chunk and size + len(latex_row) > max_len:
+            expressions.append(head + "".join(chunk) + tail)
+            chunk = []
+            size = len(head) + len(tail)
+        chunk.append(latex_row)
+        size += len(latex_row)
+    expressions.append(head + "".join(chunk) + tail)
+    return tuple(expressions)
 
-    count_column = len(split_column[0].split('|'))
+def convert_markdown_table_to_latex(text):
+    """
+    Convert a Markdown table into a single LaTeX array expression, however long.
+    """
+    return convert_markdown_table_to_latex_chunks(text, None)[0]
 
-    table_column = "|c" * count_column
-    add_table = f"\\def\\arraystretch{{1.4}}\\begin{{array}}{{{table_column}|}}\\hline\n{table_content}\\end{{array}}"
+def convert_markdown_table_to_table_block(text):
+    """
+    Convert a Markdown table into a native Notion table block with one table_row child per row.
 
-    return add_table
+    Cells are formatted with process_inline_formatting and kept as RichText segments. The table is as wide as
+    its widest row and shorter rows are padded with empty cells, as Notion requires every row to have table_width cells.
 
-def parse_markdown_to_notion_blocks(markdown):
+    :param text: The lines of the Markdown table.
+    :type text: str
+    :return: A Notion table block.
+    :rtype: dict
     """
-    Parse Markdown text and convert it into a list of Notion blocks.
+    rows = text.split('\n')
+    has_header = len(rows) > 1 and bool(table_header_delimiter_pattern.match(rows[1]))
+    if has_header:
+        rows.pop(1)
+    cells = [[inline_formatting_cache(cell.strip()) for cell in table_cell_pattern.findall(row)] for row in rows]
+    table_width = max(1, max(len(row) for row in cells))
+    return {
+        "object": "block",
+        "type": "table",
+        "table": {
+            "table_width": table_width,
+            "has_column_header": has_header,
+            "has_row_header": False,
+            "children": [{
+                "object": "block",
+                "type": "table_row",
+                "table_row": {"cells": row + [()] * (table_width - len(row))}
+            } for row in cells]
+        }
+    }
 
-    :param markdown: The Markdown text to be parsed.
-    :type markdown: str
-    :return: A list of Notion blocks representing the parsed Markdown content.
-    :rtype: list
+table_modes = ("latex", "native")
+
+def table_blocks(text, table_mode="latex"):
+    """
+    Return the blocks of a Markdown table: LaTeX equation blocks of at most max_equation_length characters,
+    or a native table block if table_mode is "native".
     """
+    if table_mode == "native":
+        return [convert_markdown_table_to_table_block(text)]
+    return [{
+        "type": "equation",
+        "equation": {
+            "expression": expression
+        }
+    } for expression in table_cache(text)]
 
-    # Detect code blocks enclosed within triple backticks
-    code_block_pattern = re.compile(r'```(\w+?)\n(.+?)```', re.DOTALL)
-    # katex
-    latex_block_pattern = re.compile(r'\$\$(.+?)\$\$', re.DOTALL)
-    numbered_list_pattern_nested = r'^( *)(\d+)\. '
-    unordered_list_pattern_nested = r'^( *)(\-) '
-    heading_pattern = r'^(#+) '
+# Detect code blocks enclosed within triple backticks
+def make_code_body(language, code):
+    """
+    Return the body of a Notion code block.
+    """
+    return {
+        "language": language,
+        "rich_text": (RichText("text", code),)
+    }
 
-    #indented_code_pattern = re.compile(r'^ {4}(.+)$', re.MULTILINE)
-    triple_backtick_code_pattern = re.compile(r'^```(.+?)```', re.MULTILINE | re.DOTALL)
-    blockquote_pattern = r'^> (.+)$'
-    horizontal_line_pattern = r'^-{3,}$'
-    image_pattern = r'!\[(.*?)\]\((.*?)\)'
+# Memoization: generated documents repeat the same lines, table rows and code blocks many
+# times. Parse results are cached by their source text and shared between the blocks they
+# appear in, so they must not be modified in place; the splitter copies what it changes.
+parse_cache_size = 4096
 
-    code_blocks = {}
-    def replace_code_blocks(match):
-        index = len(code_blocks)
+def set_parse_cache_size(maxsize=4096):
+    """
+    Replace the parse caches with empty caches holding at most maxsize entries each.
+
+    :param maxsize: Number of entries per cache, 0 to disable memoization or None for no bound.
+    :type maxsize: int
+    """
+    global parse_cache_size, inline_formatting_cache, table_cache, code_body_cache
+    parse_cache_size = maxsize
+    inline_formatting_cache = functools.lru_cache(maxsize)(scan_inline_formatting)
+    table_cache = functools.lru_cache(maxsize)(convert_markdown_table_to_latex_chunks)
+    code_body_cache = functools.lru_cache(maxsize)(make_code_body)
+
+def clear_parse_cache():
+    """
+    Empty the parse caches and reset their counters.
+    """
+    set_parse_cache_size(parse_cache_size)
+
+def parse_cache_info():
+    """
+    Return the hit and miss counters of the parse caches.
+
+    :return: functools cache info (hits, misses, maxsize, currsize) of the "inline", "table" and "code" caches.
+    :rtype: dict
+    """
+    return {
+        "inline": inline_formatting_cache.cache_info(),
+        "table": table_cache.cache_info(),
+        "code": code_body_cache.cache_info(),
+    }
+
+set_parse_cache_size(parse_cache_size)
+
+code_block_pattern = re.compile(r'```(\w+?)\n(.+?)```', re.DOTALL)
+# katex
+latex_block_pattern = re.compile(r'\$\$(.+?)\$\$', re.DOTALL)
+# A line that opens a code block, e.g. "```python"
+code_fence_open_pattern = re.compile(r'```\w+$')
+
+def replace_code_blocks(markdown, code_blocks, counter):
+    """
+    Replace code blocks in markdown with CODE_BLOCK_<index> placeholders, storing (language, code) in code_blocks.
+    """
+    def replace_code_block(match):
+        index = next(counter)
         language, content = match.group(1), match.group(2)
         code_blocks[index] = (language or 'plain text').strip(), content.strip()
         return f'CODE_BLOCK_{index}'
 
-    # Replace code blocks with placeholders
-    markdown = code_block_pattern.sub(replace_code_blocks, markdown)
+    return code_block_pattern.sub(replace_code_block, markdown)
 
-    # katex
-    latex_blocks = {}
-    def replace_latex_blocks(match):
-        index = len(latex_blocks)
+def replace_latex_blocks(markdown, latex_blocks, counter):
+    """
+    Replace $$ blocks in markdown with LATEX_BLOCK_<index> placeholders, storing the expressions in latex_blocks.
+    """
+    def replace_latex_block(match):
+        index = next(counter)
         latex_blocks[index] = (match.group(1)+"").strip()
         return f'LATEX_BLOCK_{index}'
 
-    # Replace code blocks with placeholders
-    markdown = latex_block_pattern.sub(replace_latex_blocks, markdown)
+    return latex_block_pattern.sub(replace_latex_block, markdown)
+
+# Line patterns of the block parser. Each is only tried on lines whose first character
+# (after list indentation) can start it, so most lines are matched against at most one.
+table_row_pattern = re.compile(r'\|\s*[^-|]+\s*\|')
+# Alignment colons included, e.g. "| :--- | ---: |"
+table_delimiter_pattern = re.compile(r'\|\s*:?-+:?\s*\|\s*:?-+:?\s*\|')
+numbered_list_pattern_nested = re.compile(r'^( *)(\d+)\. ')
+unordered_list_pattern_nested = re.compile(r'^( *)(\-) ')
+heading_pattern = re.compile(r'^(#+) ')
+blockquote_pattern = re.compile(r'^> (.+)$')
+horizontal_line_pattern = re.compile(r'^-{3,}$')
+image_pattern = re.compile(r'!\[(.*?)\]\((.*?)\)')
+list_item_types = ("bulleted_list_item", "numbered_list_item")
+
+def list_item_match(line, first):
+    """
+    Return the match of a numbered or bulleted list item on line, whose first character is first, or None.
+    """
+    list_first = line.lstrip(' ')[:1] if first == ' ' else first
+    return (list_first.isdigit() and numbered_list_pattern_nested.match(line)) or \
+           (list_first == '-' and unordered_list_pattern_nested.match(line)) or None
+
+def add_list_item(stack, item, indent, current_indent):
+    """
+    Add a list item at its indentation to the stack of open list levels of iter_blocks_from_lines,
+    returning the new current indentation.
+    """
+    while indent < current_indent:
+        # If the indentation is less than the current level, go back one level in the stack
+        stack.pop()
+        current_indent -= 1
+
+    previous = stack[-1][-1] if stack[-1] else None
+    if indent > current_indent and previous is not None and previous.get("type") in list_item_types:
+        # Nested item, add it as a child of the previous item
+        body = previous[previous["type"]]
+        if 'children' not in body:
+            body['children'] = []
+        body['children'].append(item)
+        stack.append(body['children']) # Add a new level to the stack
+        return current_indent + 1
+
+    # Same level of indentation, or an indented item with no list item to nest under: add to the current level
+    stack[-1].append(item)
+    return current_indent
+
+def iter_blocks_from_lines(lines, code_blocks, latex_blocks, table_mode="latex"):
+    """
+    Convert Markdown lines, with code and LaTeX blocks already replaced by placeholders, into Notion blocks.
+
+    Top-level blocks are yielded as soon as no later line can change them.
+
+    :param lines: An iterable of Markdown lines without line endings.
+    :type lines: iterable
+    :param code_blocks: Code blocks by placeholder index, consumed as the placeholders are met.
+    :type code_blocks: dict
+    :param latex_blocks: LaTeX expressions by placeholder index, consumed as the placeholders are met.
+    :type latex_blocks: dict
+    :param table_mode: (Optional) "latex" to convert tables to LaTeX equation blocks, or "native" for Notion table blocks. Defaults to "latex".
+    :type table_mode: str
+    :return: A generator of top-level Notion blocks.
+    :rtype: generator
+    """
+    if table_mode not in table_modes:
+        raise ValueError(f"Invalid table_mode: {table_mode!r}. Expected one of {table_modes}.")
 
-    lines = markdown.split("\n")
     blocks = []
 
     # Initialize variables to keep track of the current table
@@ -310,37 +738,43 @@ def parse_markdown_to_notion_blocks(markdown):
 
     indented_code_accumulator = []
     for line in lines:
+        first = line[:1]
+
+        # A line with text other than a list item ends the list, so that a later item starts a new list
+        # instead of attaching to an earlier block
+        if len(stack) > 1 and line.strip() and not list_item_match(line, first):
+            del stack[1:]
+            current_indent = 0
+
+        # Hand out finished top-level blocks. The last block is held back because a nested
+        # list item may still be added under it, and nothing is released while a list is
+        # nested, since its next item may still attach to an earlier block.
+        if len(stack) == 1 and len(blocks) > 1:
+            yield from blocks[:-1]
+            del blocks[:-1]
 
         # Check if the line is a table row (e.g., "| Header 1 | Header 2 |" or "| Content 1 | Content 2 |")
-        is_table_row = re.match(r'\|\s*[^-|]+\s*\|', line)
-        # Check if the line is a table delimiter (e.g., "|---|---|")
-        is_table_delimiter = re.match(r'\|\s*[-]+\s*\|\s*[-]+\s*\|', line)
+        # or a table delimiter (e.g., "|---|---|")
+        is_table_line = first == '|' and (table_row_pattern.match(line) or table_delimiter_pattern.match(line))
 
         # If we find table row or delimiter, add the line to the current table
-        if is_table_row or is_table_delimiter:
+        if is_table_line:
             current_table.append(line)
             in_table = True
             continue
-        elif in_table and (not is_table_row and not is_table_delimiter):
+        elif in_table:
             # If we find a non-table line and we're in a table, end the current table
             in_table = False
-            # Process the current table
-            table_str = "\n".join(current_table)
-            # katex
-            latex_table = convert_markdown_table_to_latex(table_str)
-            # Create Notion equation block with LaTeX table expression
-            equation_block = {
-                "type": "equation",
-                "equation": {
-                    "expression": latex_table
-                }
-            }
-            blocks.append(equation_block)
+            # Process the current table into a LaTeX equation block or a native table block
+            blocks.extend(table_blocks("\n".join(current_table), table_mode))
             # Reset the current table
             current_table = []
             continue
 
-        list_match = re.match(numbered_list_pattern_nested, line)
+        # List items may be indented, so they are recognized by the first character after the spaces
+        list_first = line.lstrip(' ')[:1] if first == ' ' else first
+
+        list_match = list_first.isdigit() and numbered_list_pattern_nested.match(line)
         if list_match:
             indent = len(list_match.group(1))
             line = line[len(list_match.group(0)):]
@@ -349,29 +783,14 @@ def parse_markdown_to_notion_blocks(markdown):
                 "object": "block",
                 "type": "numbered_list_item",
                 "numbered_list_item": {
-                    "rich_text": process_inline_formatting(line)
+                    "rich_text": inline_formatting_cache(line)
                 }
             }
 
-            while indent < current_indent:
-                # If the indentation is less than the current level, go back one level in the stack
-                stack.pop()
-                current_indent -= 1
-
-            if indent == current_indent:
-                # Same level of indentation, add to the current level of the stack
-                stack[-1].append(item)
-            else: # indent > current_indent
-                # Nested item, add it as a child of the previous item
-                if 'children' not in stack[-1][-1]['numbered_list_item']:
-                    stack[-1][-1]['numbered_list_item']['children'] = []
-                stack[-1][-1]['numbered_list_item']['children'].append(item)
-                stack.append(stack[-1][-1]['numbered_list_item']['children']) # Add a new level to the stack
-                current_indent += 1
-
+            current_indent = add_list_item(stack, item, indent, current_indent)
             continue
 
-        list_match = re.match(unordered_list_pattern_nested, line)
+        list_match = list_first == '-' and unordered_list_pattern_nested.match(line)
         if list_match:
             indent = len(list_match.group(1))
             line = line[len(list_match.group(0)):]
@@ -380,26 +799,11 @@ def parse_markdown_to_notion_blocks(markdown):
                 "object": "block",
                 "type": "bulleted_list_item",
                 "bulleted_list_item": {
-                    "rich_text": process_inline_formatting(line)
+                    "rich_text": inline_formatting_cache(line)
                 }
             }
 
-            while indent < current_indent:
-                # If the indentation is less than the current level, go back one level in the stack
-                stack.pop()
-                current_indent -= 1
-
-            if indent == current_indent:
-                # Same level of indentation, add to the current level of the stack
-                stack[-1].append(item)
-            else: # indent > current_indent
-                # Nested item, add it as a child of the previous item
-                if 'children' not in stack[-1][-1]['bulleted_list_item']:
-                    stack[-1][-1]['bulleted_list_item']['children'] = []
-                stack[-1][-1]['bulleted_list_item']['children'].append(item)
-                stack.append(stack[-1][-1]['bulleted_list_item']['children']) # Add a new level to the stack
-                current_indent += 1
-
+            current_indent = add_list_item(stack, item, indent, current_indent)
             continue
 
         if line.startswith('    '):  # Check if the line is indented
@@ -413,32 +817,32 @@ def parse_markdown_to_notion_blocks(markdown):
                     "type": "code",
                     "code": {
                         "language": "plain text",
-                        "rich_text": [{"type": "text", "text": {"content": code_block}}]
+                        "rich_text": (RichText("text", code_block),)
                     }
                 })
                 # Clear the accumulator
                 indented_code_accumulator = []
 
         # Check for headings and create appropriate heading blocks
-        heading_match = re.match(heading_pattern, line)
-        blockquote_match = re.match(blockquote_pattern, line)
-        image_match = re.search(image_pattern, line)
+        heading_match = first == '#' and heading_pattern.match(line)
+        blockquote_match = first == '>' and blockquote_pattern.match(line)
+        image_match = '![' in line and image_pattern.search(line)
 
         if heading_match:
             heading_level = len(heading_match.group(1))
-            content = re.sub(heading_pattern, '', line)
+            content = line[heading_match.end():]
             if 1 <= heading_level <= 3:
                 block_type = f"heading_{heading_level}"
                 blocks.append({
                     "object": "block",
                     "type": block_type,
                     block_type: {
-                        "rich_text": process_inline_formatting(content)
+                        "rich_text": inline_formatting_cache(content)
                     }
                 })
 
         # Check for horizontal line and create divider blocks
-        elif re.match(horizontal_line_pattern, line):
+        elif first == '-' and horizontal_line_pattern.match(line):
             blocks.append({
                 "divider": {},
                 "type": "divider"
@@ -450,27 +854,24 @@ def parse_markdown_to_notion_blocks(markdown):
                 "object": "block",
                 "type": "quote",
                 "quote": {
-                    "rich_text": process_inline_formatting(blockquote_match.group(1))
+                    "rich_text": inline_formatting_cache(blockquote_match.group(1))
                 }
             })
 
         # Check for code blocks and create code blocks
-        elif line.startswith("CODE_BLOCK_"):
+        elif first == 'C' and line.startswith("CODE_BLOCK_"):
             code_block_index = int(line[len("CODE_BLOCK_"):])
-            language, code_block = code_blocks[code_block_index]
+            language, code_block = code_blocks.pop(code_block_index)
             blocks.append({
                 "object": "block",
                 "type": "code",
-                "code": {
-                    "language": language,
-                    "rich_text": [{"type": "text", "text": {"content": code_block}}]
-                }
+                "code": code_body_cache(language, code_block)
             })
 
         # Check for katex blocks
-        elif line.startswith("LATEX_BLOCK_"):
+        elif first == 'L' and line.startswith("LATEX_BLOCK_"):
             latex_block_index = int(line[len("LATEX_BLOCK_"):])
-            latex_content = latex_blocks[latex_block_index]
+            latex_content = latex_blocks.pop(latex_block_index)
             blocks.append({
                 "type": "equation",
                 "equation": {
@@ -478,7 +879,7 @@ def parse_markdown_to_notion_blocks(markdown):
                 }
             })
 
-        # Image blocks
+        # Image blocks, wherever the image is on the line
         elif image_match:
             block = {
               "object": "block",
@@ -508,21 +909,13 @@ def parse_markdown_to_notion_blocks(markdown):
                 "object": "block",
                 "type": "paragraph",
                 "paragraph": {
-                    "rich_text": process_inline_formatting(line)
+                    "rich_text": inline_formatting_cache(line)
                 }
             })
 
     # If there's an unfinished table at the end of the lines, process it
     if in_table:
-        table_str = "\n".join(current_table)
-        latex_table = convert_markdown_table_to_latex(table_str)
-        equation_block = {
-            "type": "equation",
-            "equation": {
-                "expression": latex_table
-            }
-        }
-        blocks.append(equation_block)
+        blocks.extend(table_blocks("\n".join(current_table), table_mode))
 
     # Add any remaining indented lines as a code block
     if indented_code_accumulator:
@@ -532,154 +925,910 @@ def parse_markdown_to_notion_blocks(markdown):
             "type": "code",
             "code": {
                 "language": "plain text",
-                "rich_text": [{"type": "text", "text": {"content": code_block}}]
+                "rich_text": (RichText("text", code_block),)
             }
         })
 
-    return blocks
+    yield from blocks
+
+def to_notion_rich_text(rich_text):
+    """
+    Return a rich text array with its RichText segments materialized to Notion rich text objects.
+    """
+    return [seg.to_notion() if isinstance(seg, RichText) else seg for seg in rich_text]
+
+def to_notion_block(block):
+    """
+    Return the Notion JSON of a block whose rich text, captions, table cells and children may hold RichText segments.
+
+    The block is copied where it holds rich text or children, and returned as it is otherwise.
+    """
+    block_type = block.get("type")
+    body = block.get(block_type)
+    if not isinstance(body, dict) or not ("rich_text" in body or "caption" in body or "children" in body or "cells" in body):
+        return block
+
+    body = dict(body)
+    for key in ("rich_text", "caption"):
+        if key in body:
+            body[key] = to_notion_rich_text(body[key])
+    if "cells" in body:
+        body["cells"] = [to_notion_rich_text(cell) for cell in body["cells"]]
+    if "children" in body:
+        body["children"] = to_notion_blocks(body["children"])
+    return dict(block, **{block_type: body})
+
+def to_notion_blocks(blocks):
+    """
+    Materialize the blocks of a request, or of a parse result, to Notion JSON, see to_notion_block.
+
+    :param blocks: An iterable of blocks.
+    :type blocks: iterable
+    :return: A list of Notion blocks.
+    :rtype: list
+    """
+    return [to_notion_block(block) for block in blocks]
+
+def parse_markdown_to_notion_blocks(markdown, compact=False, table_mode="latex"):
+    """
+    Parse Markdown text and convert it into a list of Notion blocks.
+
+    :param markdown: The Markdown text to be parsed.
+    :type markdown: str
+    :param compact: (Optional) Keep rich text as shared RichText segments, to be materialized with to_notion_blocks
+        when the blocks are sent. Compact blocks must not be modified in place. Defaults to False.
+    :type compact: bool
+    :param table_mode: (Optional) "latex" to convert tables to LaTeX equation blocks, or "native" for Notion table blocks. Defaults to "latex".
+    :type table_mode: str
+    :return: A list of Notion blocks representing the parsed Markdown content.
+    :rtype: list
+    """
+
+    # Replace code blocks and katex blocks with placeholders
+    code_blocks = {}
+    markdown = replace_code_blocks(markdown, code_blocks, itertools.count())
+    latex_blocks = {}
+    markdown = replace_latex_blocks(markdown, latex_blocks, itertools.count())
+
+    blocks = iter_blocks_from_lines(markdown.split("\n"), code_blocks, latex_blocks, table_mode)
+    return list(blocks) if compact else to_notion_blocks(blocks)
+
+def iter_code_placeholder_lines(lines, code_blocks, counter):
+    """
+    Yield lines with code blocks replaced by placeholders, buffering only the lines of an open code block.
+
+    The blocks are those code_block_pattern finds in the whole text: a block opens at a line ending
+    with ``` and a language, and closes at the first ``` after the first character of its code,
+    wherever that is on the line; the rest of the closing line may open the next block.
+    """
+    buffer = []
+    for line in lines:
+        if not buffer:
+            if code_fence_open_pattern.search(line):
+                buffer.append(line)
+            else:
+                yield line
+            continue
+
+        buffer.append(line)
+        if '```' not in (line[1:] if len(buffer) == 2 else line):
+            continue
+        text = "\n".join(buffer)
+        end = code_block_pattern.search(text).end()
+        *chunk, last = replace_code_blocks(text[:end], code_blocks, counter).split("\n")
+        yield from chunk
+        # Only the text after the block is scanned again, not its placeholder
+        tail = text[end:]
+        if code_fence_open_pattern.search(tail):
+            buffer = [last + tail]
+        else:
+            buffer = []
+            yield last + tail
+
+    # An unterminated code block is left as it is
+    yield from buffer
+
+def open_latex_delimiter(text):
+    """
+    Return whether text ends inside a $$ block, scanning for $$ pairs as latex_block_pattern does.
+    """
+    position = 0
+    while True:
+        start = text.find('$$', position)
+        if start == -1:
+            return False
+        # The expression is at least one character long
+        end = text.find('$$', start + 3)
+        if end == -1:
+            return True
+        position = end + 2
+
+def iter_latex_placeholder_lines(lines, latex_blocks, counter):
+    """
+    Yield lines with $$ blocks replaced by placeholders, buffering only the lines from an open $$ on.
+
+    The blocks are those latex_block_pattern finds in the whole text, see open_latex_delimiter.
+    """
+    buffer = []
+    for line in lines:
+        if not buffer and '$$' not in line:
+            yield line
+            continue
+
+        buffer.append(line)
+        # A $$ on a later line always closes the open block, so the buffer is scanned again only then
+        if '$$' not in line or open_latex_delimiter("\n".join(buffer)):
+            continue
+        yield from replace_latex_blocks("\n".join(buffer), latex_blocks, counter).split("\n")
+        buffer = []
+
+    # An unterminated $$ block is left as it is, and those before it on its lines are replaced
+    if buffer:
+        yield from replace_latex_blocks("\n".join(buffer), latex_blocks, counter).split("\n")
+
+def iter_markdown_lines(fileobj_or_lines):
+    """
+    Yield the lines of a file, an iterable of lines or a string without line endings,
+    stripped at both ends the way parse_md strips its input: leading blank lines and leading
+    whitespace are skipped, and the last line with text is held back, along with the
+    whitespace-only lines after it, until it is known whether more text follows.
+    """
+    if isinstance(fileobj_or_lines, str):
+        fileobj_or_lines = fileobj_or_lines.split("\n")
+
+    last = None
+    blanks = []
+    for line in fileobj_or_lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if not line.strip():
+            if last is not None:
+                blanks.append(line)
+            continue
+        if last is None:
+            line = line.lstrip()
+        else:
+            yield last
+            yield from blanks
+            blanks = []
+        last = line
+    if last is not None:
+        yield last.rstrip()
+
+def iter_notion_blocks(fileobj_or_lines, compact=False, table_mode="latex"):
+    """
+    Parse Markdown lazily and yield top-level Notion blocks as soon as they are complete.
+
+    Lines are read only as far as needed: code blocks, $$ blocks, tables and nested lists
+    are buffered until they end, so memory is bounded by the largest single block rather
+    than by the document. The blocks are the same as parse_md produces for the whole text.
+
+    :param fileobj_or_lines: A text file object, an iterable of lines, or a Markdown string.
+    :type fileobj_or_lines: file or iterable or str
+    :param compact: (Optional) Yield blocks with RichText segments, see parse_markdown_to_notion_blocks. Defaults to False.
+    :type compact: bool
+    :param table_mode: (Optional) "latex" to convert tables to LaTeX equation blocks, or "native" for Notion table blocks. Defaults to "latex".
+    :type table_mode: str
+    :return: A generator of top-level Notion blocks.
+    :rtype: generator
+    """
+    code_blocks = {}
+    latex_blocks = {}
+    lines = iter_markdown_lines(fileobj_or_lines)
+    lines = iter_code_placeholder_lines(lines, code_blocks, itertools.count())
+    lines = iter_latex_placeholder_lines(lines, latex_blocks, itertools.count())
+    blocks = iter_blocks_from_lines(lines, code_blocks, latex_blocks, table_mode)
+    return blocks if compact else map(to_notion_block, blocks)
 
-def parse_md(markdown_text):
+def parse_md(markdown_text, compact=False, table_mode="latex"):
     """
     Parse Markdown text and convert it into Notion blocks.
 
     :param markdown_text: The Markdown text to be parsed.
     :type markdown_text: str
+    :param compact: (Optional) Keep rich text as RichText segments, see parse_markdown_to_notion_blocks. Defaults to False.
+    :type compact: bool
+    :param table_mode: (Optional) "latex" to convert tables to LaTeX equation blocks, or "native" for Notion table blocks. Defaults to "latex".
+    :type table_mode: str
     :return: A list of Notion blocks representing the parsed Markdown content.
     :rtype: list
     """
     # Parse the transformed Markdown to create Notion blocks
-    return parse_markdown_to_notion_blocks(markdown_text.strip())
+    return parse_markdown_to_notion_blocks(markdown_text.strip(), compact, table_mode)
+
+placeholder_pattern = re.compile(r'(CODE|LATEX)_BLOCK_(\d+)')
 
+def iter_line_chunks(lines, chunk_size=10000):
+    """
+    Split Markdown lines, with code and LaTeX blocks already replaced by placeholders, into chunks of about
+    chunk_size lines that iter_blocks_from_lines parses to the same blocks separately as together.
 
+    A chunk may only end at a blank line that closes any indented code block and is not consumed by a
+    table. The first list item after it must start at the margin, which resets the list nesting,
+    since an indented one would attach to a list of the previous chunk.
+    """
+    # Follow the table state of iter_blocks_from_lines to find the list items and blank lines it sees
+    list_indents = [None] * len(lines)
+    splittable = [False] * len(lines)
+    in_table = False
+    for i, line in enumerate(lines):
+        first = line[:1]
+        if first == '|' and (table_row_pattern.match(line) or table_delimiter_pattern.match(line)):
+            in_table = True
+            continue
+        if in_table:
+            # The line ending a table is consumed with it
+            in_table = False
+            continue
 
-def split_rich_text(rich_text_list, max_len=2000):
+        list_first = line.lstrip(' ')[:1] if first == ' ' else first
+        list_match = (list_first.isdigit() and numbered_list_pattern_nested.match(line)) or \
+                     (list_first == '-' and unordered_list_pattern_nested.match(line))
+        if list_match:
+            list_indents[i] = len(list_match.group(1))
+        else:
+            splittable[i] = not line.strip() and not line.startswith('    ')
+
+    # Indentation of the first list item after each line
+    next_list_indents = [None] * len(lines)
+    following = None
+    for i in range(len(lines) - 1, -1, -1):
+        next_list_indents[i] = following
+        if list_indents[i] is not None:
+            following = list_indents[i]
+
+    start = 0
+    for i in range(len(lines) - 1):
+        if i + 1 - start >= chunk_size and splittable[i] and not next_list_indents[i]:
+            yield lines[start:i + 1]
+            start = i + 1
+    yield lines[start:]
+
+def placeholders_of_chunk(lines, code_blocks, latex_blocks):
+    """
+    Return the code and LaTeX blocks whose placeholders occur in lines.
+    """
+    chunk_code_blocks = {}
+    chunk_latex_blocks = {}
+    for line in lines:
+        if '_BLOCK_' in line:
+            for kind, index in placeholder_pattern.findall(line):
+                index = int(index)
+                if kind == 'CODE' and index in code_blocks:
+                    chunk_code_blocks[index] = code_blocks[index]
+                elif kind == 'LATEX' and index in latex_blocks:
+                    chunk_latex_blocks[index] = latex_blocks[index]
+    return chunk_code_blocks, chunk_latex_blocks
+
+def parse_lines(lines, code_blocks, latex_blocks, table_mode="latex"):
+    """
+    Parse a chunk of placeholder substituted lines into a list of Notion blocks. Runs in a worker process of parse_md_parallel.
+    """
+    return list(iter_blocks_from_lines(lines, code_blocks, latex_blocks, table_mode))
+
+def parse_md_parallel(markdown_text, workers=None, chunk_size=10000, compact=False, table_mode="latex"):
+    """
+    Parse Markdown text into Notion blocks on several cores.
+
+    Code and LaTeX blocks are replaced by placeholders in the calling process, the lines are split at
+    top-level boundaries that no table, list or code block spans (see iter_line_chunks), and the chunks
+    are parsed in a process pool. The result is identical to that of parse_md.
+
+    :param markdown_text: The Markdown text to be parsed.
+    :type markdown_text: str
+    :param workers: (Optional) Number of worker processes. Defaults to the number of CPUs.
+    :type workers: int
+    :param chunk_size: (Optional) Approximate number of lines parsed by one task. Documents shorter than this are
+        parsed in the calling process. Defaults to 10000.
+    :type chunk_size: int
+    :param compact: (Optional) Keep rich text as RichText segments, see parse_markdown_to_notion_blocks. Defaults to False.
+    :type compact: bool
+    :param table_mode: (Optional) "latex" to convert tables to LaTeX equation blocks, or "native" for Notion table blocks. Defaults to "latex".
+    :type table_mode: str
+    :return: A list of Notion blocks representing the parsed Markdown content.
+    :rtype: list
+    """
+    markdown = markdown_text.strip()
+    code_blocks = {}
+    markdown = replace_code_blocks(markdown, code_blocks, itertools.count())
+    latex_blocks = {}
+    markdown = replace_latex_blocks(markdown, latex_blocks, itertools.count())
+
+    chunks = list(iter_line_chunks(markdown.split("\n"), chunk_size))
+    if len(chunks) < 2:
+        blocks = list(iter_blocks_from_lines(markdown.split("\n"), code_blocks, latex_blocks, table_mode))
+    else:
+        # Compact blocks are also smaller to send back from the workers
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(parse_lines, chunk, *placeholders_of_chunk(chunk, code_blocks, latex_blocks), table_mode) for chunk in chunks]
+            blocks = [block for future in futures for block in future.result()]
+    return blocks if compact else to_notion_blocks(blocks)
+
+
+
+# Splitting: one token is a word plus its surrounding whitespace, so consecutive
+# tokens tile the whole text and a run of them can be sliced out in one go.
+word_pattern = re.compile(r'\s*\S+\s*')
+
+def visible_text_of_segment(seg):
+    """
+    Return the text a rich_text segment displays, used to measure it against Notion's length limits.
+    """
+    if isinstance(seg, RichText):
+        return seg.content
+    t = seg.get("type")
+    if t == "text":
+        return seg.get("text", {}).get("content", "") or seg.get("plain_text", "") or ""
+    if t == "equation":
+        return seg.get("equation", {}).get("expression", "") or seg.get("plain_text", "") or ""
+    return seg.get("plain_text", "") or ""
+
+def slice_text_segment(seg, start_idx, end_idx):
+    """
+    Return a copy of a text segment holding only content[start_idx:end_idx].
+
+    The copy is shallow: annotations and links are shared with the source segment.
+    """
+    if isinstance(seg, RichText):
+        return seg.sliced(start_idx, end_idx)
+    text = seg.get("text") or {}
+    new_seg = dict(seg)
+    new_seg["text"] = dict(text, content=(text.get("content") or "")[start_idx:end_idx])
+    if "plain_text" in new_seg:
+        new_seg["plain_text"] = new_seg["text"]["content"]
+    return new_seg
+
+def iter_word_spans(text):
+    """
+    Yield (start, end) offsets of the words in text, whitespace included.
+    A text without words is yielded as a single span.
+    """
+    found = False
+    for match in word_pattern.finditer(text):
+        found = True
+        yield match.span()
+    if not found:
+        yield 0, len(text)
+
+# Notion accepts at most 100 rich text objects in one rich_text array
+max_rich_text_segments = 100
+
+def split_rich_text(rich_text_list, max_len=2000, max_segments=max_rich_text_segments):
     """
     Split a Notion rich_text array into multiple chunks while preserving formatting.
     Attempts to split on word boundaries and avoids breaking equations/mentions.
+
+    Each text segment is walked once; the words of a segment that land in the same chunk
+    are emitted as one slice of that segment rather than one rich_text object per word.
+    Chunks of more than max_segments objects are cut into several chunks.
     """
 
     if not rich_text_list:
         return []
 
-    def visible_text_of_segment(seg):
-        t = seg.get("type")
-        if t == "text":
-            return seg.get("text", {}).get("content", "") or seg.get("plain_text", "")
-        if t == "equation":
-            return seg.get("equation", {}).get("expression", "") or seg.get("plain_text", "")
-        if t == "mention":
-            return seg.get("plain_text", "") or ""
-        return seg.get("plain_text", "") or ""
-
-    def make_slice(seg, start_idx, end_idx):
-        new_seg = deepcopy(seg)
-        new_seg.setdefault("text", {})
-        original = seg.get("text", {}).get("content", "")
-        new_seg["text"]["content"] = original[start_idx:end_idx]
-        if "plain_text" in new_seg:
-            new_seg["plain_text"] = new_seg["text"]["content"]
-        return new_seg
-
-    def tokenize(text):
-        if text == "":
-            return [""]
-        tokens = re.findall(r'\S+\s*', text)
-        return tokens or [text]
-
     chunks = []
     current = []
     current_len = 0
 
     for seg in rich_text_list:
-        seg_type = seg.get("type", "text")
-        seg_text = visible_text_of_segment(seg)
-        seg_len = len(seg_text)
-
-        # Non splittable types
-        if seg_type in ("equation", "mention"):
-            if current_len + seg_len <= max_len:
-                current.append(deepcopy(seg))
-                current_len += seg_len
-            else:
-                if current:
-                    chunks.append(current)
-                chunks.append([deepcopy(seg)])
-                current = []
-                current_len = 0
-            continue
+        compact = isinstance(seg, RichText)
+        seg_type = seg.type if compact else seg.get("type", "text")
 
         # Text segments
         if seg_type == "text":
-            text_content = seg.get("text", {}).get("content", "") or ""
-            tokens = tokenize(text_content)
+            text_content = seg.content if compact else seg.get("text", {}).get("content", "") or ""
+            # Offsets of the words of this segment collected into the current chunk
+            run_start = run_end = 0
 
-            for token in tokens:
-                t_len = len(token)
+            for start, end in iter_word_spans(text_content):
+                t_len = end - start
 
                 # Hard split oversized token
                 if t_len > max_len:
+                    if run_end > run_start:
+                        current.append(slice_text_segment(seg, run_start, run_end))
                     if current:
                         chunks.append(current)
                         current = []
                         current_len = 0
 
-                    start = 0
-                    while start < t_len:
-                        end = min(start + max_len, t_len)
-                        chunks.append([make_slice(seg, start, end)])
-                        start = end
-                    continue
-
-                # Fits in current chunk
-                if current_len + t_len <= max_len:
-                    offset = 0
-                    for t in tokens:
-                        if t is token:
-                            break
-                        offset += len(t)
-                    current.append(make_slice(seg, offset, offset + len(token)))
-                    current_len += t_len
+                    for piece_start in range(start, end, max_len):
+                        chunks.append([slice_text_segment(seg, piece_start, min(piece_start + max_len, end))])
+                    run_start = run_end = end
                     continue
 
                 # Does not fit -> flush current chunk
-                if current:
-                    chunks.append(current)
-                    current = []
-                    current_len = 0
-
-                # Add token to new chunk
-                offset = 0
-                for t in tokens:
-                    if t is token:
-                        break
-                    offset += len(t)
-                current.append(make_slice(seg, offset, offset + len(token)))
+                if current_len + t_len > max_len:
+                    if run_end > run_start:
+                        current.append(slice_text_segment(seg, run_start, run_end))
+                    if current:
+                        chunks.append(current)
+                        current = []
+                        current_len = 0
+                    run_start = start
+
+                run_end = end
                 current_len += t_len
 
+            if run_end > run_start or not text_content:
+                current.append(slice_text_segment(seg, run_start, run_end))
             continue
 
-        # Fallback for unknown segment types
+        # Non splittable types (equations, mentions and unknown segment types)
+        seg_len = len(visible_text_of_segment(seg))
+        if not compact:
+            seg = dict(seg)
         if current_len + seg_len <= max_len:
-            current.append(deepcopy(seg))
+            current.append(seg)
             current_len += seg_len
         else:
             if current:
                 chunks.append(current)
-            chunks.append([deepcopy(seg)])
+            chunks.append([seg])
             current = []
             current_len = 0
 
     if current:
         chunks.append(current)
 
+    if any(len(chunk) > max_segments for chunk in chunks):
+        chunks = [chunk[i:i + max_segments] for chunk in chunks for i in range(0, len(chunk), max_segments)]
+
     return chunks
 
-def create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', print_page_info=False):
+def iter_line_spans(text, max_len=2000):
+    """
+    Yield (start, end) offsets of pieces of text of at most max_len characters, each ending at
+    a line end where there is one in reach, for splitting code without breaking its lines.
+    """
+    start = 0
+    while len(text) - start > max_len:
+        end = text.rfind("\n", start, start + max_len) + 1
+        if end <= start:
+            # A line longer than max_len is cut where it must
+            end = start + max_len
+        yield start, end
+        start = end
+    yield start, len(text)
+
+def split_code_rich_text(rich_text, max_len=2000):
+    """
+    Return the rich text of a code block with text objects longer than max_len cut into several, at line ends.
+    """
+    segments = []
+    for seg in rich_text:
+        text = visible_text_of_segment(seg)
+        if len(text) <= max_len or (seg.type if isinstance(seg, RichText) else seg.get("type", "text")) != "text":
+            segments.append(seg)
+            continue
+        segments.extend(slice_text_segment(seg, start, end) for start, end in iter_line_spans(text, max_len))
+    return segments
+
+def split_long_segments(rich_text, max_len=2000):
+    """
+    Return a rich text array with text objects longer than max_len cut into several, at word boundaries.
+    """
+    if all(len(visible_text_of_segment(seg)) <= max_len for seg in rich_text):
+        return list(rich_text)
+    return [seg for chunk in split_rich_text(rich_text, max_len) for seg in chunk]
+
+def split_block(block, max_len=2000):
+    """
+    Split a block and its children into blocks Notion accepts: no rich text object longer than max_len
+    characters and no rich_text array of more than 100 objects.
+
+    Paragraphs longer than max_len characters are split into several paragraphs. Other blocks keep their
+    text in one block, cut into several rich text objects (code at line ends), and only become several
+    consecutive blocks of the same type when that takes more than 100 objects; their children are then
+    moved to the last of them. Captions and table cells are cut into rich text objects the same way.
+
+    :param block: A Notion block with any depth of children.
+    :type block: dict
+    :param max_len: (Optional) Maximum length of a paragraph and of a rich text object. Defaults to 2000.
+    :type max_len: int
+    :return: The blocks replacing the block, which is itself the only one if it needs no splitting.
+    :rtype: list
+    """
+    block_type = block.get("type")
+    body = block.get(block_type)
+    if not isinstance(body, dict):
+        return [block]
+
+    children = body.get("children")
+    if children:
+        split_children = [piece for child in children for piece in split_block(child, max_len)]
+        if len(split_children) != len(children) or any(piece is not child for piece, child in zip(split_children, children)):
+            block = with_children(block, split_children)
+            body = block[block_type]
+
+    caption = body.get("caption")
+    if caption and any(len(visible_text_of_segment(seg)) > max_len for seg in caption):
+        body = dict(body, caption=split_long_segments(caption, max_len))
+        block = dict(block, **{block_type: body})
+
+    cells = body.get("cells")
+    if cells and any(len(visible_text_of_segment(seg)) > max_len for cell in cells for seg in cell):
+        body = dict(body, cells=[split_long_segments(cell, max_len) for cell in cells])
+        block = dict(block, **{block_type: body})
+
+    rich_text = body.get("rich_text")
+    if not rich_text:
+        return [block]
+
+    if block_type == "paragraph":
+        # Computing total visible chars across all segments
+        total_visible = sum(len(visible_text_of_segment(rt)) for rt in rich_text)
+        if total_visible <= max_len and len(rich_text) <= max_rich_text_segments:
+            return [block]
+        chunks = split_rich_text(rich_text, max_len)
+    else:
+        if len(rich_text) <= max_rich_text_segments and all(len(visible_text_of_segment(seg)) <= max_len for seg in rich_text):
+            return [block]
+        if block_type == "code":
+            segments = split_code_rich_text(rich_text, max_len)
+        else:
+            segments = split_long_segments(rich_text, max_len)
+        chunks = [segments[i:i + max_rich_text_segments] for i in range(0, len(segments), max_rich_text_segments)]
+
+    text_body = {key: value for key, value in body.items() if key != "children"}
+    pieces = [dict(block, **{block_type: dict(text_body, rich_text=chunk)}) for chunk in chunks]
+    if children:
+        pieces[-1] = with_children(pieces[-1], block_children(block))
+    return pieces
+
+def iter_split_blocks(blocks, max_len=2000):
+    """
+    Yield blocks split with split_block: paragraphs longer than max_len characters, rich text objects
+    longer than max_len characters and rich_text arrays of more than 100 objects, at any depth.
+    """
+    for block in blocks:
+        yield from split_block(block, max_len)
+
+def iter_block_batches(blocks, batch_size=100):
+    """
+    Group blocks into lists of at most batch_size blocks, reading blocks only as batches are requested.
+    """
+    batch = []
+    for block in blocks:
+        batch.append(block)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    # remaining batch
+    if batch:
+        yield batch
+
+
+
+# Nesting: one request may carry two levels of children below its top-level blocks,
+# at most 100 blocks in any children array and at most 1000 blocks in total.
+max_nesting = 2
+max_children = 100
+max_request_blocks = 1000
+
+# Size: Notion rejects request bodies over 500 KB. Batches are packed up to a lower ceiling
+# that leaves room for the rest of the body, such as the page properties sent with the first batch.
+request_batch_size = 100
+max_request_bytes = 450000
+
+def set_batch_limits(batch_size=100, max_bytes=450000):
+    """
+    Set the ceilings of the requests that create blocks.
+
+    :param batch_size: Maximum number of top-level blocks per request, at most 100.
+    :type batch_size: int
+    :param max_bytes: Maximum size in bytes of the JSON of the blocks of one request.
+    :type max_bytes: int
+    """
+    global request_batch_size, max_request_bytes
+    if not 1 <= batch_size <= max_children:
+        raise ValueError(f"Invalid batch_size: {batch_size!r}. Expected 1 to {max_children}.")
+    if max_bytes <= 0:
+        raise ValueError(f"Invalid max_bytes: {max_bytes!r}. Expected a positive number of bytes.")
+    request_batch_size = batch_size
+    max_request_bytes = max_bytes
+
+def json_size(value):
+    """
+    Return the size in bytes of value encoded as JSON the way httpx sends it: compact and UTF-8.
+    """
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def string_json_size(text):
+    """
+    Return the size in bytes of a JSON string literal holding text.
+    """
+    literal = encode_json_string(text)
+    return len(literal) if literal.isascii() else len(literal.encode("utf-8"))
+
+# JSON size of each kind of RichText with empty strings, by (type, annotations, has link)
+rich_text_json_overheads = {}
+
+def rich_text_json_size(rich_text):
+    """
+    Return the JSON size of a rich text array, computed from the strings of its RichText segments.
+    """
+    size = len(rich_text) + 1 if rich_text else 2
+    for seg in rich_text:
+        if not isinstance(seg, RichText):
+            size += json_size(seg)
+            continue
+        key = (seg.type, seg.annotations, bool(seg.url))
+        overhead = rich_text_json_overheads.get(key)
+        if overhead is None:
+            # A one character URL stands for the link, which appears twice: as text.link.url and href
+            overhead = json_size(RichText(seg.type, "", seg.annotations, "u" if seg.url else None).to_notion()) - (6 if seg.url else 0)
+            rich_text_json_overheads[key] = overhead
+        literal = encode_json_string(seg.content)
+        content_size = (len(literal) if literal.isascii() else len(literal.encode("utf-8"))) - 2
+        # The content appears twice in annotated text objects: as text.content and plain_text
+        size += overhead + (content_size if seg.type == "equation" or seg.annotations is None else 2 * content_size)
+        if seg.url:
+            size += 2 * string_json_size(seg.url)
+    return size
+
+def block_json_size(block):
+    """
+    Return the size in bytes of the JSON of a block and its children as sent, see json_size.
+
+    Only the rest of the block is serialized; rich text and children are measured piece by piece,
+    so that compact blocks are not materialized to be measured.
+    """
+    block_type = block.get("type")
+    body = block.get(block_type)
+    if not isinstance(body, dict):
+        return json_size(block)
+    lists = [key for key in ("rich_text", "caption", "cells", "children") if key in body]
+    if not lists:
+        return json_size(block)
+
+    # The empty arrays of the rest of the block are replaced by the measured ones
+    size = json_size(dict(block, **{block_type: dict(body, **{key: [] for key in lists})})) - 2 * len(lists)
+    for key in lists:
+        if key == "children":
+            children = body[key]
+            size += sum(block_json_size(child) for child in children) + len(children) + 1 if children else 2
+        elif key == "cells":
+            cells = body[key]
+            size += sum(rich_text_json_size(cell) for cell in cells) + len(cells) + 1 if cells else 2
+        else:
+            size += rich_text_json_size(body[key])
+    return size
+
+def block_children(block):
+    """
+    Return the list of children of a block, or an empty list.
+    """
+    return block.get(block.get("type"), {}).get("children") or []
+
+def with_children(block, children):
+    """
+    Return a copy of a block having the given children instead of its own.
+    """
+    body = dict(block[block["type"]])
+    body.pop("children", None)
+    if children:
+        body["children"] = children
+    return dict(block, **{block["type"]: body})
+
+def count_blocks(block):
+    """
+    Return the number of blocks in a block tree, the block itself included.
+    """
+    return 1 + sum(count_blocks(child) for child in block_children(block))
+
+def nesting_fits(block, depth=0):
+    """
+    Return True if the children of a block at the given depth of a request are within Notion's nesting limits.
+    """
+    children = block_children(block)
+    if not children:
+        return True
+    if depth >= max_nesting or len(children) > max_children:
+        return False
+    return all(nesting_fits(child, depth + 1) for child in children)
+
+def plan_block(block, max_bytes=None):
+    """
+    Split a block into the part sent in one request and the children appended to it afterwards.
+
+    A block within the limits is sent as it is. Otherwise it is sent with the longest run of its
+    first children that fits, and the remaining children are returned to be appended to the
+    created block in later requests, where they are planned the same way.
+
+    Only a run of first children can be sent along: appended children go after the existing ones, and
+    a response holds the IDs of the blocks appended but not of their children. A later sibling can thus
+    not be sent before a deferred child, nor a child be sent without the part of its subtree that would
+    be appended to it later. Each block whose children do not all fit costs one request per batch of
+    its deferred children, the fewest the API allows.
+
+    :param block: A Notion block with any depth of children.
+    :type block: dict
+    :param max_bytes: (Optional) Maximum JSON size of the block sent. Defaults to max_request_bytes.
+    :type max_bytes: int
+    :return: The block to send and the list of its deferred children.
+    :rtype: tuple
+    """
+    if max_bytes is None:
+        max_bytes = max_request_bytes
+    children = block_children(block)
+    if not children or (nesting_fits(block) and count_blocks(block) <= max_request_blocks and block_json_size(block) <= max_bytes):
+        return block, []
+
+    inline = []
+    size = 1
+    # The comma before each child is counted with it
+    json_size = block_json_size(with_children(block, [])) + len(',"children":[]')
+    for child in children[:max_children]:
+        child_size = count_blocks(child)
+        child_json_size = block_json_size(child) + 1
+        if not nesting_fits(child, 1) or size + child_size > max_request_blocks or json_size + child_json_size > max_bytes:
+            break
+        inline.append(child)
+        size += child_size
+        json_size += child_json_size
+
+    return with_children(block, inline), children[len(inline):]
+
+def iter_upload_batches(blocks, batch_size=None, max_blocks=max_request_blocks, max_bytes=None, plain_first_batch=False):
+    """
+    Plan blocks with plan_block and group them into batches Notion accepts in one request.
+
+    A batch holds at most batch_size top-level blocks, max_blocks blocks in total and max_bytes bytes of
+    JSON. Its items are (block, deferred children) pairs; the deferred children are appended once the
+    block has an ID. The JSON of each block is measured once, as it is added, and a block larger than
+    max_bytes on its own is sent in a batch of its own.
+
+    :param blocks: An iterable of top-level Notion blocks.
+    :type blocks: iterable
+    :param batch_size: (Optional) Defaults to the batch_size of set_batch_limits, 100.
+    :type batch_size: int
+    :param max_bytes: (Optional) Defaults to the max_bytes of set_batch_limits, 450000.
+    :type max_bytes: int
+    :param plain_first_batch: (Optional) End the first batch before the first block with deferred children,
+        for the batch sent with pages.create, whose response has no block IDs. Defaults to False.
+    :type plain_first_batch: bool
+    :return: A generator of lists of (block, deferred children) pairs.
+    :rtype: generator
+    """
+    if batch_size is None:
+        batch_size = request_batch_size
+    if max_bytes is None:
+        max_bytes = max_request_bytes
+
+    batch = []
+    size = 0
+    json_size = 0
+    for block in blocks:
+        block, deferred = plan_block(block, max_bytes)
+        block_size = count_blocks(block)
+        # The comma before each block is counted with it
+        block_json = block_json_size(block) + 1
+        if (batch and (size + block_size > max_blocks or json_size + block_json > max_bytes)) or (deferred and plain_first_batch):
+            yield batch
+            batch, size, json_size, plain_first_batch = [], 0, 0, False
+
+        batch.append((block, deferred))
+        size += block_size
+        json_size += block_json
+        if len(batch) == batch_size:
+            yield batch
+            batch, size, json_size, plain_first_batch = [], 0, 0, False
+
+    if batch:
+        yield batch
+
+def deferred_children_jobs(batch, response):
+    """
+    Pair the deferred children of an appended batch with the IDs of their created parent blocks.
+    """
+    if not any(deferred for _, deferred in batch):
+        return []
+    return [(result["id"], deferred) for (_, deferred), result in zip(batch, response["results"]) if deferred]
+
+def append_children(parent_id, blocks):
+    """
+    Append blocks to a parent block in as few requests as the limits allow.
+
+    :return: (parent block ID, blocks) jobs for the children deferred further.
+    :rtype: list
+    """
+    jobs = []
+    for batch in iter_upload_batches(blocks):
+        response = send(notion.blocks.children.append, parent_id, children=to_notion_blocks(block for block, _ in batch))
+        jobs.extend(deferred_children_jobs(batch, response))
+    return jobs
+
+def append_deferred_children(jobs, workers=4):
+    """
+    Append deferred children until the whole tree has been created.
+
+    The children of different parents are independent and are appended in parallel, while the requests
+    for one parent are sent in order. The children of a block are appended as soon as the block is created,
+    without waiting for the other blocks of its level, so that a deep subtree does not wait for the
+    slowest parent of every level above it.
+
+    :param jobs: (parent block ID, blocks) pairs.
+    :type jobs: list
+    :param workers: (Optional) Maximum number of parents appended to at the same time. Defaults to 4.
+    :type workers: int
+    """
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(append_children, *job) for job in jobs}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Raises the first failure, once the requests in flight are done
+                pending.update(executor.submit(append_children, *job) for job in future.result())
+
+class BackgroundIterator:
+    """
+    Iterate over an iterable that is consumed by a background thread, at most maxsize items ahead.
+
+    The bounded queue gives back-pressure: the producer blocks while the consumer is behind.
+    An exception raised by the producer is re-raised in the consumer, and close() stops the
+    producer when the consumer gives up early.
+    """
+
+    _done = object()
+
+    def __init__(self, iterable, maxsize=4):
+        self._items = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, args=(iterable,), name="md2notionpage-producer", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Give up instead of blocking forever once the consumer has stopped
+        while not self._stop.is_set():
+            try:
+                self._items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, iterable):
+        try:
+            for item in iterable:
+                if not self._put((item, None)):
+                    return
+        except BaseException as e:
+            self._put((self._done, e))
+        else:
+            self._put((self._done, None))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stop.is_set():
+            raise StopIteration
+        item, error = self._items.get()
+        if item is self._done:
+            self._stop.set()
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def close(self):
+        """
+        Stop the producer and wait for it to finish its current item.
+        """
+        self._stop.set()
+        self._thread.join()
+
+def create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', print_page_info=False, pipeline=False, pipeline_depth=4, resume_token=None, nested_workers=4, cache=None, parse_workers=None, table_mode='latex', image_dir=None, spool=None, document_id=None):
     """
     Create a Notion page from Markdown text.
 
-    :param markdown_text: The Markdown text to be converted into a Notion page.
-    :type markdown_text: str
+    :param markdown_text: The Markdown text to be converted into a Notion page, or a text file object
+        (or iterable of lines) that is parsed lazily so that uploading starts before the whole input is read.
+    :type markdown_text: str or file
     :param title: The title of the new Notion page.
     :type title: str
     :param parent_page_id: The ID of the parent page under which the new page will be created.
@@ -694,9 +1843,45 @@ def create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url='
     :type title_property_name: str
     :param print_page_info: (Optional) False or True. Print info of the newly generated page.
     :type print_page_info: bool
-    :return: The URL of the created Notion page.
+    :param pipeline: (Optional) Parse and batch blocks in a background thread while batches are being sent. Defaults to False.
+    :type pipeline: bool
+    :param pipeline_depth: (Optional) Maximum number of batches the background parser may get ahead of the uploads. Defaults to 4.
+    :type pipeline_depth: int
+    :param resume_token: (Optional) The resume_token attribute of the exception raised by an interrupted upload of the same
+        Markdown text. The upload continues on that page from the first batch that was not appended, instead of creating a new page.
+    :type resume_token: str
+    :param nested_workers: (Optional) Maximum number of blocks whose deferred children are appended at the same time. Defaults to 4.
+    :type nested_workers: int
+    :param cache: (Optional) A publish cache (see cache.py). If the same Markdown text has already been published with the same
+        arguments, the URL of that page is returned without parsing or sending any requests; otherwise the created page is recorded.
+        A file object is read whole before uploading, as the cache key covers the whole text.
+    :type cache: PublishCache
+    :param parse_workers: (Optional) Parse a Markdown string in this many processes with parse_md_parallel. Defaults to None,
+        parsing in the calling process.
+    :type parse_workers: int
+    :param table_mode: (Optional) 'latex' to show tables as LaTeX equation blocks, or 'native' for Notion table blocks. Defaults to 'latex'.
+        A native table is created with the rows that fit in its request and the other rows are appended in batches of 100.
+    :type table_mode: str
+    :param image_dir: (Optional) Upload images given by a path with Notion's file upload API, resolving relative paths against
+        this directory, usually that of the Markdown file (see images.py). Defaults to None, sending every image as an external URL.
+    :type image_dir: str
+    :param spool: (Optional) A SpoolWriter (see spool.py). The blocks are parsed, split and batched, but the requests are
+        written to the spool instead of being sent, to be sent later with replay_spool. Local images are uploaded on replay.
+        Cannot be combined with resume_token or cache.
+    :type spool: SpoolWriter
+    :param document_id: (Optional) A key identifying the document in metrics (see metrics.py), e.g. the path of the
+        Markdown file. Defaults to a key unique to the call.
+    :type document_id: str
+    :return: The URL of the created Notion page, or its reference in the spool.
     :rtype: str
 
+    Requests are rate limited and retried on transient failures (see ratelimit.py). If appending a batch still fails,
+    the exception is raised with a resume_token attribute that can be passed back to continue the upload.
+
+    Lists nested deeper than Notion accepts in one request are uploaded in parts: a block is created with the
+    children that fit, and its remaining children are appended to it once its ID is known (see plan_block).
+    A failure while appending such deferred children is raised without a resume_token.
+
     properties example based on the JS example in https://developers.notion.com/guides/data-apis/working-with-databases#database-properties:
             properties={
                 "Grocery item": {"title": [{"text": {"content": "Bananas"}}]},
@@ -704,16 +1889,146 @@ def create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url='
                 "Last ordered": {"date": {"start": "2023-11-01"}}
             }
     """
-    global notion
-    if notion is None:
-        notion = Client(auth=environ.get("NOTION_SECRET"))
+    if spool is not None and (resume_token or cache is not None):
+        raise ValueError("A spooled upload cannot be resumed or cached: replay the spool file instead.")
+
+    cache_key = None
+    if cache is not None:
+        if not isinstance(markdown_text, str):
+            markdown_text = "\n".join(iter_markdown_lines(markdown_text))
+        cache_key = publish_key(markdown_text, title, parent_page_id, cover_url, parent_type, properties, title_property_name, table_mode, image_dir)
+        cached_page = cache.get(cache_key)
+        if cached_page is not None:
+            return cached_page["url"]
+
+    if document_id is None:
+        document_id = metrics.new_document_id()
+    if isinstance(markdown_text, str) and parse_workers:
+        with metrics.timed("parse", title, document_id):
+            blocks = parse_md_parallel(markdown_text, parse_workers, compact=True, table_mode=table_mode)
+    elif isinstance(markdown_text, str) and not pipeline:
+        with metrics.timed("parse", title, document_id):
+            blocks = parse_md(markdown_text, compact=True, table_mode=table_mode)
+    else:
+        # Parsed lazily, as part of preparing the batches
+        blocks = iter_notion_blocks(markdown_text, compact=True, table_mode=table_mode)
 
+    return create_notion_page_from_blocks(blocks, title, parent_page_id, cover_url=cover_url, parent_type=parent_type, properties=properties,
+                                          title_property_name=title_property_name, print_page_info=print_page_info,
+                                          pipeline=pipeline, pipeline_depth=pipeline_depth, resume_token=resume_token,
+                                          nested_workers=nested_workers, cache=cache, cache_key=cache_key, image_dir=image_dir, spool=spool,
+                                          document_id=document_id)
+
+def create_notion_page_from_blocks(blocks, title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', print_page_info=False, pipeline=False, pipeline_depth=4, resume_token=None, nested_workers=4, cache=None, cache_key=None, image_dir=None, spool=None, document_id=None):
+    """
+    Create a Notion page from already parsed Notion blocks, e.g. the result of parse_md.
+
+    Long paragraphs are split and the blocks are appended in batches as in create_notion_page_from_md,
+    which documents the remaining arguments.
+
+    :param blocks: An iterable of top-level Notion blocks.
+    :type blocks: iterable
+    :param cache: (Optional) A publish cache in which the page is recorded under cache_key once it is complete.
+    :type cache: PublishCache
+    :param cache_key: (Optional) The publish_key of the source of the blocks.
+    :type cache_key: str
+    :param document_id: (Optional) A key identifying the document in metrics. Defaults to a key unique to the call.
+    :type document_id: str
+    :return: The URL of the created Notion page, or its reference in the spool.
+    :rtype: str
+    """
+    if document_id is None:
+        document_id = metrics.new_document_id()
+    # The whole upload is one stage, for finding slow documents
+    with metrics.timed("upload" if spool is None else "spool", title, document_id):
+        if image_dir is not None and spool is None:
+            # Local images are uploaded in a thread pool ahead of the batches that show them
+            blocks = resolve_local_images(blocks, image_dir)
+
+        # Notion API limits: 100 children per array, two levels of nesting and 1000 blocks per request
+        batches = iter_upload_batches(iter_split_blocks(blocks), plain_first_batch=True)
+        if pipeline:
+            # Parsing overlaps with creating the page and sending the batches
+            batches = BackgroundIterator(batches, maxsize=pipeline_depth)
+        prepared = metrics.timed_iter(batches, "prepare", title, document_id)
+
+        try:
+            if spool is not None:
+                # Local images are uploaded when the spool is replayed
+                create_arguments = page_request_arguments(title, parent_page_id, cover_url, parent_type, properties, title_property_name)
+                return spool.write_page(create_arguments, prepared, title, image_dir)
+
+            get_client()
+            if resume_token:
+                page_id, next_batch = parse_resume_token(resume_token)
+                created_page = send(notion.pages.retrieve, page_id, idempotent=True)
+                # Skip the batches appended before the upload was interrupted
+                remaining = itertools.islice(prepared, next_batch, None)
+            else:
+                # The first batch is sent along with the page itself
+                first_batch = to_notion_blocks(block for block, _ in next(prepared, []))
+                with metrics.timed("create_page", title, document_id):
+                    created_page = create_page(title, parent_page_id, cover_url, parent_type, properties, title_property_name, children=first_batch)
+                next_batch = 1
+                remaining = prepared
+
+            for index, batch in enumerate(remaining, next_batch):
+                with metrics.timed("append", title, document_id):
+                    try:
+                        response = send(notion.blocks.children.append, created_page["id"], children=to_notion_blocks(block for block, _ in batch))
+                    except Exception as e:
+                        e.resume_token = make_resume_token(created_page["id"], index)
+                        raise
+                    append_deferred_children(deferred_children_jobs(batch, response), nested_workers)
+        finally:
+            prepared.close()
+            if pipeline:
+                batches.close()
+
+    if cache is not None and cache_key is not None:
+        cache.put(cache_key, created_page)
+
+    if print_page_info:
+        pprint.pprint(created_page)
+
+    # Return documented URL
+    return created_page["url"]
+
+def make_resume_token(page_id, batch_index):
+    """
+    Return a token recording that the batches of a page before batch_index have been appended.
+    """
+    return f"{page_id}:{batch_index}"
+
+def parse_resume_token(resume_token):
+    """
+    Return the page ID and the index of the first batch to append recorded in a resume token.
+    """
+    page_id, _, batch_index = resume_token.rpartition(":")
+    if not page_id or not batch_index.isdigit():
+        raise ValueError(f"Invalid resume token: {resume_token!r}. Expected '<page id>:<batch index>'.")
+    return page_id, int(batch_index)
+
+def page_request_arguments(title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', children=None):
+    """
+    Build the keyword arguments of the pages.create request that creates the page with its title, cover and
+    first children in one go, see create_notion_page_from_md for the arguments.
+
+    :param children: (Optional) Up to 100 blocks to create the page with.
+    :type children: list
+    :return: The create keyword arguments.
+    :rtype: dict
+    """
     if parent_type=='page':
         # Create a new child page under the parent page with the given title
-        created_page = notion.pages.create(parent={
+        create_arguments = dict(parent={
             "type": "page_id",
             "page_id": parent_page_id
-        }, properties={}, children=[])
+        }, properties={
+            "title": {
+                "title": [{"type": "text", "text": {"content": title}}]
+            }
+        })
     elif parent_type=='database':
         if properties is None:
             # Use the provided title_property_name (defaults to "Name")
@@ -723,7 +2038,7 @@ def create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url='
                     "title": [{"text": {"content": title}}]
                 }
             }
-        created_page = notion.pages.create(
+        create_arguments = dict(
             parent={"database_id": parent_page_id},
             properties=properties
         )
@@ -733,78 +2048,23 @@ def create_notion_page_from_md(markdown_text, title, parent_page_id, cover_url='
         )
 
     if cover_url != "":
-        # Update the page with the title and cover (if provided)
-        notion.pages.update(created_page["id"], properties={
-            "title": {
-                "title": [{"type": "text", "text": {"content": title}}]
-            }
-        },
-        cover = {
+        create_arguments["cover"] = {
             "external": {
                 # Example URL: https://raw.githubusercontent.com/markomanninen/md2notion/main/photo-1501504905252-473c47e087f8.jpeg
                 "url": cover_url
             }
-        })
-    else:
-        # Update the page with the title and cover (if provided)
-        notion.pages.update(created_page["id"], properties={
-            "title": {
-                "title": [{"type": "text", "text": {"content": title}}]
-            }
-        })
-
-
-
-    final_blocks = []
-
-    for block in parse_md(markdown_text):
-        if block["type"] == "paragraph":
-            rich_text_list = block["paragraph"].get("rich_text", [])
-
-            # Computing total visible chars across all segments
-            total_visible = sum(
-                len(
-                    rt.get("text", {}).get("content", "")
-                    if rt.get("type") == "text"
-                    else rt.get("equation", {}).get("expression", "")
-                    if rt.get("type") == "equation"
-                    else rt.get("plain_text", "")
-                )
-                for rt in rich_text_list
-            )
-
-            if total_visible > 2000:
-
-                chunks = split_rich_text(rich_text_list, 2000)
-
-                for rich_chunk in chunks:
-                    final_blocks.append({
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {"rich_text": rich_chunk}
-                    })
-
-                continue  # skip original block
-
-        # block does NOT need splitting -> keep as it is
-        final_blocks.append(block)
-
-
-    # Notion API batching limit: 100 children per request
-    batch = []
-    for block in final_blocks:
-        batch.append(block)
-        if len(batch) == 100:
-            notion.blocks.children.append(created_page["id"], children=batch)
-            batch = []
-
-    # upload remaining batch
-    if batch:
-        notion.blocks.children.append(created_page["id"], children=batch)
+        }
 
+    create_arguments["children"] = children or []
+    return create_arguments
 
-    if print_page_info:
-        pprint.pprint(created_page)
+def create_page(title, parent_page_id, cover_url='', parent_type='page', properties=None, title_property_name='Name', children=None):
+    """
+    Create a Notion page with the given title, cover and first children in a single request,
+    see page_request_arguments for the arguments.
 
-    # Return documented URL
-    return created_page["url"]
+    :return: The created Notion page object.
+    :rtype: dict
+    """
+    create_arguments = page_request_arguments(title, parent_page_id, cover_url, parent_type, properties, title_property_name, children)
+    return send(notion.pages.create, **create_arguments)
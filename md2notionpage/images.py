@@ -0,0 +1,329 @@
+"""
+images.py
+
+This module uploads the local images of a document with Notion's file upload API, so that images referenced by
+a path, such as ![Chart](./img/chart.png), show on the page instead of being sent as broken external URLs.
+
+Paths are resolved relative to the directory of the Markdown file. The files are uploaded in a thread pool
+while the blocks before them are still being prepared and sent, and each distinct file content is uploaded
+once per process: an image used by hundreds of pages published together is uploaded a single time and
+its file upload is attached to every image block showing it.
+
+Files are uploaded under their name prefixed with the start of the SHA-256 hash of their content, e.g.
+"3f79bb7b435b0532-chart.png". Notion keeps the name in the URL of the hosted file, so that a sync can tell
+whether the image of a page is still the same as the local file without uploading it again.
+
+Functions:
+    - resolve_local_images(blocks, image_dir): Yield blocks with their local images replaced by uploaded files.
+    - get_image_uploader(): Return the process-wide ImageUploader.
+    - with_file_urls(block, image_dir): Return a block with its local image paths as absolute file: URLs.
+    - source_hash(url): Return the content hash of a local file: URL or of a file uploaded by md2notionpage.
+    - local_image_hashes(markdown_text, image_dir): Return the content hashes of the local images of Markdown text.
+
+Classes:
+    - ImageUploader(workers=4): Upload files in a thread pool, deduplicated by a hash of their content.
+
+Example Usage:
+    from md2notionpage import md2notionpage
+    notion_page_url = md2notionpage(markdown_text, title, parent_page_id, image_dir="docs")
+"""
+
+import collections
+import hashlib
+import mimetypes
+import os
+import pathlib
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit, unquote
+from urllib.request import url2pathname
+from . import core, metrics
+from .ratelimit import send
+
+# Files up to 20 MB can be sent in a single part
+max_upload_bytes = 20 * 1024 * 1024
+
+# Number of hexadecimal digits of the SHA-256 hash prefixed to the names of uploaded files
+source_hash_length = 16
+uploaded_name_pattern = re.compile(r'([0-9a-f]{%d})-' % source_hash_length)
+
+def is_local_image(url):
+    """
+    Return True if an image URL is a path or a file: URL rather than a web address.
+    A URL with a host, such as the protocol-relative //example.com/chart.png, is a web address.
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme == "file":
+        return True
+    # A one letter scheme is a Windows drive
+    return len(parts.scheme) <= 1 and not parts.netloc
+
+def local_image_path(url, image_dir):
+    """
+    Return the path of the file a local image URL refers to, relative paths being taken relative to image_dir.
+    """
+    url = url.strip()
+    if url.startswith("<") and url.endswith(">"):
+        url = url[1:-1]
+    if urlsplit(url).scheme == "file":
+        return url2pathname(urlsplit(url).path)
+    path = os.path.join(image_dir, url)
+    if not os.path.exists(path) and "%" in url:
+        path = os.path.join(image_dir, unquote(url))
+    return os.path.normpath(path)
+
+def upload_file_content(filename, data):
+    """
+    Upload the content of a file in a single part, returning the ID of the file upload.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    file_upload = send(core.notion.file_uploads.create, mode="single_part", filename=filename, content_type=content_type)
+    send(core.notion.file_uploads.send, file_upload["id"], file=(filename, data, content_type))
+    return file_upload["id"]
+
+def uploaded_filename(filename, digest):
+    """
+    Return the name a file is uploaded under: its name prefixed with the start of the hexadecimal SHA-256 digest of its content.
+    """
+    return f"{digest[:source_hash_length]}-{filename}"
+
+# Content hashes of local files by path, modification time and size
+file_hashes = {}
+
+def file_source_hash(path):
+    """
+    Return the start of the SHA-256 hash of the content of a file, as prefixed to the name it is uploaded under.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = file_hashes.get(key)
+    if digest is None:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        digest = file_hashes[key] = digest.hexdigest()
+    return digest[:source_hash_length]
+
+def source_hash(url):
+    """
+    Return the content hash of the file a URL refers to, if it can be known without downloading it: that of a local file
+    given by a file: URL, or the one in the name of a file uploaded by md2notionpage. Return None otherwise.
+
+    :param url: A file: URL, or the URL of a file hosted by Notion.
+    :type url: str
+    :rtype: str
+    """
+    parts = urlsplit(url or "")
+    if parts.scheme == "file":
+        path = url2pathname(parts.path)
+        return file_source_hash(path) if os.path.isfile(path) else None
+    match = uploaded_name_pattern.match(unquote(parts.path.rsplit("/", 1)[-1]))
+    return match.group(1) if match else None
+
+def local_image_hashes(markdown_text, image_dir):
+    """
+    Return the content hashes of the local images Markdown text refers to, so that a publish key changes
+    when an image does (see publish_key).
+
+    :param markdown_text: The Markdown text.
+    :type markdown_text: str
+    :param image_dir: The directory relative image paths are resolved against.
+    :type image_dir: str
+    :return: The hash of each local image by URL, in the order of the text, None for a missing file.
+    :rtype: dict
+    """
+    hashes = {}
+    for match in core.image_pattern.finditer(markdown_text):
+        url = match.group(2)
+        if url not in hashes and is_local_image(url):
+            path = local_image_path(url, image_dir)
+            hashes[url] = file_source_hash(path) if os.path.isfile(path) else None
+    return hashes
+
+class ImageUploader:
+    """
+    Upload files in a thread pool, each distinct content once.
+
+    Uploads are keyed twice: by path, modification time and size, so that a file is read once however many
+    blocks show it, and by the SHA-256 hash of the content, so that copies of a file are uploaded once.
+    A failed upload is forgotten, so that the file is uploaded again when it is next requested.
+
+    :param workers: (Optional) Maximum number of files uploaded at the same time. Defaults to 4.
+    :type workers: int
+    """
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="md2notionpage-upload")
+        self.lock = threading.Lock()
+        self.by_path = {}
+        self.by_hash = {}
+        self.upload_count = 0
+
+    def prefetch(self, path):
+        """
+        Start uploading a file unless it is uploaded or being uploaded already.
+
+        :param path: The path of the file.
+        :type path: str
+        :return: A future of the ID of the file upload.
+        :rtype: concurrent.futures.Future
+        :raises FileNotFoundError: If the file does not exist.
+        :raises ValueError: If the file is larger than Notion accepts.
+        """
+        stat = os.stat(path)
+        if stat.st_size > max_upload_bytes:
+            raise ValueError(f"Image too large to upload: {path} ({stat.st_size} bytes, the limit is {max_upload_bytes}).")
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            future = self.by_path.get(key)
+            if future is not None:
+                return future
+            future = self.by_path[key] = self.executor.submit(self.upload_file, path)
+
+        def forget_failure(done):
+            if done.exception() is not None:
+                self.forget(self.by_path, key, done)
+
+        # Outside the lock, as the callback runs at once if the upload has already failed
+        future.add_done_callback(forget_failure)
+        return future
+
+    def upload(self, path):
+        """
+        Upload a file, or wait for its upload, returning the ID of the file upload.
+        """
+        return self.prefetch(path).result()
+
+    def upload_file(self, path):
+        stat = os.stat(path)
+        with open(path, "rb") as file:
+            data = file.read()
+        digest = hashlib.sha256(data).hexdigest()
+        # Kept for file_source_hash, so that the file is not read again for a publish key or a sync
+        file_hashes[(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)] = digest
+        with self.lock:
+            future = self.by_hash.get(digest)
+            owner = future is None
+            if owner:
+                future = self.by_hash[digest] = Future()
+        if not owner:
+            # A copy of the file is uploaded, or being uploaded, by another task
+            return future.result()
+
+        try:
+            with metrics.timed("image_upload"):
+                file_upload_id = upload_file_content(uploaded_filename(os.path.basename(path), digest), data)
+        except BaseException as e:
+            self.forget(self.by_hash, digest, future)
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.upload_count += 1
+        future.set_result(file_upload_id)
+        return file_upload_id
+
+    def forget(self, uploads, key, future):
+        with self.lock:
+            if uploads.get(key) is future:
+                del uploads[key]
+
+# Initialize the process-wide uploader (lazy initialization), shared by the pages published concurrently
+image_uploader = None
+image_uploader_lock = threading.Lock()
+
+def get_image_uploader():
+    """
+    Return the process-wide ImageUploader, creating it on first use.
+    """
+    global image_uploader
+    with image_uploader_lock:
+        if image_uploader is None:
+            image_uploader = ImageUploader()
+        return image_uploader
+
+def local_image_urls(block):
+    """
+    Yield the URLs of the local images of a block and its children.
+    """
+    if block.get("type") == "image":
+        url = (block["image"].get("external") or {}).get("url")
+        if url and is_local_image(url):
+            yield url
+    for child in core.block_children(block):
+        yield from local_image_urls(child)
+
+def with_file_urls(block, image_dir):
+    """
+    Return a copy of a block and its children with the paths of local images replaced by absolute file: URLs,
+    relative paths being resolved against image_dir. Blocks without local images are returned as they are.
+    """
+    children = core.block_children(block)
+    if children:
+        converted_children = [with_file_urls(child, image_dir) for child in children]
+        if any(converted is not child for converted, child in zip(converted_children, children)):
+            block = core.with_children(block, converted_children)
+
+    if block.get("type") != "image":
+        return block
+    url = (block["image"].get("external") or {}).get("url")
+    if not url or not is_local_image(url) or urlsplit(url).scheme == "file":
+        return block
+    file_url = pathlib.Path(os.path.abspath(local_image_path(url, image_dir))).as_uri()
+    return dict(block, image=dict(block["image"], external={"url": file_url}))
+
+def with_uploaded_images(block, uploads):
+    """
+    Return a copy of a block and its children with the local images in uploads, a mapping of URLs to futures
+    of file upload IDs, replaced by the uploaded files. Blocks without local images are returned as they are.
+    """
+    children = core.block_children(block)
+    if children:
+        uploaded_children = [with_uploaded_images(child, uploads) for child in children]
+        if any(uploaded is not child for uploaded, child in zip(uploaded_children, children)):
+            block = core.with_children(block, uploaded_children)
+
+    if block.get("type") != "image":
+        return block
+    url = (block["image"].get("external") or {}).get("url")
+    if url not in uploads:
+        return block
+    body = {key: value for key, value in block["image"].items() if key != "external"}
+    body.update(type="file_upload", file_upload={"id": uploads[url].result()})
+    return dict(block, image=body)
+
+def resolve_local_images(blocks, image_dir, uploader=None, lookahead=100):
+    """
+    Upload the local images of blocks and yield the blocks with those images replaced by the uploaded files.
+
+    The uploads of the images of a block start when the block is read, and the block is yielded once the next
+    lookahead blocks have been read too, so that uploads run in the uploader's thread pool ahead of the requests
+    that need them. A list of blocks is read whole first, so that a missing image fails before any request.
+
+    :param blocks: An iterable of Notion blocks, whose image blocks have external URLs as parsed from Markdown.
+    :type blocks: iterable
+    :param image_dir: The directory relative paths are resolved against, usually that of the Markdown file.
+    :type image_dir: str
+    :param uploader: (Optional) The ImageUploader to use. Defaults to the process-wide one of get_image_uploader.
+    :type uploader: ImageUploader
+    :param lookahead: (Optional) Number of blocks read ahead of the block yielded. Defaults to 100.
+    :type lookahead: int
+    :return: A generator of blocks.
+    :rtype: generator
+    :raises FileNotFoundError: If an image file does not exist.
+    """
+    if uploader is None:
+        uploader = get_image_uploader()
+    if isinstance(blocks, list):
+        lookahead = len(blocks)
+
+    pending = collections.deque()
+    for block in blocks:
+        uploads = {url: uploader.prefetch(local_image_path(url, image_dir)) for url in local_image_urls(block)}
+        pending.append((block, uploads))
+        if len(pending) > lookahead:
+            block, uploads = pending.popleft()
+            yield with_uploaded_images(block, uploads) if uploads else block
+    for block, uploads in pending:
+        yield with_uploaded_images(block, uploads) if uploads else block
@@ -0,0 +1,374 @@
+"""
+metrics.py
+
+This module reports where the time of a publish goes. Hooks registered with add_hooks are called for every
+stage of an upload (parsing, preparing batches, creating the page, each append, the whole upload) and for
+every API request sent (latency, status, bytes sent, blocks created, time held back by the rate limiter),
+as well as for every retry. MetricsCollector is a ready-made hook that aggregates these events and exports
+them as a JSON summary or in the Prometheus text format, e.g. for node_exporter's textfile collector.
+
+Hooks are process-wide, like the rate limiter, so that the requests of concurrent uploads are all observed.
+Nothing is measured while no hooks are registered.
+
+Classes:
+    - Hooks: Base class of instrumentation hooks, with a no-op method per event.
+    - MetricsCollector: Hooks aggregating the events into counters and durations.
+
+Functions:
+    - add_hooks(hook): Start calling a hook for every event.
+    - remove_hooks(hook): Stop calling a hook.
+
+Example Usage:
+    from md2notionpage import md2notionpage, metrics
+    collector = metrics.MetricsCollector()
+    metrics.add_hooks(collector)
+    md2notionpage(markdown_text, title, parent_page_id)
+    collector.write_prometheus("/var/lib/node_exporter/md2notionpage.prom")
+"""
+
+import contextlib
+import itertools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Hooks:
+    """
+    Base class of instrumentation hooks. Subclasses override the methods of the events they are interested in.
+
+    The methods are called from the threads that upload, so they must be thread-safe and quick.
+    An exception raised by a hook is logged and otherwise ignored.
+    """
+
+    def stage(self, name, seconds, document=None, document_id=None):
+        """
+        Called when a stage ends.
+
+        :param name: "parse", "prepare" (splitting and batching blocks, and waiting for lazily parsed blocks and
+            image uploads), "create_page", "append" (one batch, with its deferred children), "upload" (a whole
+            create_notion_page_from_blocks call or replayed page), "spool" (a page written to a spool file),
+            "image_upload" (one file) or "sync".
+        :type name: str
+        :param seconds: The duration of the stage.
+        :type seconds: float
+        :param document: The title of the page, or the ID of the page for "sync", if the stage belongs to one.
+        :type document: str
+        :param document_id: A key telling documents with the same title apart: the path of the Markdown file when the
+            command line tool publishes one, the page ID for "sync", otherwise a key unique to the upload.
+        :type document_id: str
+        """
+
+    def request(self, endpoint, status, seconds, bytes_sent, blocks, waited):
+        """
+        Called when an API request returns or fails, once per attempt.
+
+        :param endpoint: The client method, e.g. "pages.create" or "blocks.children.append".
+        :type endpoint: str
+        :param status: The HTTP status, or None if no response was received.
+        :type status: int
+        :param seconds: The time from sending the request to its response.
+        :type seconds: float
+        :param bytes_sent: The size of the request body.
+        :type bytes_sent: int
+        :param blocks: The number of blocks in the request.
+        :type blocks: int
+        :param waited: The time the request was held back by the rate limiter before it was sent.
+        :type waited: float
+        """
+
+    def retry(self, endpoint, attempt, delay, status):
+        """
+        Called when a failed request is about to be sent again.
+
+        :param endpoint: The client method, see request.
+        :type endpoint: str
+        :param attempt: The number of the retry, from 1.
+        :type attempt: int
+        :param delay: The seconds waited before the retry.
+        :type delay: float
+        :param status: The HTTP status of the failure, 429 when rate limited, or None if no response was received.
+        :type status: int
+        """
+
+# The registered hooks, replaced rather than changed so that they can be read without a lock
+hooks = ()
+hooks_lock = threading.Lock()
+
+def add_hooks(hook):
+    """
+    Start calling hook for every event, see Hooks.
+    """
+    global hooks
+    with hooks_lock:
+        hooks = hooks + (hook,)
+
+def remove_hooks(hook):
+    """
+    Stop calling a hook registered with add_hooks.
+    """
+    global hooks
+    with hooks_lock:
+        hooks = tuple(registered for registered in hooks if registered is not hook)
+
+def emit(event, *args):
+    """
+    Call the event method of every registered hook.
+    """
+    for hook in hooks:
+        try:
+            getattr(hook, event)(*args)
+        except Exception:
+            logger.exception("md2notionpage metrics hook %r failed on %s", hook, event)
+
+# Keys of the documents uploaded without one of their own, see new_document_id
+document_ids = itertools.count(1)
+
+def new_document_id():
+    """
+    Return a key unique to an upload, for the document_id of its stages.
+    """
+    return f"upload-{next(document_ids)}"
+
+@contextlib.contextmanager
+def timed(stage, document=None, document_id=None):
+    """
+    Report the duration of the with block as a stage, including when it raises.
+    """
+    if not hooks:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit("stage", stage, time.perf_counter() - start, document, document_id)
+
+def timed_iter(iterable, stage, document=None, document_id=None):
+    """
+    Yield the items of iterable, reporting the total time spent producing them as one stage once it ends.
+    """
+    if not hooks:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        emit("stage", stage, seconds, document, document_id)
+
+# Client endpoint classes whose names do not split into the attribute path at capitals
+endpoint_prefixes = {"BlocksChildrenEndpoint": "blocks.children"}
+
+def endpoint_name(request):
+    """
+    Return the name of a client method, e.g. "blocks.children.append" for notion.blocks.children.append.
+    """
+    name = getattr(request, "__name__", "request")
+    owner = type(getattr(request, "__self__", None)).__name__
+    if owner.endswith("Endpoint"):
+        prefix = endpoint_prefixes.get(owner) or re.sub(r'(?<!^)(?=[A-Z])', '_', owner[:-len("Endpoint")]).lower()
+        return f"{prefix}.{name}"
+    return name
+
+def count_request_blocks(blocks):
+    """
+    Return the number of blocks in a children array and their children.
+    """
+    count = 0
+    for block in blocks or ():
+        count += 1 + count_request_blocks((block.get(block.get("type")) or {}).get("children"))
+    return count
+
+def request_size(kwargs):
+    """
+    Return the size in bytes of the body of a request with the given keyword arguments: their compact JSON,
+    and the content of files.
+    """
+    size = 0
+    body = {}
+    for key, value in kwargs.items():
+        if isinstance(value, tuple) and len(value) >= 2 and isinstance(value[1], bytes):
+            size += len(value[1])
+        else:
+            body[key] = value
+    if body:
+        size += len(json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+    return size
+
+def request_info(request, kwargs):
+    """
+    Return the endpoint name, body size and block count of a request, measured once for all its attempts.
+    """
+    return endpoint_name(request), request_size(kwargs), count_request_blocks(kwargs.get("children"))
+
+def error_status(error):
+    """
+    Return the HTTP status of a failed request, or None if no response was received.
+    """
+    return getattr(error, "status", None)
+
+class MetricsCollector(Hooks):
+    """
+    Hooks aggregating the events into counters and durations, exportable as a JSON summary or Prometheus text.
+
+    Stage and request durations are kept as count, sum and maximum, requests by endpoint and status.
+    The time of each document, its "parse" and "upload" stages, is kept by document_id so that slow documents can be found.
+
+    :param slowest: (Optional) Number of slowest documents listed in the summary. Defaults to 10.
+    :type slowest: int
+    """
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = {}
+        self.retries = {}
+        self.documents = {}
+
+    def stage(self, name, seconds, document=None, document_id=None):
+        with self.lock:
+            add_duration(self.stages.setdefault(name, new_duration()), seconds)
+            if document is not None and name in ("parse", "upload"):
+                # Files with the same title are different documents
+                key = document_id if document_id is not None else document
+                totals = self.documents.setdefault(key, {"document": document, "id": key, "seconds": 0.0})
+                totals["seconds"] += seconds
+
+    def request(self, endpoint, status, seconds, bytes_sent, blocks, waited):
+        with self.lock:
+            totals = self.requests.setdefault((endpoint, status), dict(new_duration(), bytes=0, blocks=0, waited=0.0))
+            add_duration(totals, seconds)
+            totals["bytes"] += bytes_sent
+            totals["waited"] += waited
+            if status == 200:
+                totals["blocks"] += blocks
+
+    def retry(self, endpoint, attempt, delay, status):
+        with self.lock:
+            self.retries[(endpoint, status)] = self.retries.get((endpoint, status), 0) + 1
+
+    def summary(self):
+        """
+        Return the metrics as a JSON serializable dict.
+
+        :return: "stages" and "requests" durations (count, sum and max seconds), request "bytes", created "blocks"
+            and rate limiter "waited" seconds, "retries" and "rate_limited" counts, and the "slowest_documents"
+            with their title ("document"), "id" and "seconds".
+        :rtype: dict
+        """
+        with self.lock:
+            requests = {}
+            for (endpoint, status), totals in sorted(self.requests.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+                requests.setdefault(endpoint, {})[str(status)] = dict(totals)
+            slowest = sorted(self.documents.values(), key=lambda totals: totals["seconds"], reverse=True)[:self.slowest]
+            return {
+                "stages": {name: dict(totals) for name, totals in sorted(self.stages.items())},
+                "requests": requests,
+                "requests_total": sum(totals["count"] for totals in self.requests.values()),
+                "bytes_sent": sum(totals["bytes"] for totals in self.requests.values()),
+                "blocks_created": sum(totals["blocks"] for totals in self.requests.values()),
+                "retries": sum(self.retries.values()),
+                "rate_limited": sum(count for (_, status), count in self.retries.items() if status == 429),
+                "documents": len(self.documents),
+                "slowest_documents": [dict(totals) for totals in slowest],
+            }
+
+    def to_json(self):
+        """
+        Return the summary as JSON text.
+        """
+        return json.dumps(self.summary(), indent=2, ensure_ascii=False)
+
+    def to_prometheus(self, prefix="md2notionpage"):
+        """
+        Return the metrics in the Prometheus text exposition format.
+
+        :param prefix: (Optional) Prefix of the metric names. Defaults to "md2notionpage".
+        :type prefix: str
+        :rtype: str
+        """
+        with self.lock:
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                # Samples are (name suffix, labels, value); summaries have _sum and _count samples
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} {kind}")
+                for suffix, labels, value in samples:
+                    label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels)
+                    lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value!r}")
+
+            def request_labels(endpoint, status):
+                return [("endpoint", endpoint), ("status", "error" if status is None else str(status))]
+
+            stages = sorted(self.stages.items())
+            requests = sorted(self.requests.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            retries = sorted(self.retries.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            metric("stage_seconds", "summary", "Duration of the stages of uploads.",
+                   [sample for name, totals in stages for sample in (("_sum", [("stage", name)], totals["sum"]), ("_count", [("stage", name)], totals["count"]))])
+            metric("stage_seconds_max", "gauge", "Longest duration of a stage of an upload.",
+                   [("", [("stage", name)], totals["max"]) for name, totals in stages])
+            metric("request_seconds", "summary", "Time from sending API requests to their responses, each attempt counted.",
+                   [sample for key, totals in requests for sample in (("_sum", request_labels(*key), totals["sum"]), ("_count", request_labels(*key), totals["count"]))])
+            metric("request_seconds_max", "gauge", "Longest time from sending an API request to its response.",
+                   [("", request_labels(*key), totals["max"]) for key, totals in requests])
+            metric("request_bytes_total", "counter", "Bytes of API request bodies sent.",
+                   [("", request_labels(*key), totals["bytes"]) for key, totals in requests])
+            metric("rate_limiter_wait_seconds_total", "counter", "Time API requests were held back by the client-side rate limiter.",
+                   [("", request_labels(*key), totals["waited"]) for key, totals in requests])
+            metric("blocks_created_total", "counter", "Blocks sent in successful API requests.",
+                   [("", [("endpoint", endpoint)], totals["blocks"]) for (endpoint, status), totals in requests if status == 200])
+            metric("retries_total", "counter", "API requests sent again after a failure; status 429 when rate limited.",
+                   [("", request_labels(*key), count) for key, count in retries])
+            metric("documents_total", "counter", "Documents uploaded.", [("", [], len(self.documents))])
+            return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """
+        Write the JSON summary to a file, replacing it atomically.
+        """
+        write_atomically(path, self.to_json() + "\n")
+
+    def write_prometheus(self, path):
+        """
+        Write the metrics in the Prometheus text format to a file, replacing it atomically as the textfile collector requires.
+        """
+        write_atomically(path, self.to_prometheus())
+
+def new_duration():
+    return {"count": 0, "sum": 0.0, "max": 0.0}
+
+def add_duration(totals, seconds):
+    totals["count"] += 1
+    totals["sum"] += seconds
+    totals["max"] = max(totals["max"], seconds)
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def write_atomically(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(prefix=".md2notionpage-metrics-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
@@ -0,0 +1,634 @@
+"""
+mock_server.py
+
+This module provides a local HTTP stand-in for the parts of the Notion API that md2notionpage uses, so that
+uploads can be benchmarked, load tested and tested end to end without a Notion workspace. Pages, databases
+and blocks are kept in memory.
+
+Images and other files can be uploaded with the file upload API and attached to blocks.
+
+Requests are checked against Notion's request limits and answered with Notion's validation errors when
+they break one: 500 KB per request body, 1000 blocks per request, 100 blocks per children array, two
+levels of nested children, 100 objects per rich_text array and 2000 characters per text object.
+Every request is recorded. Responses can be delayed, requests beyond a configured rate are answered with
+429 rate_limited errors like Notion's, and a share of the requests, or the next few, can be failed.
+
+Classes:
+    - MockNotionServer: A threaded HTTP server standing in for api.notion.com.
+
+Example Usage:
+    from md2notionpage import core, md2notionpage
+    from md2notionpage.mock_server import MockNotionServer
+
+    with MockNotionServer(latency=0.05, rate_limit=3) as server:
+        core.notion = server.client()
+        notion_page_url = md2notionpage("# My Page", "My Notion Page", "parent-page-id")
+
+    The command line tool runs a stand-in with "md2notionpage serve"; point the client at it with the
+    NOTION_BASE_URL environment variable.
+"""
+
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from notion_client import Client
+from .core import client_options
+
+# Notion's request limits
+max_body_bytes = 500000
+max_request_blocks = 1000
+max_children = 100
+max_nesting = 2
+max_rich_text_objects = 100
+max_text_length = 2000
+max_url_length = 2000
+max_equation_length = 1000
+max_file_bytes = 20 * 1024 * 1024
+
+# Error code Notion answers with for each injectable failure status
+failure_codes = {
+    409: "conflict_error",
+    500: "internal_server_error",
+    502: "bad_gateway",
+    503: "service_unavailable",
+    504: "gateway_timeout",
+}
+
+
+class MockNotionServer:
+    """
+    A threaded HTTP server standing in for api.notion.com, for pages.create, pages.retrieve, pages.update,
+    databases.retrieve, blocks.retrieve, blocks.update, blocks.delete, blocks.children append and list, and
+    file_uploads create, send and retrieve. Uploaded files are kept in the files attribute by file upload ID.
+
+    :param latency: (Optional) Seconds every response is delayed by. Defaults to 0.
+    :type latency: float
+    :param jitter: (Optional) Up to this many seconds are added to the latency at random. Defaults to 0.
+    :type jitter: float
+    :param rate_limit: (Optional) Average requests per second accepted, with bursts of up to burst requests; the rest
+        are answered with 429 rate_limited and a Retry-After delay. Defaults to None, no limit.
+    :type rate_limit: float
+    :param burst: (Optional) Number of requests accepted at once under rate_limit. Defaults to 10.
+    :type burst: int
+    :param rate_limited: (Optional) Share of the requests answered with a 429 rate_limited error regardless of the rate, from 0 to 1. Defaults to 0.
+    :type rate_limited: float
+    :param retry_after: (Optional) Retry-After delay in seconds sent with the rate_limited errors. Defaults to 0.
+    :type retry_after: float
+    :param failures: (Optional) Share of the requests failed with failure_status, from 0 to 1. Defaults to 0.
+    :type failures: float
+    :param failure_status: (Optional) HTTP status of the failed requests: 409, 500, 502, 503 or 504. Defaults to 503.
+    :type failure_status: int
+    :param record: (Optional) Record every request in the requests attribute; turn off for long load tests. Defaults to True.
+    :type record: bool
+    :param seed: (Optional) Seed of the random choices of latency, rate limited and failed requests. Defaults to 0.
+    :type seed: int
+    :param host: (Optional) Address to listen on. Defaults to 127.0.0.1.
+    :type host: str
+    :param port: (Optional) Port to listen on, 0 for any free port. Defaults to 0.
+    :type port: int
+
+    Failed and rate limited requests are not carried out, so that sending them again is always safe.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=None, burst=10, rate_limited=0.0, retry_after=0.0,
+                 failures=0.0, failure_status=503, record=True, seed=0, host="127.0.0.1", port=0, clock=time.monotonic):
+        if failure_status not in failure_codes:
+            raise ValueError(f"Invalid failure_status: {failure_status!r}. Expected one of {sorted(failure_codes)}.")
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.failures = failures
+        self.failure_status = failure_status
+        self.record = record
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.scripted_failures = []
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.pages = {}
+        self.databases = {}
+        self.blocks = {}
+        self.children = {}
+        self.file_uploads = {}
+        self.files = {}
+        self.requests = []
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.failure_count = 0
+        self.rejected_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), MockNotionHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        """
+        The URL to pass as base_url to a Notion client.
+        """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Start serving in a background thread.
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="md2notionpage-mock-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self):
+        """
+        Return a Notion client sending its requests to this server.
+        """
+        # The injected errors are expected, so the client does not log them
+        return Client(**dict(client_options(), auth="secret_mock", base_url=self.base_url, log_level=logging.ERROR))
+
+    def fail_next(self, count=1, status=503):
+        """
+        Fail the next count requests with the given status, e.g. to interrupt an upload at a known point.
+        """
+        if status not in failure_codes and status != 429:
+            raise ValueError(f"Invalid status: {status!r}. Expected 429 or one of {sorted(failure_codes)}.")
+        with self.lock:
+            self.scripted_failures.extend([status] * count)
+
+    def add_database(self, title="Database", title_property="Name"):
+        """
+        Create a database whose title property is named title_property, returning its ID.
+        """
+        with self.lock:
+            database_id = self.new_id()
+            self.databases[database_id] = {
+                "object": "database",
+                "id": database_id,
+                "title": [{"type": "text", "text": {"content": title}, "plain_text": title}],
+                "properties": {title_property: {"id": "title", "name": title_property, "type": "title", "title": {}}},
+                "url": f"{self.base_url}/{database_id.replace('-', '')}",
+            }
+            return database_id
+
+    def block_count(self):
+        """
+        Return the number of blocks created on all pages.
+        """
+        with self.lock:
+            return len(self.blocks)
+
+    def stats(self):
+        """
+        Return the request counters.
+
+        :return: Numbers of "requests", "rate_limited", "failed" and "rejected" (invalid) requests, and of "blocks" created.
+        :rtype: dict
+        """
+        with self.lock:
+            return {"requests": self.request_count, "rate_limited": self.rate_limited_count, "failed": self.failure_count,
+                    "rejected": self.rejected_count, "blocks": len(self.blocks)}
+
+    def new_id(self):
+        return f"00000000-0000-4000-8000-{next(self.ids):012d}"
+
+    def store_block(self, parent_id, block):
+        """
+        Store a block and its children under parent_id, returning the block object Notion would return.
+        """
+        block_id = self.new_id()
+        block_type = block["type"]
+        body = self.stored_body(block[block_type])
+        stored = {"object": "block", "id": block_id, "parent": {"type": "block_id", "block_id": parent_id}, "type": block_type, block_type: body}
+        self.blocks[block_id] = stored
+        self.children[block_id] = [self.store_block(block_id, child)["id"] for child in block[block_type].get("children") or []]
+        return self.listed(block_id)
+
+    def stored_body(self, body):
+        """
+        Return the body of a block as stored and returned, without children and with attached uploads as hosted files.
+        """
+        body = {key: value for key, value in body.items() if key != "children"}
+        if body.get("type") == "file_upload":
+            # Attached uploads are returned as Notion hosted files
+            file_upload = self.file_uploads[body.pop("file_upload")["id"]]
+            body.update(type="file", file={"url": f"{self.base_url}/files/{file_upload['id']}/{file_upload['filename']}"})
+        return body
+
+    def check_file_uploads(self, blocks):
+        """
+        Return a message if a block attaches a file upload that does not exist or has not been sent, or None.
+        """
+        for block in blocks:
+            body = block.get(block.get("type")) or {}
+            if body.get("type") == "file_upload":
+                file_upload_id = (body.get("file_upload") or {}).get("id")
+                if (self.file_uploads.get(file_upload_id) or {}).get("status") != "uploaded":
+                    return f"Could not find file upload with ID: {file_upload_id}, or it has not been uploaded."
+            error = self.check_file_uploads(body.get("children") or [])
+            if error:
+                return error
+        return None
+
+    def create_file_upload(self, body):
+        if body.get("mode", "single_part") != "single_part":
+            return validation_error("The stand-in only accepts single_part file uploads.")
+        file_upload_id = self.new_id()
+        self.file_uploads[file_upload_id] = {
+            "object": "file_upload",
+            "id": file_upload_id,
+            "status": "pending",
+            "filename": body.get("filename") or "file",
+            "content_type": body.get("content_type"),
+            "content_length": None,
+            "upload_url": f"{self.base_url}/v1/file_uploads/{file_upload_id}/send",
+        }
+        return 200, self.file_uploads[file_upload_id]
+
+    def send_file_upload(self, file_upload_id, body):
+        file_upload = self.file_uploads.get(file_upload_id)
+        if file_upload is None:
+            return not_found(file_upload_id)
+        if file_upload["status"] != "pending":
+            return validation_error(f"File upload {file_upload_id} has status {file_upload['status']}, expected pending.")
+        sent = body.get("file")
+        if not isinstance(sent, dict):
+            return validation_error("The request should be multipart/form-data with a file field.")
+        if len(sent["data"]) > max_file_bytes:
+            return validation_error(f"The file is larger than {max_file_bytes} bytes.")
+        self.files[file_upload_id] = sent["data"]
+        file_upload.update(status="uploaded", content_length=len(sent["data"]), content_type=file_upload["content_type"] or sent["content_type"])
+        return 200, file_upload
+
+    def listed(self, block_id):
+        return dict(self.blocks[block_id], has_children=bool(self.children[block_id]))
+
+    def create_page(self, body):
+        parent = body.get("parent") or {}
+        properties = body.get("properties") or {}
+        if "database_id" in parent:
+            database = self.databases.get(parent["database_id"])
+            if database is None:
+                return not_found(parent["database_id"])
+            for name in properties:
+                if name not in database["properties"]:
+                    return validation_error(f"{name} is not a property that exists.")
+        elif "page_id" not in parent:
+            return validation_error("body.parent.page_id should be defined, instead was `undefined`.")
+        error = validate_children(body.get("children") or []) or self.check_file_uploads(body.get("children") or [])
+        if error:
+            return validation_error(error)
+
+        page_id = self.new_id()
+        page = {
+            "object": "page",
+            "id": page_id,
+            "url": f"{self.base_url}/{page_id.replace('-', '')}",
+            "parent": parent,
+            "properties": properties,
+            "cover": body.get("cover"),
+            "in_trash": False,
+        }
+        self.pages[page_id] = page
+        self.children[page_id] = []
+        for block in body.get("children") or []:
+            self.children[page_id].append(self.store_block(page_id, block)["id"])
+        return 200, page
+
+    def update_page(self, page_id, body):
+        page = self.pages.get(page_id)
+        if page is None:
+            return not_found(page_id)
+        page["properties"] = dict(page["properties"], **(body.get("properties") or {}))
+        for key in ("cover", "icon", "in_trash"):
+            if key in body:
+                page[key] = body[key]
+        if "archived" in body:
+            page["in_trash"] = body["archived"]
+        return 200, page
+
+    def append_children(self, parent_id, body):
+        if parent_id not in self.children:
+            return not_found(parent_id)
+        error = validate_children(body.get("children") or []) or self.check_file_uploads(body.get("children") or [])
+        if error:
+            return validation_error(error)
+        parent = self.blocks.get(parent_id)
+        if parent is not None and parent["type"] == "table":
+            error = validate_table_rows(body.get("children") or [], parent["table"]["table_width"], "body.children")
+            if error:
+                return validation_error(error)
+        siblings = self.children[parent_id]
+        if body.get("after"):
+            if body["after"] not in siblings:
+                return validation_error(f"Block {body['after']} is not a child of {parent_id}.")
+            index = siblings.index(body["after"]) + 1
+        elif (body.get("position") or {}).get("type") == "start":
+            index = 0
+        else:
+            index = len(siblings)
+        results = [self.store_block(parent_id, block) for block in body.get("children") or []]
+        siblings[index:index] = [block["id"] for block in results]
+        return 200, {"object": "list", "results": results, "next_cursor": None, "has_more": False}
+
+    def list_children(self, parent_id, query):
+        if parent_id not in self.children:
+            return not_found(parent_id)
+        start = int(query.get("start_cursor", ["0"])[0])
+        page_size = min(int(query.get("page_size", ["100"])[0]), 100)
+        ids = self.children[parent_id]
+        results = [self.listed(block_id) for block_id in ids[start:start + page_size]]
+        more = start + page_size < len(ids)
+        return 200, {"object": "list", "results": results, "next_cursor": str(start + page_size) if more else None, "has_more": more}
+
+    def update_block(self, block_id, body):
+        block = self.blocks.get(block_id)
+        if block is None:
+            return not_found(block_id)
+        block_type = block["type"]
+        if block_type in body:
+            update = {"type": block_type, block_type: body[block_type] or {}}
+            error = validate_block(update) or self.check_file_uploads([update])
+            if error:
+                return validation_error(error)
+            stored = block[block_type]
+            if "type" in update[block_type]:
+                # A new file replaces the old one
+                stored = {key: value for key, value in stored.items() if key not in ("type", "external", "file", "file_upload")}
+            block[block_type] = dict(stored, **self.stored_body(update[block_type]))
+        return 200, self.listed(block_id)
+
+    def delete_block(self, block_id):
+        if block_id not in self.blocks:
+            return not_found(block_id)
+        for siblings in self.children.values():
+            if block_id in siblings:
+                siblings.remove(block_id)
+                break
+        return 200, dict(self.listed(block_id), in_trash=True)
+
+    def route(self, method, url, body):
+        match = route_pattern.match(url.path)
+        if match is None:
+            return invalid_url(method, url.path)
+        resource, object_id, children = match.groups()
+        if resource == "pages":
+            if method == "POST" and not object_id:
+                return self.create_page(body)
+            if method == "GET" and object_id and object_id in self.pages:
+                return 200, self.pages[object_id]
+            if method == "GET" and object_id:
+                return not_found(object_id)
+            if method == "PATCH" and object_id:
+                return self.update_page(object_id, body)
+        elif resource == "file_uploads":
+            if method == "POST" and not object_id:
+                return self.create_file_upload(body)
+            if method == "POST" and object_id and children == "/send":
+                return self.send_file_upload(object_id, body)
+            if method == "GET" and object_id and not children:
+                return (200, self.file_uploads[object_id]) if object_id in self.file_uploads else not_found(object_id)
+        elif resource == "databases" and method == "GET" and object_id and not children:
+            return (200, self.databases[object_id]) if object_id in self.databases else not_found(object_id)
+        elif resource == "blocks" and object_id and children != "/send":
+            if children and method == "PATCH":
+                return self.append_children(object_id, body)
+            if children and method == "GET":
+                return self.list_children(object_id, parse_qs(url.query))
+            if method == "GET" and not children:
+                return (200, self.listed(object_id)) if object_id in self.blocks else not_found(object_id)
+            if method == "PATCH" and not children:
+                return self.update_block(object_id, body)
+            if method == "DELETE" and not children:
+                return self.delete_block(object_id)
+        return invalid_url(method, url.path)
+
+    def admit(self):
+        """
+        Decide whether a request is carried out, returning the status, error and headers of an injected
+        failure or of a rate limited request, or None.
+        """
+        if self.scripted_failures:
+            status = self.scripted_failures.pop(0)
+        elif self.failures and self.random.random() < self.failures:
+            status = self.failure_status
+        else:
+            status = None
+        if status == 429 or (status is None and self.rate_limited and self.random.random() < self.rate_limited):
+            self.rate_limited_count += 1
+            return rate_limited_error(self.retry_after)
+        if status is not None:
+            self.failure_count += 1
+            return status, error_object(status, failure_codes[status], "Injected failure."), {}
+
+        if self.rate_limit:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate_limit)
+            self.updated = now
+            if self.tokens < 1:
+                self.rate_limited_count += 1
+                # Notion sends whole seconds
+                return rate_limited_error(math.ceil((1 - self.tokens) / self.rate_limit))
+            self.tokens -= 1
+        return None
+
+    def handle(self, method, path, body, size=0):
+        """
+        Answer one API request, returning the status code, the response object and any extra headers.
+        """
+        if self.latency or self.jitter:
+            with self.lock:
+                delay = self.latency + self.random.uniform(0, self.jitter)
+            time.sleep(delay)
+        with self.lock:
+            self.request_count += 1
+            url = urlsplit(path)
+            outcome = self.admit()
+            if outcome is None and size > max_body_bytes:
+                outcome = validation_error(f"Request body too large: {size} bytes, the limit is {max_body_bytes}.") + ({},)
+            if outcome is None:
+                outcome = self.route(method, url, body) + ({},)
+            status = outcome[0]
+            if status == 400:
+                self.rejected_count += 1
+            if self.record:
+                self.requests.append({"method": method, "path": url.path, "body": body, "status": status})
+            return outcome
+
+route_pattern = re.compile(r'^/v1/(pages|databases|blocks|file_uploads)(?:/([^/]+))?(/children|/send)?/?$')
+
+def error_object(status, code, message):
+    """
+    Return a Notion error response object.
+    """
+    return {"object": "error", "status": status, "code": code, "message": message}
+
+def not_found(object_id):
+    return 404, error_object(404, "object_not_found", f"Could not find block, page or database with ID: {object_id}.")
+
+def invalid_url(method, path):
+    return 400, error_object(400, "invalid_request_url", f"Invalid request URL: {method} {path}.")
+
+def validation_error(message):
+    return 400, error_object(400, "validation_error", message)
+
+def rate_limited_error(retry_after):
+    return 429, error_object(429, "rate_limited", "You have been rate limited. Please try again in a few minutes."), {"Retry-After": str(retry_after)}
+
+def validate_rich_text(rich_text, where):
+    """
+    Return a message describing how a rich_text array breaks Notion's limits, or None.
+    """
+    if len(rich_text) > max_rich_text_objects:
+        return f"{where}.length should be ≤ `{max_rich_text_objects}`, instead was `{len(rich_text)}`."
+    for i, seg in enumerate(rich_text):
+        if seg.get("type", "text") == "text":
+            text = seg.get("text") or {}
+            if len(text.get("content") or "") > max_text_length:
+                return f"{where}[{i}].text.content.length should be ≤ `{max_text_length}`, instead was `{len(text['content'])}`."
+            if len((text.get("link") or {}).get("url") or "") > max_url_length:
+                return f"{where}[{i}].text.link.url.length should be ≤ `{max_url_length}`."
+        elif seg.get("type") == "equation":
+            expression = (seg.get("equation") or {}).get("expression") or ""
+            if len(expression) > max_equation_length:
+                return f"{where}[{i}].equation.expression.length should be ≤ `{max_equation_length}`, instead was `{len(expression)}`."
+    return None
+
+def validate_block(block, where="body"):
+    """
+    Return a message describing how a block, without its children, breaks Notion's limits, or None.
+    """
+    block_type = block.get("type")
+    body = block.get(block_type)
+    if not block_type or not isinstance(body, dict):
+        return f"{where} should have a type and a matching block object."
+    for key in ("rich_text", "caption"):
+        if key in body:
+            error = validate_rich_text(body[key] or [], f"{where}.{block_type}.{key}")
+            if error:
+                return error
+    for i, cell in enumerate(body.get("cells") or []):
+        error = validate_rich_text(cell, f"{where}.{block_type}.cells[{i}]")
+        if error:
+            return error
+    if block_type == "equation" and len(body.get("expression") or "") > max_equation_length:
+        return f"{where}.equation.expression.length should be ≤ `{max_equation_length}`, instead was `{len(body['expression'])}`."
+    if len((body.get("external") or {}).get("url") or "") > max_url_length:
+        return f"{where}.{block_type}.external.url.length should be ≤ `{max_url_length}`."
+    return None
+
+def validate_table_rows(rows, table_width, where):
+    """
+    Return a message describing how blocks break the rules of the rows of a table of table_width columns, or None.
+    """
+    for i, row in enumerate(rows):
+        if row.get("type") != "table_row":
+            return f"{where}[{i}] should be a table_row, instead was `{row.get('type')}`."
+        if len(row["table_row"].get("cells") or []) != table_width:
+            return f"{where}[{i}].table_row.cells.length should be `{table_width}`, the table_width of the table."
+    return None
+
+def validate_children(blocks, depth=0, where="body.children", counter=None):
+    """
+    Return a message describing how the blocks of one request break Notion's limits, or None.
+    """
+    if counter is None:
+        counter = [0]
+    if len(blocks) > max_children:
+        return f"{where}.length should be ≤ `{max_children}`, instead was `{len(blocks)}`."
+    for i, block in enumerate(blocks):
+        if block.get("type") == "table":
+            # A table is created with at least one of its rows
+            rows = block["table"].get("children") or []
+            error = validate_table_rows(rows, block["table"].get("table_width"), f"{where}[{i}].table.children") if rows else f"{where}[{i}].table.children should be defined."
+            if error:
+                return error
+        counter[0] += 1
+        if counter[0] > max_request_blocks:
+            return f"The request contains more than {max_request_blocks} blocks."
+        error = validate_block(block, f"{where}[{i}]")
+        if error:
+            return error
+        children = (block.get(block.get("type")) or {}).get("children") or []
+        if children:
+            if depth >= max_nesting:
+                return f"{where}[{i}] has children nested more than {max_nesting} levels deep."
+            error = validate_children(children, depth + 1, f"{where}[{i}].{block['type']}.children", counter)
+            if error:
+                return error
+    return None
+
+def parse_form_data(content_type, content):
+    """
+    Parse a multipart/form-data body into a dict of field values, file fields being dicts of filename, content_type and data.
+    """
+    message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + content)
+    form = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        data = part.get_payload(decode=True)
+        if part.get_filename() is None:
+            form[name] = data.decode("utf-8")
+        else:
+            form[name] = {"filename": part.get_filename(), "content_type": part.get_content_type(), "data": data}
+    return form
+
+class MockNotionHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of MockNotionServer, passing each request to the server's handle method.
+    """
+
+    # Keep-alive connections, with headers and body not held back by Nagle's algorithm
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        content = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type") or ""
+        if content_type.startswith("multipart/form-data"):
+            # Files are not JSON and do not count towards the size limit of request bodies
+            body, length = parse_form_data(content_type, content), 0
+        else:
+            body = json.loads(content) if content else {}
+        status, response, headers = self.server.mock.handle(self.command, self.path, body, length)
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = respond
+
+    def log_message(self, format, *args):
+        # Load tests send thousands of requests
+        pass
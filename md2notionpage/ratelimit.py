@@ -0,0 +1,291 @@
+"""
+ratelimit.py
+
+This module provides client-side rate limiting and retries for the Notion API. All requests sent by md2notionpage
+go through one token bucket shared by the whole process, so that concurrent uploads together stay within Notion's
+average of about three requests per second. When Notion still answers 429 rate_limited, the Retry-After header is
+honored, the request is retried and the rate is lowered, then raised again gradually as requests succeed.
+Transient failures (502/503, dropped connections, and for idempotent requests also 500/504 and timeouts) are
+retried with jittered exponential back-off.
+
+Classes:
+    - RateLimiter(rate, burst): A thread-safe token bucket with adaptive back-off.
+    - RetryPolicy(max_retries, base_delay, max_delay): How often and how long to wait when retrying a request.
+
+Functions:
+    - set_rate_limit(rate, burst): Replace the process-wide rate limiter, or disable it with rate=None.
+    - set_retry_policy(max_retries, base_delay, max_delay): Replace the process-wide retry policy.
+    - send(request, *args, idempotent=False, **kwargs): Call a Notion client method with rate limiting and retries.
+    - send_async(request, *args, idempotent=False, **kwargs): Await an AsyncClient method with rate limiting and retries.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import httpx
+from notion_client.errors import APIResponseError, APIErrorCode, HTTPResponseError, RequestTimeoutError
+from . import metrics
+
+
+class RateLimiter:
+    """
+    A token bucket refilled at rate tokens per second and holding at most burst tokens.
+
+    Each request takes one token; a request finding the bucket empty is told how long to wait, and
+    later requests queue up behind it. After a 429 the rate is halved (down to min_rate) and all
+    requests wait for the Retry-After delay; every success then raises the rate by recovery
+    requests per second until it is back at the configured rate.
+
+    :param rate: Average requests per second. Defaults to 3, Notion's documented average.
+    :type rate: float
+    :param burst: Maximum number of requests sent without waiting. Defaults to 10.
+    :type burst: int
+    :param min_rate: Lowest rate the adaptive back-off goes down to. Defaults to 0.5.
+    :type min_rate: float
+    :param recovery: Requests per second added back to the rate for each successful request. Defaults to 0.1.
+    :type recovery: float
+    """
+
+    def __init__(self, rate=3.0, burst=10, min_rate=0.5, recovery=0.1, clock=time.monotonic):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self.recovery = recovery
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return the number of seconds to wait before sending the request.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Wait without blocking the event loop until a request may be sent.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def rate_limited(self, retry_after=None):
+        """
+        Record a 429 response: lower the rate and hold all requests for retry_after seconds
+        (or one request interval at the lowered rate when Notion did not say).
+        """
+        with self.lock:
+            now = self.clock()
+            self.rate = max(self.min_rate, self.rate / 2)
+            delay = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, now + delay)
+            # Nothing saved up before the 429 may be spent in a burst after it
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = now
+
+    def succeeded(self):
+        """
+        Record a successful request, raising a lowered rate back toward the configured rate.
+        """
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.recovery)
+
+
+class RetryPolicy:
+    """
+    Retry a failed request up to max_retries times, waiting a random time between zero and
+    base_delay * 2 ** attempt seconds (at most max_delay) before each retry.
+    """
+
+    def __init__(self, max_retries=5, base_delay=0.5, max_delay=30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """
+        Return the jittered delay in seconds before retry number attempt + 1.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+# Process-wide rate limiter and retry policy shared by all requests
+
+rate_limiter = RateLimiter()
+retry_policy = RetryPolicy()
+
+def set_rate_limit(rate=3.0, burst=10, **kwargs):
+    """
+    Replace the process-wide rate limiter with a new RateLimiter(rate, burst, **kwargs).
+
+    :param rate: Average requests per second, or None to disable rate limiting.
+    :type rate: float
+    :param burst: Maximum number of requests sent without waiting.
+    :type burst: int
+    """
+    global rate_limiter
+    rate_limiter = RateLimiter(rate, burst, **kwargs) if rate is not None else None
+
+def set_retry_policy(max_retries=5, base_delay=0.5, max_delay=30.0):
+    """
+    Replace the process-wide retry policy. Use max_retries=0 to disable retries.
+    """
+    global retry_policy
+    retry_policy = RetryPolicy(max_retries, base_delay, max_delay)
+
+def is_rate_limited(error):
+    """
+    Return True if error is Notion's 429 rate_limited response.
+    """
+    return isinstance(error, APIResponseError) and error.code == APIErrorCode.RateLimited
+
+# Responses telling that the request was not carried out, so that it is safe to send it again
+retry_statuses = {409, 502, 503}
+# Responses after which a request may or may not have been carried out
+retry_statuses_idempotent = {500, 504}
+
+def is_transient(error, idempotent=False):
+    """
+    Return True if a request that failed with error may succeed when sent again.
+
+    Requests that are not idempotent, such as appending blocks, are only retried when the
+    error shows that Notion did not carry them out.
+    """
+    if isinstance(error, HTTPResponseError):
+        return error.status in retry_statuses or (idempotent and error.status in retry_statuses_idempotent)
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, (RequestTimeoutError, httpx.TransportError)):
+        return idempotent
+    return False
+
+def retry_after_seconds(error):
+    """
+    Return the delay requested by the Retry-After header of an API error in seconds, or None.
+    Both delta-seconds and HTTP-date values are understood.
+    """
+    headers = getattr(error, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def retry_delay(error, attempt, idempotent, limiter):
+    """
+    Return the number of seconds to wait before retrying a request that failed with error,
+    or None if it must not be retried.
+    """
+    if attempt >= retry_policy.max_retries:
+        return None
+    if is_rate_limited(error):
+        retry_after = retry_after_seconds(error)
+        if limiter is not None:
+            # The limiter holds back this and every other request
+            limiter.rate_limited(retry_after)
+            return 0.0
+        return retry_after if retry_after is not None else retry_policy.backoff(attempt)
+    if is_transient(error, idempotent):
+        return retry_policy.backoff(attempt)
+    return None
+
+def send(request, *args, idempotent=False, **kwargs):
+    """
+    Call a Notion client method, e.g. notion.pages.create, through the process-wide rate limiter,
+    retrying rate limited requests and transient failures.
+
+    :param request: The client method to call with the remaining arguments.
+    :type request: callable
+    :param idempotent: (Optional) Whether sending the request twice has the same effect as sending it once,
+        which allows retrying it after failures that leave its outcome unknown. Defaults to False.
+    :type idempotent: bool
+    :return: The response of the request.
+
+    Every attempt is reported to the metrics hooks, if any are registered (see metrics.py).
+    """
+    # Measured once, and only when observed
+    info = metrics.request_info(request, kwargs) if metrics.hooks else None
+    attempt = 0
+    while True:
+        limiter = rate_limiter
+        queued = time.perf_counter()
+        if limiter is not None:
+            limiter.acquire()
+        sent = time.perf_counter()
+        try:
+            response = request(*args, **kwargs)
+        except Exception as e:
+            if info is not None:
+                metrics.emit("request", info[0], metrics.error_status(e), time.perf_counter() - sent, info[1], info[2], sent - queued)
+            delay = retry_delay(e, attempt, idempotent, limiter)
+            if delay is None:
+                raise
+            attempt += 1
+            if info is not None:
+                metrics.emit("retry", info[0], attempt, delay, metrics.error_status(e))
+            if delay > 0:
+                time.sleep(delay)
+            continue
+        if info is not None:
+            metrics.emit("request", info[0], 200, time.perf_counter() - sent, info[1], info[2], sent - queued)
+        if limiter is not None:
+            limiter.succeeded()
+        return response
+
+async def send_async(request, *args, idempotent=False, **kwargs):
+    """
+    Await a Notion AsyncClient method through the process-wide rate limiter, see send.
+    """
+    info = metrics.request_info(request, kwargs) if metrics.hooks else None
+    attempt = 0
+    while True:
+        limiter = rate_limiter
+        queued = time.perf_counter()
+        if limiter is not None:
+            await limiter.acquire_async()
+        sent = time.perf_counter()
+        try:
+            response = await request(*args, **kwargs)
+        except Exception as e:
+            if info is not None:
+                metrics.emit("request", info[0], metrics.error_status(e), time.perf_counter() - sent, info[1], info[2], sent - queued)
+            delay = retry_delay(e, attempt, idempotent, limiter)
+            if delay is None:
+                raise
+            attempt += 1
+            if info is not None:
+                metrics.emit("retry", info[0], attempt, delay, metrics.error_status(e))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            continue
+        if info is not None:
+            metrics.emit("request", info[0], 200, time.perf_counter() - sent, info[1], info[2], sent - queued)
+        if limiter is not None:
+            limiter.succeeded()
+        return response
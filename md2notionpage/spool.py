@@ -0,0 +1,437 @@
+"""
+spool.py
+
+This module writes the requests of an upload to a file instead of sending them, and replays such a file later.
+Parsing, splitting and batching, the CPU-heavy part of publishing, can then run on a build machine without
+network access, while the upload runs from a host that can reach Notion; a failed upload is replayed
+without parsing the documents again.
+
+A spool is newline-delimited JSON: a header line, then one line per request in the order the upload sends them.
+Each request holds the exact keyword arguments of pages.create or blocks.children.append. The IDs of the page
+and of the blocks whose children are appended later are not known until the requests are sent, so they are
+written as references ("page-1", "page-1/7"), which the replay maps to the IDs Notion returns:
+
+    {"op": "spool", "version": 1}
+    {"op": "pages.create", "page": "page-1", "title": "Title", "image_dir": null, "args": {"parent": ..., "children": [...]}}
+    {"op": "blocks.children.append", "page": "page-1", "block_id": "page-1", "level": 0, "args": {"children": [...]}, "refs": [null, "page-1/1"]}
+    {"op": "blocks.children.append", "page": "page-1", "block_id": "page-1/1", "level": 1, "args": {"children": [...]}}
+
+refs names the created blocks, in the order of the children, whose own children follow in requests of the next level.
+
+A replay can record its progress in a second file, one line per request sent with the IDs it created, and one line
+per finished page. Replaying the spool again with the same progress file skips the finished pages and the requests
+already sent, so that an interrupted replay resumes where it stopped instead of creating the pages again:
+
+    {"op": "progress", "version": 1}
+    {"request": 1, "ids": {"page-1": "..."}, "url": "https://www.notion.so/..."}
+    {"request": 2, "ids": {"page-1/1": "..."}}
+    {"page": "page-1", "url": "https://www.notion.so/..."}
+
+Requests are numbered in the order of the spool, so a progress file belongs to the spool it was written for.
+
+Classes:
+    - SpoolWriter(path_or_file): Write the requests of uploads to a spool file, safe to share between threads.
+    - ReplayProgress(path): The requests and pages of a spool already sent, safe to share between threads.
+
+Functions:
+    - iter_spool(path_or_file): Yield the requests of a spool file.
+    - replay_spool(path_or_file, workers=4, nested_workers=4, image_dir=None, progress=None): Send the requests of a spool file.
+
+Example Usage:
+    from md2notionpage import md2notionpage
+    from md2notionpage.spool import SpoolWriter, replay_spool
+    with SpoolWriter("out.ndjson") as spool:
+        md2notionpage(markdown_text, title, parent_page_id, spool=spool)
+    # Later, on a host with access to Notion
+    for title, url in replay_spool("out.ndjson", progress="out.progress"):
+        print(title, url)
+"""
+
+import itertools
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from . import core, metrics
+from .images import resolve_local_images
+from .ratelimit import send
+
+spool_version = 1
+progress_version = 1
+
+class SpoolWriter:
+    """
+    Write the requests of uploads to a spool file, one JSON object per line.
+
+    The requests of a page are written together once all of them are built: each page is a contiguous run
+    of lines, and a page that fails while its blocks are built or parsed is not written at all.
+
+    :param path_or_file: The path of the spool file, which is created or overwritten, or a text file object.
+    :type path_or_file: str or file
+    """
+
+    def __init__(self, path_or_file):
+        if isinstance(path_or_file, str):
+            self.file = open(path_or_file, "w", encoding="utf-8")
+            self.owns_file = True
+        else:
+            self.file = path_or_file
+            self.owns_file = False
+        self.lock = threading.Lock()
+        self.page_count = 0
+        self.request_count = 0
+        self.write({"op": "spool", "version": spool_version})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close the spool file if the writer opened it, or flush it otherwise.
+        """
+        with self.lock:
+            if self.owns_file:
+                self.file.close()
+            else:
+                self.file.flush()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def write_page(self, create_arguments, batches, title=None, image_dir=None):
+        """
+        Write the requests that create a page, see create_notion_page_from_blocks.
+
+        The requests are built before any of them is written, so that a page whose blocks fail to parse leaves
+        nothing in the spool, and so that pages of other threads are parsed meanwhile: only the writing is serialized.
+
+        :param create_arguments: The keyword arguments of pages.create (see page_request_arguments), whose children are
+            replaced by the first batch.
+        :type create_arguments: dict
+        :param batches: The batches of (block, deferred children) pairs of iter_upload_batches with plain_first_batch=True.
+        :type batches: iterable
+        :param title: (Optional) The title of the page, reported by the replay.
+        :type title: str
+        :param image_dir: (Optional) The directory local images are resolved against when the requests are replayed.
+        :type image_dir: str
+        :return: The reference of the page in the spool.
+        :rtype: str
+        """
+        with self.lock:
+            self.page_count += 1
+            page = f"page-{self.page_count}"
+        counter = itertools.count(1)
+        batches = iter(batches)
+
+        # The first batch is sent along with the page itself
+        children = core.to_notion_blocks(block for block, _ in next(batches, []))
+        records = [{"op": "pages.create", "page": page, "title": title, "image_dir": image_dir,
+                    "args": dict(create_arguments, children=children)}]
+        for batch in batches:
+            jobs = self.append_record(records, page, page, 0, batch, counter)
+            # Deferred children level by level, as replay_deferred sends them
+            level = 1
+            while jobs:
+                next_jobs = []
+                for parent, blocks in jobs:
+                    for deferred_batch in core.iter_upload_batches(blocks):
+                        next_jobs.extend(self.append_record(records, page, parent, level, deferred_batch, counter))
+                jobs = next_jobs
+                level += 1
+
+        with self.lock:
+            for record in records:
+                self.write(record)
+            self.request_count += len(records)
+            self.file.flush()
+        return page
+
+    def append_record(self, records, page, block_id, level, batch, counter):
+        """
+        Add a blocks.children.append request to records, returning (reference, blocks) jobs for the deferred children of its blocks.
+        """
+        refs = [f"{page}/{next(counter)}" if deferred else None for _, deferred in batch]
+        record = {"op": "blocks.children.append", "page": page, "block_id": block_id, "level": level,
+                  "args": {"children": core.to_notion_blocks(block for block, _ in batch)}}
+        if any(refs):
+            record["refs"] = refs
+        records.append(record)
+        return [(ref, deferred) for ref, (_, deferred) in zip(refs, batch) if deferred]
+
+class ReplayProgress:
+    """
+    The requests and pages of a spool already sent by earlier replays, appended to a progress file as they are sent.
+
+    :param path: The path of the progress file. It is created if it does not exist, and read and appended to otherwise.
+    :type path: str
+    :raises ValueError: If the file is not a progress file of a supported version.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        # Numbers of the requests sent, IDs of the references they created, URLs of the created pages
+        self.requests = set()
+        self.ids = {}
+        self.urls = {}
+        self.finished = {}
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "r", encoding="utf-8") as file:
+                self.load(file, path)
+        self.file = open(path, "a", encoding="utf-8")
+        if not exists:
+            self.write({"op": "progress", "version": progress_version})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def load(self, file, path):
+        header = None
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The last line of a replay that was killed while writing it
+                break
+            if header is None:
+                header = record
+                if header.get("op") != "progress" or header.get("version") != progress_version:
+                    raise ValueError(f"Not a replay progress file of version {progress_version}: {path}")
+            elif "request" in record:
+                self.requests.add(record["request"])
+                self.ids.update(record["ids"])
+                if "url" in record:
+                    self.urls.update((ref, record["url"]) for ref in record["ids"])
+            else:
+                self.finished[record["page"]] = record["url"]
+
+    def write(self, record):
+        # Flushed line by line, so that a killed replay loses at most the request being sent
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def sent(self, number, ids, url=None):
+        """
+        Record that request number was sent, creating the given IDs (and page URL).
+        """
+        record = {"request": number, "ids": ids}
+        if url is not None:
+            record["url"] = url
+        with self.lock:
+            self.requests.add(number)
+            self.ids.update(ids)
+            if url is not None:
+                self.urls.update((ref, url) for ref in ids)
+            self.write(record)
+
+    def finish(self, page, url):
+        """
+        Record that all the requests of a page were sent.
+        """
+        with self.lock:
+            self.finished[page] = url
+            self.write({"page": page, "url": url})
+
+def iter_spool(path_or_file):
+    """
+    Yield the requests of a spool file one at a time, without reading the whole file.
+
+    :param path_or_file: The path of the spool file, or a text file object.
+    :type path_or_file: str or file
+    :return: A generator of request dicts.
+    :rtype: generator
+    :raises ValueError: If the file is not a spool of a supported version.
+    """
+    if isinstance(path_or_file, str):
+        with open(path_or_file, "r", encoding="utf-8") as file:
+            yield from iter_spool(file)
+        return
+
+    header = None
+    for line in path_or_file:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if header is None:
+            header = record
+            if header.get("op") != "spool" or header.get("version") != spool_version:
+                raise ValueError(f"Not a spool file of version {spool_version}: {line.strip()[:100]!r}")
+            continue
+        yield record
+
+def replay_request(record, ids, image_dir=None, progress=None):
+    """
+    Send a blocks.children.append request of a spool, recording the IDs of the created blocks its refs name.
+    A request the progress already holds is not sent again.
+    """
+    if progress is not None and record.get("request") in progress.requests:
+        return
+    args = record["args"]
+    if image_dir is not None:
+        args = dict(args, children=list(resolve_local_images(args["children"], image_dir)))
+    response = send(core.notion.blocks.children.append, ids[record["block_id"]], **args)
+    created = {}
+    for ref, result in zip(record.get("refs", ()), response["results"]):
+        if ref is not None:
+            created[ref] = result["id"]
+    ids.update(created)
+    if progress is not None and "request" in record:
+        progress.sent(record["request"], created)
+
+def replay_deferred(records, ids, workers=4, image_dir=None, progress=None):
+    """
+    Send the requests appending deferred children level by level. The requests for different parents are sent
+    in parallel, and those for one parent in order.
+    """
+    if not records:
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _, level_records in itertools.groupby(records, key=lambda record: record["level"]):
+            by_parent = {}
+            for record in level_records:
+                by_parent.setdefault(record["block_id"], []).append(record)
+
+            def replay_parent(parent_records):
+                for record in parent_records:
+                    replay_request(record, ids, image_dir, progress)
+
+            # list() waits for the level and raises the first failure
+            list(executor.map(replay_parent, by_parent.values()))
+
+def replay_page(records, nested_workers=4, image_dir=None, progress=None):
+    """
+    Send the requests of one page of a spool, returning the URL of the created page.
+
+    :param records: An iterator of the requests of the page, starting with its pages.create request.
+    :type records: iterator
+    :param progress: (Optional) The requests already sent, which are skipped, and where the requests sent are recorded.
+    :type progress: ReplayProgress
+    """
+    create = next(records)
+    if create.get("op") != "pages.create":
+        raise ValueError(f"Expected a pages.create request, got {create.get('op')!r}.")
+    title = create.get("title")
+    if image_dir is None:
+        image_dir = create.get("image_dir")
+
+    # Pages of the spool with the same title are told apart by their reference
+    document_id = create["page"]
+    with metrics.timed("upload", title, document_id):
+        args = create["args"]
+        if image_dir is not None:
+            args = dict(args, children=list(resolve_local_images(args["children"], image_dir)))
+        if progress is not None and create.get("request") in progress.requests:
+            # Created by an earlier replay, which stopped before the page was finished
+            created_page = {"id": progress.ids[document_id], "url": progress.urls[document_id]}
+            ids = dict(progress.ids)
+        else:
+            with metrics.timed("create_page", title, document_id):
+                created_page = send(core.notion.pages.create, **args)
+            ids = {document_id: created_page["id"]}
+            if progress is not None and "request" in create:
+                progress.sent(create["request"], {document_id: created_page["id"]}, created_page["url"])
+
+        deferred = []
+        append = None
+        for record in itertools.chain(records, [None]):
+            if record is not None and record["level"] > 0:
+                deferred.append(record)
+                continue
+            # A batch of the page is appended along with the deferred children that follow it
+            if append is not None:
+                with metrics.timed("append", title, document_id):
+                    replay_request(append, ids, image_dir, progress)
+                    replay_deferred(deferred, ids, nested_workers, image_dir, progress)
+            append, deferred = record, []
+
+    if progress is not None:
+        progress.finish(document_id, created_page["url"])
+    return created_page["url"]
+
+def replay_spool(path_or_file, workers=4, nested_workers=4, image_dir=None, return_exceptions=False, progress=None):
+    """
+    Send the requests of a spool file, mapping the references of the spool to the IDs of the created page and blocks.
+
+    The file is streamed: the pages are replayed concurrently as they are read, each request is rate limited and retried
+    like those of create_notion_page_from_md (see ratelimit.py), and deferred children are appended in parallel.
+
+    :param path_or_file: The path of the spool file written by SpoolWriter, or a text file object.
+    :type path_or_file: str or file
+    :param workers: (Optional) Maximum number of pages replayed at the same time. Defaults to 4.
+    :type workers: int
+    :param nested_workers: (Optional) Maximum number of blocks whose deferred children are appended at the same time. Defaults to 4.
+    :type nested_workers: int
+    :param image_dir: (Optional) The directory local images are resolved against, instead of the one recorded when the spool
+        was written, e.g. when the images were copied along with the spool to another host.
+    :type image_dir: str
+    :param return_exceptions: (Optional) Return the exception of a failed page in place of its URL instead of
+        raising the first one. Defaults to False.
+    :type return_exceptions: bool
+    :param progress: (Optional) The path of a progress file, see ReplayProgress, or a ReplayProgress. The pages it
+        records as finished are not replayed, their recorded URL being returned, and a page an earlier replay
+        stopped in the middle of is resumed from the first request that was not sent.
+    :type progress: str or ReplayProgress
+    :return: (title, URL) pairs of the created pages, in the order of the spool.
+    :rtype: list
+    """
+    if isinstance(progress, str):
+        with ReplayProgress(progress) as progress:
+            return replay_spool(path_or_file, workers, nested_workers, image_dir, return_exceptions, progress)
+
+    core.get_client()
+    pages = []
+    slots = threading.Semaphore(workers)
+    page_records = None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            # Requests are numbered for the progress file, in the order of the spool
+            for number, record in enumerate(iter_spool(path_or_file), 1):
+                record["request"] = number
+                if record["op"] == "pages.create":
+                    if page_records is not None:
+                        page_records.put(None)
+                        page_records = None
+                    if progress is not None and record["page"] in progress.finished:
+                        # Finished by an earlier replay: its requests are read and dropped
+                        future = Future()
+                        future.set_result(progress.finished[record["page"]])
+                        pages.append((record.get("title"), future))
+                        skipping = True
+                        continue
+                    skipping = False
+                    # Read ahead of at most the pages being replayed
+                    slots.acquire()
+                    page_records = queue.Queue()
+                    page_records.put(record)
+                    future = executor.submit(replay_page, iter(page_records.get, None), nested_workers, image_dir, progress)
+                    future.add_done_callback(lambda _: slots.release())
+                    pages.append((record.get("title"), future))
+                elif page_records is None and not pages:
+                    raise ValueError(f"Expected a pages.create request, got {record.get('op')!r}.")
+                elif not skipping:
+                    page_records.put(record)
+        finally:
+            if page_records is not None:
+                page_records.put(None)
+
+    results = []
+    for title, future in pages:
+        error = future.exception()
+        if error is not None and not return_exceptions:
+            raise error
+        results.append((title, error if error is not None else future.result()))
+    return results
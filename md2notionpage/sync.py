@@ -0,0 +1,288 @@
+"""
+sync.py
+
+This module updates an existing Notion page to match Markdown text by patching only the blocks that changed,
+instead of creating a new page with every block sent again.
+
+The existing children of the page are listed and both sides are reduced to per-block content fingerprints.
+A sequence diff of the fingerprints then gives the minimal edit: changed blocks are updated in place,
+removed blocks are deleted and new blocks are inserted at their position with blocks.children.append(after=...).
+Nested list items are synced the same way, level by level. Listing the children of every nested block would cost
+a read request per block, so a sync can be given a state recording the children it last wrote: a block whose parsed
+children are the same as recorded is not listed again.
+
+Functions:
+    - sync_notion_page_from_md(markdown_text, page_id): Update a Notion page to match Markdown text.
+    - block_fingerprint(block): Return a hash of the content of a block, excluding its children.
+    - tree_fingerprint(blocks): Return a hash of the content of blocks, including their children.
+
+Example Usage:
+    from md2notionpage import sync_notion_page_from_md
+    changes = sync_notion_page_from_md(markdown_text, "YOUR_PAGE_ID")
+"""
+
+import difflib
+import hashlib
+import json
+from . import core
+from .core import parse_md, iter_split_blocks, iter_upload_batches, deferred_children_jobs, append_deferred_children, block_children, count_blocks, get_client
+from .images import resolve_local_images, with_file_urls, source_hash
+from .ratelimit import send
+from . import metrics
+
+# Blocks that are pages or databases of their own are never updated or deleted by a sync
+preserved_types = {"child_page", "child_database"}
+
+# Annotation defaults of rich text objects that do not give them
+default_annotations = {"bold": False, "italic": False, "strikethrough": False, "underline": False, "code": False, "color": "default"}
+
+def normalize_rich_text(rich_text):
+    """
+    Reduce a rich_text array to what it displays, so that the arrays sent by md2notionpage and returned by Notion compare equal.
+
+    Adjacent segments with the same formatting are merged and empty segments are dropped.
+    """
+    segments = []
+    for seg in rich_text:
+        seg_type = seg.get("type", "text")
+        annotations = dict(default_annotations, **(seg.get("annotations") or {}))
+        if seg_type == "text":
+            text = seg.get("text") or {}
+            link = text.get("link") or {}
+            key = [seg_type, link.get("url"), annotations]
+            content = text.get("content") or ""
+        elif seg_type == "equation":
+            key = [seg_type, None, annotations]
+            content = (seg.get("equation") or {}).get("expression", "")
+        else:
+            key = [seg_type, seg.get(seg_type), annotations]
+            content = seg.get("plain_text", "")
+
+        if not content and seg_type == "text":
+            continue
+        if segments and seg_type == "text" and segments[-1][0] == key:
+            segments[-1][1] += content
+        else:
+            segments.append([key, content])
+    return segments
+
+def block_content(block):
+    """
+    Return the content of a block that a sync compares: its type, text and type specific values, without children.
+    """
+    block_type = block["type"]
+    body = block.get(block_type) or {}
+    content = {"type": block_type}
+    if "rich_text" in body:
+        content["rich_text"] = normalize_rich_text(body["rich_text"])
+    for key in ("language", "expression", "checked", "table_width", "has_column_header", "has_row_header"):
+        if key in body:
+            content[key] = body[key]
+    if "cells" in body:
+        content["cells"] = [normalize_rich_text(cell) for cell in body["cells"]]
+    for key in ("external", "file"):
+        if key in body:
+            url = body[key].get("url") or ""
+            # Local and uploaded images are compared by content, as the URLs of hosted files change
+            digest = source_hash(url) if key == "file" or url.startswith("file:") else None
+            content["url"] = f"sha256:{digest}" if digest else url
+    caption = normalize_rich_text(body.get("caption") or [])
+    if caption:
+        content["caption"] = caption
+    return content
+
+def block_fingerprint(block):
+    """
+    Return a hash of the content of a block, excluding its children.
+
+    A block parsed from Markdown and the same block as returned by Notion have the same fingerprint.
+
+    :param block: A Notion block.
+    :type block: dict
+    :return: A hexadecimal digest.
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(block_content(block), sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def tree_fingerprint(blocks):
+    """
+    Return a hash of the content of blocks and of their children at any depth.
+
+    :param blocks: A list of Notion blocks.
+    :type blocks: list
+    :return: A hexadecimal digest.
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for block in blocks:
+        digest.update(block_fingerprint(block).encode("ascii"))
+        digest.update(tree_fingerprint(block_children(block)).encode("ascii"))
+        digest.update(b";")
+    return digest.hexdigest()
+
+def list_children(block_id):
+    """
+    Return all children of a block or page, following pagination.
+    """
+    children = []
+    start_cursor = None
+    while True:
+        kwargs = {"page_size": 100}
+        if start_cursor:
+            kwargs["start_cursor"] = start_cursor
+        response = send(core.notion.blocks.children.list, block_id, idempotent=True, **kwargs)
+        children.extend(response["results"])
+        if not response.get("has_more"):
+            return children
+        start_cursor = response["next_cursor"]
+
+def updatable(old, new):
+    """
+    Return True if an existing block can be updated in place to become a parsed block: both are of the same type,
+    and tables have the same width.
+    """
+    if old["type"] != new["type"]:
+        return False
+    return (old.get(old["type"]) or {}).get("table_width") == (new.get(new["type"]) or {}).get("table_width")
+
+def update_arguments(block):
+    """
+    Return the blocks.update keyword arguments that set the content of an existing block to that of a parsed block.
+    """
+    # The width of a table cannot be changed
+    body = {key: value for key, value in block[block["type"]].items() if key not in ("children", "table_width")}
+    return {block["type"]: body}
+
+def insert_blocks(parent_id, blocks, after, at_start, changes, image_dir=None):
+    """
+    Insert blocks into a parent after the block with the given ID, or when after is None, at the start
+    if at_start is set and otherwise at the end. Return the ID of the last inserted block.
+    Local images are uploaded first if image_dir is given.
+    """
+    if image_dir is not None:
+        blocks = list(resolve_local_images(blocks, image_dir))
+    jobs = []
+    for batch in iter_upload_batches(blocks):
+        if after:
+            position = {"after": after}
+        elif at_start:
+            position = {"position": {"type": "start"}}
+        else:
+            position = {}
+        response = send(core.notion.blocks.children.append, parent_id, children=[block for block, _ in batch], **position)
+        jobs.extend(deferred_children_jobs(batch, response))
+        after = response["results"][len(batch) - 1]["id"]
+        changes["inserted"] += len(batch)
+    append_deferred_children(jobs)
+    return after
+
+def sync_children(parent_id, blocks, existing, changes, state=None, image_dir=None):
+    """
+    Make the children of a block or page match blocks with the fewest update, delete and append requests.
+
+    :param parent_id: The ID of the page or block.
+    :type parent_id: str
+    :param blocks: The blocks the children should be.
+    :type blocks: list
+    :param existing: The current children, as listed from Notion.
+    :type existing: list
+    :param changes: Counts of the changes made, updated in place.
+    :type changes: dict
+    :param state: (Optional) The tree_fingerprint of the children last synced to each block, by block ID,
+        read and updated in place. Defaults to None, listing the children of every kept block.
+    :type state: dict
+    :param image_dir: (Optional) Upload the local images of inserted and updated blocks, see sync_notion_page_from_md.
+    :type image_dir: str
+    """
+    existing = [block for block in existing if block["type"] not in preserved_types]
+    matcher = difflib.SequenceMatcher(None, [block_fingerprint(block) for block in existing],
+                                      [block_fingerprint(block) for block in blocks], autojunk=False)
+
+    # ID of the last block kept or inserted so far, after which new blocks go
+    after = None
+    pending = []
+    matched = []
+
+    def flush():
+        nonlocal after, pending
+        if pending:
+            after = insert_blocks(parent_id, pending, after, bool(existing), changes, image_dir)
+            pending = []
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            flush()
+            changes["unchanged"] += i2 - i1
+            matched.extend(zip(existing[i1:i2], blocks[j1:j2]))
+            after = existing[i2 - 1]["id"]
+            continue
+
+        old_blocks = existing[i1:i2]
+        new_blocks = blocks[j1:j2]
+        for k in range(max(len(old_blocks), len(new_blocks))):
+            old = old_blocks[k] if k < len(old_blocks) else None
+            new = new_blocks[k] if k < len(new_blocks) else None
+            if old is not None and new is not None and updatable(old, new):
+                # Same kind of block in the same place: change its content in place
+                flush()
+                if image_dir is not None:
+                    new, = resolve_local_images([new], image_dir)
+                send(core.notion.blocks.update, old["id"], idempotent=True, **update_arguments(new))
+                changes["updated"] += 1
+                matched.append((old, new))
+                after = old["id"]
+                continue
+            if old is not None:
+                send(core.notion.blocks.delete, old["id"], idempotent=True)
+                changes["deleted"] += 1
+            if new is not None:
+                pending.append(new)
+    flush()
+
+    # Children of kept blocks are synced level by level
+    for old, new in matched:
+        children = block_children(new)
+        if not old.get("has_children") and not children:
+            continue
+        fingerprint = tree_fingerprint(children) if state is not None else None
+        if old.get("has_children"):
+            if fingerprint is not None and state.get(old["id"]) == fingerprint:
+                # The same children as written by the last sync
+                changes["unchanged"] += sum(count_blocks(child) for child in children)
+                continue
+            sync_children(old["id"], children, list_children(old["id"]), changes, state, image_dir)
+        else:
+            insert_blocks(old["id"], children, None, False, changes, image_dir)
+        if fingerprint is not None:
+            state[old["id"]] = fingerprint
+
+def sync_notion_page_from_md(markdown_text, page_id, table_mode='latex', state=None, image_dir=None):
+    """
+    Update an existing Notion page to match Markdown text, patching only the blocks that changed.
+
+    The page title, cover and properties are left as they are. Sub-pages and databases on the page are kept.
+
+    :param markdown_text: The Markdown text the page should show.
+    :type markdown_text: str
+    :param page_id: The ID of the page to update, e.g. one created earlier by create_notion_page_from_md.
+    :type page_id: str
+    :param table_mode: (Optional) The table_mode the page was created with, see create_notion_page_from_md. Defaults to 'latex'.
+    :type table_mode: str
+    :param state: (Optional) A dict kept from one sync of the page to the next, e.g. in a publish cache, recording the children
+        written to each nested block. The children of a block are only listed when their Markdown changed since the last sync,
+        so nested blocks edited in Notion since then are not restored. Defaults to None, listing the children of every nested block.
+    :type state: dict
+    :param image_dir: (Optional) The image_dir the page was created with, see create_notion_page_from_md. Local images are
+        compared with the uploaded ones by a hash of their content, and only new or changed images are uploaded. Defaults to None.
+    :type image_dir: str
+    :return: Counts of "unchanged", "updated", "deleted" and "inserted" top-level and nested blocks.
+    :rtype: dict
+    """
+    get_client()
+    with metrics.timed("sync", page_id, page_id):
+        blocks = list(iter_split_blocks(parse_md(markdown_text, table_mode=table_mode)))
+        if image_dir is not None:
+            blocks = [with_file_urls(block, image_dir) for block in blocks]
+        changes = {"unchanged": 0, "updated": 0, "deleted": 0, "inserted": 0}
+        sync_children(page_id, blocks, list_children(page_id), changes, state, image_dir)
+    return changes
@@ -0,0 +1,27 @@
+import pytest
+from md2notionpage import ratelimit, images, metrics
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    """
+    The process-wide rate limiter would make every test wait like a real upload does;
+    tests of the limiter itself install their own.
+    """
+    monkeypatch.setattr(ratelimit, "rate_limiter", None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_image_uploader(monkeypatch):
+    """
+    File uploads are remembered for the whole process, but each test uploads to a server of its own.
+    """
+    monkeypatch.setattr(images, "image_uploader", None)
+
+
+@pytest.fixture(autouse=True)
+def no_metrics_hooks(monkeypatch):
+    """
+    Hooks registered by a test are dropped after it.
+    """
+    monkeypatch.setattr(metrics, "hooks", ())
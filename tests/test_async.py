@@ -0,0 +1,92 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from md2notionpage import md2notionpage_async
+from md2notionpage.async_core import create_notion_pages_from_md_async
+from md2notionpage.mock_server import MockNotionServer
+
+
+def make_async_notion():
+    fake_notion = MagicMock()
+    fake_notion.pages.create = AsyncMock(side_effect=lambda **kwargs: {"id": "page-id", "url": "https://notion.so/" + kwargs["parent"]["page_id"]})
+    fake_notion.pages.update = AsyncMock(return_value={})
+    fake_notion.blocks.children.append = AsyncMock(return_value={})
+    return fake_notion
+
+
+class TestAsync(unittest.TestCase):
+
+    def test_create_page(self):
+        fake_notion = make_async_notion()
+        markdown = "# Title\n" + "\n".join(f"Line {i}" for i in range(150))
+
+        with patch("md2notionpage.async_core.async_notion", fake_notion):
+            url = asyncio.run(md2notionpage_async(markdown, "title", "parent123", cover_url="https://example.com/c.jpg"))
+
+        self.assertEqual(url, "https://notion.so/parent123")
+        fake_notion.pages.create.assert_awaited_once()
+        create_arguments = fake_notion.pages.create.await_args[1]
+        self.assertEqual(create_arguments["parent"], {"type": "page_id", "page_id": "parent123"})
+        self.assertEqual(create_arguments["properties"]["title"]["title"][0]["text"]["content"], "title")
+        self.assertEqual(create_arguments["cover"]["external"]["url"], "https://example.com/c.jpg")
+        self.assertEqual(len(create_arguments["children"]), 100)
+        fake_notion.pages.update.assert_not_awaited()
+        batch_sizes = [len(c[1]["children"]) for c in fake_notion.blocks.children.append.await_args_list]
+        self.assertEqual(batch_sizes, [51])
+
+    def test_batch_respects_concurrency(self):
+        fake_notion = make_async_notion()
+        in_flight = []
+        peak = []
+
+        async def append(block_id, children):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return {}
+
+        fake_notion.blocks.children.append = AsyncMock(side_effect=append)
+        pages = [
+            {"markdown_text": "\n".join(f"Line {i}" for i in range(300)), "title": f"Page {n}", "parent_page_id": f"parent{n}"}
+            for n in range(10)
+        ]
+
+        with patch("md2notionpage.async_core.async_notion", fake_notion):
+            urls = asyncio.run(create_notion_pages_from_md_async(pages, concurrency=3))
+
+        self.assertEqual(urls, [f"https://notion.so/parent{n}" for n in range(10)])
+        self.assertEqual(fake_notion.blocks.children.append.await_count, 20)
+        self.assertEqual(max(peak), 3)
+
+    def test_batch_return_exceptions(self):
+        fake_notion = make_async_notion()
+        pages = [
+            {"markdown_text": "Text", "title": "ok", "parent_page_id": "parent1"},
+            {"markdown_text": "Text", "title": "bad", "parent_page_id": "parent2", "parent_type": "invalid"},
+        ]
+
+        with patch("md2notionpage.async_core.async_notion", fake_notion):
+            results = asyncio.run(create_notion_pages_from_md_async(pages, return_exceptions=True))
+
+        self.assertEqual(results[0], "https://notion.so/parent1")
+        self.assertIsInstance(results[1], ValueError)
+
+    def test_event_loops_in_a_row(self):
+        markdown = "\n".join(f"Line {i}" for i in range(150))
+        pages = [{"markdown_text": markdown, "title": f"Page {n}", "parent_page_id": "parent-id"} for n in range(3)]
+
+        with MockNotionServer() as server, patch.dict(os.environ, {"NOTION_BASE_URL": server.base_url, "NOTION_SECRET": "secret_mock"}):
+            # Each run opens its own client, whose connections belong to that run's event loop
+            first = asyncio.run(md2notionpage_async(markdown, "First", "parent-id"))
+            second = asyncio.run(md2notionpage_async(markdown, "Second", "parent-id"))
+            urls = asyncio.run(create_notion_pages_from_md_async(pages))
+
+            self.assertNotEqual(first, second)
+            self.assertEqual(len(urls), 3)
+            self.assertEqual(len(server.pages), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+from md2notionpage.core import parse_md, iter_split_blocks, iter_upload_batches, plan_block, block_json_size, json_size, to_notion_block, set_batch_limits
+
+
+def request_size(batch):
+    return json_size([to_notion_block(block) for block, _ in batch])
+
+
+class TestBatchLimits(unittest.TestCase):
+
+    def tearDown(self):
+        set_batch_limits()
+
+    def test_block_json_size_is_exact(self):
+        markdown = 'Plain "quoted" ü 😀 and **bold** [link](https://x/ä) $e$\n\n- item\n - `nested`\n\n```python\nx = "\\t"\n```\n\n![caption](https://i.png)'
+        for compact in (False, True):
+            for block in parse_md(markdown, compact=compact):
+                self.assertEqual(block_json_size(block), len(json.dumps(to_notion_block(block), ensure_ascii=False, separators=(",", ":")).encode("utf-8")))
+
+    def test_large_code_blocks_are_packed_by_size(self):
+        code = "x = 'y' * 100  # a line of code\n" * 60
+        markdown = "\n\n".join(f"```python\n{code}```" for _ in range(100))
+        batches = list(iter_upload_batches(parse_md(markdown, compact=True), max_bytes=50000))
+
+        self.assertEqual(sum(len(batch) for batch in batches), 100)
+        self.assertGreater(len(batches), 1)
+        for batch in batches:
+            self.assertLessEqual(request_size(batch), 50000)
+
+    def test_small_blocks_fill_batches(self):
+        batches = list(iter_upload_batches(parse_md("\n\n".join(f"- {i}" for i in range(250)), compact=True)))
+        self.assertEqual([len(batch) for batch in batches], [100, 100, 50])
+
+    def test_set_batch_limits(self):
+        set_batch_limits(batch_size=10, max_bytes=1000)
+        batches = list(iter_upload_batches(parse_md("\n\n".join(f"Paragraph {i}" for i in range(100)))))
+        self.assertTrue(all(len(batch) <= 10 and request_size(batch) <= 1000 for batch in batches))
+        with self.assertRaises(ValueError):
+            set_batch_limits(batch_size=101)
+
+    def test_children_are_deferred_by_size(self):
+        markdown = "- parent\n" + "\n".join(f" - child {i} " + "word " * 300 for i in range(50))
+        block, = parse_md(markdown, compact=True)
+        sent, deferred = plan_block(block, max_bytes=20000)
+
+        self.assertLessEqual(block_json_size(sent), 20000)
+        self.assertTrue(deferred)
+        self.assertEqual(len(sent["bulleted_list_item"]["children"]) + len(deferred), 50)
+
+    def test_rich_text_arrays_are_split(self):
+        blocks = list(iter_split_blocks(parse_md(" ".join(f"**{i}**" for i in range(250)))))
+        self.assertEqual(len(blocks), 5)
+        self.assertTrue(all(len(block["paragraph"]["rich_text"]) <= 100 for block in blocks))
+        self.assertEqual(sum(len(block["paragraph"]["rich_text"]) for block in blocks), 499)
+
+
+if __name__ == "__main__":
+    unittest.main()
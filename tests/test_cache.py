@@ -0,0 +1,141 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, patch
+from md2notionpage import md2notionpage, cli
+from md2notionpage.cache import PublishCache, publish_key
+from md2notionpage.mock_server import MockNotionServer
+
+
+class TestPublishCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "cache.json")
+        self.fake_notion = MagicMock()
+        self.fake_notion.pages.create.side_effect = lambda **kwargs: {"id": f"id-{self.fake_notion.pages.create.call_count}", "url": f"https://notion.so/{self.fake_notion.pages.create.call_count}"}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_covers_text_and_arguments(self):
+        key = publish_key("# Text", "title", "parent123")
+        self.assertEqual(key, publish_key("\n# Text\n", "title", "parent123"))
+        self.assertNotEqual(key, publish_key("# Other", "title", "parent123"))
+        self.assertNotEqual(key, publish_key("# Text", "other", "parent123"))
+        self.assertNotEqual(key, publish_key("# Text", "title", "parent123", cover_url="https://example.com/c.jpg"))
+        self.assertNotEqual(key, publish_key("# Text", "title", "parent123", parent_type="database"))
+        self.assertNotEqual(key, publish_key("# Text", "title", "parent123", table_mode="native"))
+
+    def test_unchanged_document_sends_no_requests(self):
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            first = md2notionpage("# Text", "title", "parent123", cache=PublishCache(self.cache_path))
+            self.fake_notion.reset_mock()
+            # A new cache object reads the manifest written by the first one
+            second = md2notionpage("# Text", "title", "parent123", cache=PublishCache(self.cache_path))
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.fake_notion.mock_calls, [])
+
+        with open(self.cache_path, encoding="utf-8") as file:
+            manifest = json.load(file)
+        self.assertEqual(list(manifest["pages"].values())[0]["page_id"], "id-1")
+
+    def test_changed_document_is_published(self):
+        cache = PublishCache(self.cache_path)
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            md2notionpage("# Text", "title", "parent123", cache=cache)
+            md2notionpage("# Changed", "title", "parent123", cache=cache)
+
+        self.assertEqual(self.fake_notion.pages.create.call_count, 2)
+
+    def test_file_object_and_text_share_entries(self):
+        path = os.path.join(self.tmp.name, "doc.md")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("# Text\n\nMore text\n")
+
+        cache = PublishCache(self.cache_path)
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            with open(path, encoding="utf-8") as file:
+                md2notionpage(file, "title", "parent123", cache=cache)
+            md2notionpage("# Text\n\nMore text", "title", "parent123", cache=cache)
+
+        self.assertEqual(self.fake_notion.pages.create.call_count, 1)
+
+    def test_sync_state_is_kept(self):
+        PublishCache(self.cache_path).put_synced({"block-id": "fingerprint"})
+        cache = PublishCache(self.cache_path)
+
+        self.assertEqual(cache.synced, {"block-id": "fingerprint"})
+        self.assertEqual(cache.pages, {})
+
+    def test_failed_upload_is_not_cached(self):
+        self.fake_notion.pages.create.side_effect = RuntimeError("boom")
+        cache = PublishCache(self.cache_path)
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            with self.assertRaises(RuntimeError):
+                md2notionpage("# Text", "title", "parent123", cache=cache)
+
+        self.assertIsNone(cache.get(publish_key("# Text", "title", "parent123")))
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_publish_dir_reports_unchanged_files(self):
+        directory = os.path.join(self.tmp.name, "docs")
+        os.makedirs(directory)
+        for name in ["a.md", "b.md"]:
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as file:
+                file.write(f"# {name}")
+
+        def run():
+            out = io.StringIO()
+            with patch("md2notionpage.core.notion", self.fake_notion), redirect_stdout(out):
+                cli.publish_dir([directory, "--parent", "parent123", "--parse_workers", "1", "--cache", self.cache_path])
+            return out.getvalue()
+
+        self.assertIn("2 page(s) created, 0 unchanged, 0 failed.", run())
+
+        with open(os.path.join(directory, "b.md"), "w", encoding="utf-8") as file:
+            file.write("# b changed")
+        self.fake_notion.reset_mock()
+        output = run()
+
+        self.assertIn("1 page(s) created, 1 unchanged, 0 failed.", output)
+        self.assertIn("Notion page unchanged: " + os.path.join(directory, "a.md"), output)
+        self.assertEqual(self.fake_notion.pages.create.call_count, 1)
+
+    def test_changed_image_is_published_again(self):
+        directory = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(directory, "img"))
+        image_path = os.path.join(directory, "img", "chart.png")
+        with open(os.path.join(directory, "report.md"), "w", encoding="utf-8") as file:
+            file.write("# Report\n\n![Chart](img/chart.png)\n\n![Logo](https://example.com/logo.png)")
+        with open(image_path, "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\nfirst")
+
+        key = publish_key("![Chart](img/chart.png)", "title", "parent123", image_dir=directory)
+        self.assertNotEqual(key, publish_key("![Chart](img/chart.png)", "title", "parent123"))
+
+        with MockNotionServer() as server:
+            def run():
+                out = io.StringIO()
+                with patch("md2notionpage.core.notion", server.client()), redirect_stdout(out):
+                    cli.publish_dir([directory, "--parent", "parent-id", "--cache", self.cache_path])
+                return out.getvalue()
+
+            self.assertIn("1 page(s) created, 0 unchanged, 0 failed.", run())
+            self.assertIn("0 page(s) created, 1 unchanged, 0 failed.", run())
+
+            # Same Markdown, new image
+            with open(image_path, "wb") as file:
+                file.write(b"\x89PNG\r\n\x1a\nsecond")
+
+            self.assertIn("1 page(s) created, 0 unchanged, 0 failed.", run())
+            self.assertNotEqual(key, publish_key("![Chart](img/chart.png)", "title", "parent123", image_dir=directory))
+            self.assertEqual(len(server.files), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
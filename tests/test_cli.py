@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, patch
+from md2notionpage import cli
+
+
+class TestPublishDir(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "sub"))
+        for name, text in [("a.md", "# A\n\nText"), ("sub/b.md", "- item"), ("notes.txt", "skip me")]:
+            with open(os.path.join(self.tmp.name, name), "w", encoding="utf-8") as file:
+                file.write(text)
+
+        self.fake_notion = MagicMock()
+        self.fake_notion.pages.create.side_effect = lambda **kwargs: {"id": "id", "url": f"https://notion.so/{len(self.fake_notion.pages.create.call_args_list)}"}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        exit_code = 0
+        with patch("md2notionpage.core.notion", self.fake_notion), redirect_stdout(out):
+            try:
+                cli.publish_dir([self.tmp.name, "--parent", "parent123", "--workers", "2", "--parse_workers", "1", *argv])
+            except SystemExit as e:
+                exit_code = e.code
+        return out.getvalue(), exit_code
+
+    def test_publishes_every_markdown_file(self):
+        output, exit_code = self.run_cli()
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(self.fake_notion.pages.create.call_count, 2)
+        titles = sorted(c[1]["properties"]["title"]["title"][0]["text"]["content"] for c in self.fake_notion.pages.create.call_args_list)
+        self.assertEqual(titles, ["a", "b"])
+        self.assertIn("2 page(s) created, 0 failed.", output)
+
+    def test_reports_failures(self):
+        self.fake_notion.pages.create.side_effect = [RuntimeError("boom"), {"id": "id", "url": "https://notion.so/1"}]
+
+        output, exit_code = self.run_cli()
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("1 page(s) created, 1 failed.", output)
+        self.assertIn("boom", output)
+
+    def test_parsing_waits_for_uploads(self):
+        for i in range(20):
+            with open(os.path.join(self.tmp.name, f"page{i:02}.md"), "w", encoding="utf-8") as file:
+                file.write(f"Page {i}")
+        parsed = []
+        ahead = []
+
+        def parse(path, table_mode):
+            parsed.append(path)
+            return cli.parse_md(f"Text of {path}")
+
+        def create(**kwargs):
+            # The files parsed but not uploaded yet
+            ahead.append(len(parsed) - self.fake_notion.pages.create.call_count)
+            time.sleep(0.01)
+            return {"id": "id", "url": "https://notion.so/page"}
+
+        self.fake_notion.pages.create.side_effect = create
+        with patch("md2notionpage.cli.ProcessPoolExecutor", ThreadPoolExecutor), patch("md2notionpage.cli.parse_markdown_file", parse):
+            output, exit_code = self.run_cli()
+
+        self.assertEqual(exit_code, 0)
+        self.assertIn("22 page(s) created, 0 failed.", output)
+        # One file for each of the parse workers and upload threads
+        self.assertLessEqual(max(ahead), 1 + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
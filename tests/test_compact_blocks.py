@@ -0,0 +1,43 @@
+import pickle
+import unittest
+from unittest.mock import MagicMock, patch
+from md2notionpage import md2notionpage
+from md2notionpage.core import RichText, make_annotations, parse_md, iter_notion_blocks, iter_split_blocks, to_notion_blocks
+
+
+class TestCompactBlocks(unittest.TestCase):
+
+    markdown = "# Title\n\nSome **bold** and *italic* [link](https://x) $e$\n\n- **item**\n - `nested`\n\n```python\nx = 1\n```\n\n![cap](https://i.png)"
+
+    def test_materialized_blocks_equal_parse_md(self):
+        compact = parse_md(self.markdown, compact=True)
+        self.assertIsInstance(compact[1]["paragraph"]["rich_text"][1], RichText)
+        self.assertEqual(to_notion_blocks(compact), parse_md(self.markdown))
+        self.assertEqual(to_notion_blocks(iter_notion_blocks(self.markdown, compact=True)), parse_md(self.markdown))
+
+    def test_annotations_are_shared(self):
+        blocks = parse_md("**a** **b**\n\n**c**", compact=True)
+        segments = [seg for block in blocks for seg in block["paragraph"]["rich_text"] if seg.annotations]
+        self.assertEqual(len(segments), 3)
+        self.assertTrue(all(seg.annotations is make_annotations(bold=True) for seg in segments))
+
+    def test_unpickled_annotations_are_shared(self):
+        seg = pickle.loads(pickle.dumps(RichText("text", "a", make_annotations(code=True))))
+        self.assertIs(seg.annotations, make_annotations(code=True))
+        self.assertEqual(seg, RichText("text", "a", make_annotations(code=True)))
+
+    def test_split_compact_paragraph(self):
+        markdown = " ".join(["**word**"] * 600)
+        blocks = list(iter_split_blocks(parse_md(markdown, compact=True)))
+        self.assertEqual(to_notion_blocks(blocks), list(iter_split_blocks(parse_md(markdown))))
+
+    def test_requests_carry_notion_json(self):
+        client = MagicMock()
+        client.pages.create.return_value = {"id": "page-id", "url": "https://notion.so/page"}
+        with patch("md2notionpage.core.notion", client):
+            md2notionpage(self.markdown, "Title", "parent-id")
+        self.assertEqual(client.pages.create.call_args.kwargs["children"], parse_md(self.markdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from md2notionpage import md2notionpage, sync_notion_page_from_md, ratelimit
+from md2notionpage.images import is_local_image, local_image_path, ImageUploader
+from md2notionpage.mock_server import MockNotionServer
+
+
+class TestLocalImages(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "img"))
+        self.content = b"\x89PNG\r\n\x1a\n" + os.urandom(1000)
+        for name in ("chart.png", "copy of chart.png"):
+            with open(os.path.join(self.directory, "img", name), "wb") as file:
+                file.write(self.content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def upload(self, server, markdown, **kwargs):
+        with patch("md2notionpage.core.notion", server.client()):
+            return md2notionpage(markdown, "Title", "parent-id", image_dir=self.directory, **kwargs)
+
+    def images_of(self, server, page_id):
+        return [server.blocks[block_id]["image"] for block_id in server.children[page_id] if server.blocks[block_id]["type"] == "image"]
+
+    def test_local_urls(self):
+        self.assertTrue(is_local_image("./img/chart.png"))
+        self.assertTrue(is_local_image("img/chart.png"))
+        self.assertTrue(is_local_image("/tmp/chart.png"))
+        self.assertTrue(is_local_image("file:///tmp/chart.png"))
+        self.assertFalse(is_local_image("https://example.com/chart.png"))
+        self.assertFalse(is_local_image("//example.com/chart.png"))
+        self.assertTrue(is_local_image("file://localhost/tmp/chart.png"))
+        self.assertTrue(is_local_image("C:\\docs\\chart.png"))
+        self.assertEqual(local_image_path("./img/../img/chart.png", "/docs"), os.path.normpath("/docs/img/chart.png"))
+        self.assertEqual(local_image_path("/tmp/chart.png", "/docs"), os.path.normpath("/tmp/chart.png"))
+        self.assertEqual(local_image_path("img/copy%20of%20chart.png", self.directory),
+                         os.path.join(self.directory, "img", "copy of chart.png"))
+
+    def test_local_images_are_uploaded_once(self):
+        markdown = ("# Images\n\n![Chart](./img/chart.png)\n\n![Copy](img/copy%20of%20chart.png)\n\n"
+                    "![Web](https://example.com/chart.png)\n\n![Again](img/chart.png)")
+        with MockNotionServer() as server:
+            self.upload(server, markdown)
+            page_id, = server.pages
+            images = self.images_of(server, page_id)
+            file_upload_id, = server.files
+
+            self.assertEqual(server.files[file_upload_id], self.content)
+            self.assertEqual(server.file_uploads[file_upload_id]["content_type"], "image/png")
+            self.assertEqual([image.get("type") for image in images], ["file", "file", None, "file"])
+            self.assertEqual(images[2]["external"]["url"], "https://example.com/chart.png")
+            self.assertEqual(images[1]["caption"][0]["text"]["content"], "Copy")
+
+    def test_pages_share_uploads(self):
+        with MockNotionServer() as server:
+            for i in range(3):
+                self.upload(server, f"Page {i}\n\n![Chart](img/chart.png)", pipeline=bool(i))
+
+            self.assertEqual(len(server.files), 1)
+            self.assertEqual(sum(len(self.images_of(server, page_id)) for page_id in server.pages), 3)
+
+    def test_missing_image_fails_before_the_page_is_created(self):
+        with MockNotionServer() as server:
+            with self.assertRaises(FileNotFoundError):
+                self.upload(server, "Text\n\n![Missing](img/missing.png)")
+
+            self.assertEqual(server.pages, {})
+
+    def test_failed_upload_is_sent_again(self):
+        uploader = ImageUploader()
+        path = os.path.join(self.directory, "img", "chart.png")
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()), patch.object(ratelimit, "retry_policy", ratelimit.RetryPolicy(max_retries=1, base_delay=0)):
+                server.fail_next(2, status=409)
+                with self.assertRaises(Exception):
+                    uploader.upload(path)
+                file_upload_id = uploader.upload(path)
+
+            self.assertEqual(server.files, {file_upload_id: self.content})
+
+    def test_sync_compares_images_by_content(self):
+        markdown = "# Images\n\n![Chart](img/chart.png)\n\nText"
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                self.upload(server, markdown)
+                page_id, = server.pages
+                created = len(server.requests)
+                unchanged = sync_notion_page_from_md(markdown, page_id, image_dir=self.directory)
+                writes = [request for request in server.requests[created:] if request["method"] != "GET"]
+
+                with open(os.path.join(self.directory, "img", "chart.png"), "wb") as file:
+                    file.write(self.content + b"changed")
+                changed = sync_notion_page_from_md(markdown, page_id, image_dir=self.directory)
+            image, = self.images_of(server, page_id)
+
+            self.assertEqual(unchanged["updated"] + unchanged["inserted"] + unchanged["deleted"], 0)
+            self.assertEqual(writes, [])
+            self.assertEqual((changed["updated"], changed["inserted"], changed["deleted"]), (1, 0, 0))
+            self.assertEqual(len(server.files), 2)
+            self.assertEqual(server.files[image["file"]["url"].split("/")[-2]], self.content + b"changed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import random
+import unittest
+from md2notionpage.core import process_inline_formatting
+
+
+class TestInlineFormatting(unittest.TestCase):
+
+    SPANS = [
+        "**bold**", "*italic*", "__bold__", "_italic_", "__*both*__", "**_both_**",
+        "~strike~", "`code`", "$x^2$", "[text](https://example.com)", "plain", "two words",
+    ]
+
+    def test_matches_legacy_on_well_formed_markup(self):
+        """
+        The single-pass scanner must produce exactly what the legacy multi-pass
+        implementation produces for markup spans that do not overlap.
+        """
+        rng = random.Random(42)
+        for _ in range(500):
+            line = " ".join(rng.choice(self.SPANS) for _ in range(rng.randint(1, 8)))
+            self.assertEqual(
+                process_inline_formatting(line),
+                process_inline_formatting(line, legacy=True),
+                line,
+            )
+
+    def test_rich_text_objects(self):
+        rich_text = process_inline_formatting("a **b** [c](https://d) $e$")
+
+        self.assertEqual(rich_text[0], {"type": "text", "text": {"content": "a "}})
+        self.assertTrue(rich_text[1]["annotations"]["bold"])
+        self.assertEqual(rich_text[1]["plain_text"], "b")
+        self.assertEqual(rich_text[3]["text"]["link"], {"url": "https://d"})
+        self.assertEqual(rich_text[3]["href"], "https://d")
+        self.assertEqual(rich_text[5], {"type": "equation", "equation": {"expression": "e"}})
+
+    def test_matches_legacy_on_stray_and_overlapping_markup(self):
+        """
+        Stray markers and overlapping spans of different priority must resolve as in the legacy passes.
+        """
+        cases = [
+            "2*3 and **b**",
+            "snake_case words and [link](http://a_b_c.com)",
+            "`a*b*c`",
+            "a_b **c_d** e_f",
+            "$a*b$ and *c*",
+            "~a **b~ c**",
+            "[x_y](u) _z_",
+            "__*a*__ *b* **c** d*",
+            # A span of lower priority that starts first is cut by a later one of higher priority
+            "*a $b* c$",
+            "*a **b** c*",
+            "`x **y` z**",
+            "[a *b](c*) *d*",
+            "_a `b_ c` __d _e__ f_",
+        ]
+        for line in cases:
+            self.assertEqual(process_inline_formatting(line), process_inline_formatting(line, legacy=True), line)
+
+        rng = random.Random(7)
+        tokens = ["*", "**", "_", "__", "~", "`", "$", "[", "](", ")", "a", "b c", " ", "http://x_y.z", "2*3"]
+        for _ in range(2000):
+            line = "".join(rng.choice(tokens) for _ in range(rng.randint(1, 12)))
+            self.assertEqual(process_inline_formatting(line), process_inline_formatting(line, legacy=True), line)
+
+    def test_higher_priority_markup_wins(self):
+        rich_text = process_inline_formatting("2*3 and **b**")
+
+        self.assertEqual(rich_text[0], {"type": "text", "text": {"content": "2*3 and "}})
+        self.assertTrue(rich_text[1]["annotations"]["bold"])
+        self.assertEqual(rich_text[1]["text"]["content"], "b")
+
+        rich_text = process_inline_formatting("*a $b* c$")
+
+        self.assertEqual(rich_text[0], {"type": "text", "text": {"content": "*a "}})
+        self.assertEqual(rich_text[1], {"type": "equation", "equation": {"expression": "b* c"}})
+
+if __name__ == "__main__":
+    unittest.main()
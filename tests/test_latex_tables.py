@@ -0,0 +1,42 @@
+import unittest
+from md2notionpage.core import parse_md, convert_markdown_table_to_latex, convert_markdown_table_to_latex_chunks
+
+
+class TestLatexTables(unittest.TestCase):
+
+    def test_small_table(self):
+        self.assertEqual(convert_markdown_table_to_latex("| a | b |\n|---|---|\n| 1 | 2 |"),
+                         "\\def\\arraystretch{1.4}\\begin{array}{|c|c|c|c|}\\hline\n"
+                         "\\textsf{\\textbf{a}} & \\textsf{\\textbf{b}} \\\\\\hline\n"
+                         "\\textsf{1} & \\textsf{2} \\\\\\hline\n"
+                         "\\end{array}")
+
+    def test_single_row_table(self):
+        self.assertEqual(convert_markdown_table_to_latex("| a | b |"),
+                         "\\def\\arraystretch{1.4}\\begin{array}{|c|c|c|c|}\\hline\n\\textsf{a} & \\textsf{b} \\\\\\hline\n\\end{array}")
+
+    def test_long_table_is_cut_with_the_header_repeated(self):
+        table = "| Name | Value |\n|---|---|\n" + "\n".join(f"| row {i} | {i} |" for i in range(500))
+        expressions = convert_markdown_table_to_latex_chunks(table, max_len=1000)
+        whole = convert_markdown_table_to_latex(table)
+        header = "\\textsf{\\textbf{Name}} & \\textsf{\\textbf{Value}} \\\\\\hline\n"
+        head = whole[:whole.index(header) + len(header)]
+
+        self.assertGreater(len(expressions), 1)
+        self.assertTrue(all(len(expression) <= 1000 for expression in expressions))
+        self.assertTrue(all(expression.startswith(head) and expression.endswith("\\end{array}") for expression in expressions))
+        # The rows are all there, in order
+        self.assertEqual(head + "".join(expression[len(head):-len("\\end{array}")] for expression in expressions) + "\\end{array}", whole)
+
+    def test_long_table_makes_consecutive_equations(self):
+        table = "| a | b |\n|---|---|\n" + "\n".join(f"| {i} | {i} |" for i in range(200))
+        blocks = parse_md("Before\n\n" + table + "\n\nAfter")
+
+        self.assertEqual(blocks[0]["type"], "paragraph")
+        self.assertEqual(blocks[-1]["type"], "paragraph")
+        self.assertGreater(len(blocks), 3)
+        self.assertTrue(all(block["type"] == "equation" and len(block["equation"]["expression"]) <= 1000 for block in blocks[1:-1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from md2notionpage.core import parse_md
+
+
+def block_types(markdown):
+    return [block["type"] for block in parse_md(markdown)]
+
+
+class TestLineDispatch(unittest.TestCase):
+
+    def test_lines_that_only_start_like_markup(self):
+        self.assertEqual(block_types("#nospace"), ["paragraph"])
+        self.assertEqual(block_types(">noquote"), ["paragraph"])
+        self.assertEqual(block_types("--"), ["paragraph"])
+        self.assertEqual(block_types("-not a list"), ["paragraph"])
+        self.assertEqual(block_types("1.nope"), ["paragraph"])
+        self.assertEqual(block_types("CODE_BLOCKS are mentioned"), ["paragraph"])
+
+    def test_block_lines(self):
+        self.assertEqual(block_types("# H\n## H\n### H"), ["heading_1", "heading_2", "heading_3"])
+        self.assertEqual(block_types("#### Too deep"), [])
+        self.assertEqual(block_types("-----"), ["divider"])
+        self.assertEqual(block_types("> quote"), ["quote"])
+        self.assertEqual(block_types("10. ten"), ["numbered_list_item"])
+        self.assertEqual(block_types("| a | b |\n|---|---|\n| 1 | 2 |"), ["equation"])
+
+    def test_image_anywhere_on_line(self):
+        blocks = parse_md("See ![caption](https://example.com/i.png) here")
+        self.assertEqual(blocks[0]["type"], "image")
+        self.assertEqual(blocks[0]["image"]["external"]["url"], "https://example.com/i.png")
+
+    def test_indented_list_items_are_not_code(self):
+        blocks = parse_md("- a\n - b\n  - c\n   - d\n    - e")
+        self.assertEqual(len(blocks), 1)
+        item = blocks[0]
+        for _ in range(4):
+            item = item["bulleted_list_item"]["children"][0]
+        self.assertEqual(item["bulleted_list_item"]["rich_text"][0]["text"]["content"], "e")
+
+    def test_indented_text_is_code(self):
+        self.assertEqual(block_types("Text\n\n    code"), ["paragraph", "code"])
+
+
+if __name__ == "__main__":
+    unittest.main()
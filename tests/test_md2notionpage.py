@@ -17,7 +17,7 @@ class TestMd2NotionPage(unittest.TestCase):
     def test_create_complex_page_structure(self, mock_notion):
         """
         Test that a complex markdown document is correctly parsed and sent to Notion
-        via the expected API calls (create -> update -> append children).
+        in a single API call creating the page with its title, cover and children.
         """
         # Setup mock return values
         mock_page = {"id": "test-page-id", "url": "https://www.notion.so/test-page-url"}
@@ -51,34 +51,28 @@ print("Hello")
         # Execute
         url = md2notionpage(markdown_text, self.title, self.parent_page_id, self.cover_url)
 
-        # 1. Verify Page Creation
-        mock_notion.pages.create.assert_called_once_with(
-            parent={"type": "page_id", "page_id": self.parent_page_id},
-            properties={},
-            children=[]
+        # 1. Verify Page Creation (Title, Cover & Content in one request)
+        mock_notion.pages.create.assert_called_once()
+        create_call_args = mock_notion.pages.create.call_args
+        self.assertEqual(
+            create_call_args[1]['parent'],
+            {"type": "page_id", "page_id": self.parent_page_id}
         )
-
-        # 2. Verify Page Update (Title & Cover)
-        mock_notion.pages.update.assert_called_once()
-        update_call_args = mock_notion.pages.update.call_args
-        self.assertEqual(update_call_args[0][0], "test-page-id") # page_id
         self.assertEqual(
-            update_call_args[1]['properties']['title']['title'][0]['text']['content'], 
+            create_call_args[1]['properties']['title']['title'][0]['text']['content'], 
             self.title
         )
         self.assertEqual(
-            update_call_args[1]['cover']['external']['url'], 
+            create_call_args[1]['cover']['external']['url'], 
             self.cover_url
         )
 
-        # 3. Verify Content Appending
-        # We expect at least one call to blocks.children.append
-        self.assertTrue(mock_notion.blocks.children.append.called)
-        
-        # Inspect the blocks sent
-        append_call_args = mock_notion.blocks.children.append.call_args
-        self.assertEqual(append_call_args[0][0], "test-page-id") # page_id
-        children = append_call_args[1]['children']
+        # 2. No extra round trips for a small page
+        mock_notion.pages.update.assert_not_called()
+        mock_notion.blocks.children.append.assert_not_called()
+
+        # 3. Inspect the blocks sent
+        children = create_call_args[1]['children']
         
         # We expect specific block types in order
         expected_types = [
@@ -122,13 +116,14 @@ print("Hello")
         # Execute with empty cover_url
         md2notionpage(markdown_text, "Simple Title", self.parent_page_id, "")
 
-        # Verify update call does NOT include cover
-        update_call_kwargs = mock_notion.pages.update.call_args[1]
-        self.assertNotIn('cover', update_call_kwargs)
+        # Verify create call does NOT include cover
+        create_call_kwargs = mock_notion.pages.create.call_args[1]
+        self.assertNotIn('cover', create_call_kwargs)
         self.assertEqual(
-            update_call_kwargs['properties']['title']['title'][0]['text']['content'], 
+            create_call_kwargs['properties']['title']['title'][0]['text']['content'], 
             "Simple Title"
         )
+        self.assertEqual(len(create_call_kwargs['children']), 1)
 
     @patch('md2notionpage.core.notion')
     def test_batching_logic(self, mock_notion):
@@ -142,15 +137,13 @@ print("Hello")
         
         md2notionpage(markdown_text, "Batch Test", self.parent_page_id)
         
-        # Should be called twice: once for first 100, once for remaining 50
-        self.assertEqual(mock_notion.blocks.children.append.call_count, 2)
-        
-        # Verify first batch size
-        first_call = mock_notion.blocks.children.append.call_args_list[0]
-        self.assertEqual(len(first_call[1]['children']), 100)
+        # First 100 are sent with the page, the remaining 50 in one append call
+        create_call = mock_notion.pages.create.call_args
+        self.assertEqual(len(create_call[1]['children']), 100)
+        self.assertEqual(mock_notion.blocks.children.append.call_count, 1)
         
         # Verify second batch size
-        second_call = mock_notion.blocks.children.append.call_args_list[1]
+        second_call = mock_notion.blocks.children.append.call_args_list[0]
         self.assertEqual(len(second_call[1]['children']), 50)
 
     @patch('md2notionpage.core.notion')
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import tempfile
+import unittest
+from unittest.mock import patch
+from md2notionpage import md2notionpage, metrics
+from md2notionpage.metrics import MetricsCollector, Hooks, endpoint_name
+from md2notionpage.mock_server import MockNotionServer
+
+
+class FailingHooks(Hooks):
+
+    def request(self, *args):
+        raise RuntimeError("broken hook")
+
+
+class TestMetrics(unittest.TestCase):
+
+    markdown = "\n\n".join(f"## Section {i}\n\nText **{i}**\n\n- Item\n - Nested\n  - Deeper\n   - Deepest" for i in range(80))
+
+    def upload(self, server, title="Title"):
+        with patch("md2notionpage.core.notion", server.client()):
+            return md2notionpage(self.markdown, title, "parent-id")
+
+    def test_collector_counts_requests_and_stages(self):
+        collector = MetricsCollector()
+        metrics.add_hooks(collector)
+        with MockNotionServer(rate_limited=0.1, seed=2) as server:
+            self.upload(server, "First")
+            self.upload(server, "Second")
+            summary = collector.summary()
+
+            self.assertEqual(summary["requests_total"], server.request_count)
+            self.assertEqual(summary["rate_limited"], server.rate_limited_count)
+            self.assertGreater(summary["rate_limited"], 0)
+            self.assertEqual(summary["retries"], summary["rate_limited"])
+            self.assertEqual(summary["blocks_created"], server.block_count())
+            self.assertGreater(summary["bytes_sent"], 0)
+            self.assertEqual(summary["requests"]["pages.create"]["200"]["count"], 2)
+            self.assertIn("429", summary["requests"]["blocks.children.append"])
+            self.assertEqual(set(summary["stages"]), {"parse", "prepare", "create_page", "append", "upload"})
+            self.assertEqual(summary["stages"]["upload"]["count"], 2)
+            self.assertEqual({document["document"] for document in summary["slowest_documents"]}, {"First", "Second"})
+            json.dumps(summary)
+
+    def test_documents_with_the_same_title_are_counted_apart(self):
+        collector = MetricsCollector()
+        metrics.add_hooks(collector)
+        with MockNotionServer() as server, patch("md2notionpage.core.notion", server.client()):
+            md2notionpage(self.markdown, "README", "parent-id")
+            md2notionpage(self.markdown, "README", "parent-id")
+            md2notionpage(self.markdown, "README", "parent-id", document_id="docs/a/README.md")
+            md2notionpage(self.markdown, "README", "parent-id", document_id="docs/b/README.md")
+        summary = collector.summary()
+
+        self.assertEqual(summary["documents"], 4)
+        self.assertEqual([document["document"] for document in summary["slowest_documents"]], ["README"] * 4)
+        self.assertIn("docs/a/README.md", {document["id"] for document in summary["slowest_documents"]})
+        self.assertIn("md2notionpage_documents_total{} 4", collector.to_prometheus())
+
+    def test_prometheus_text(self):
+        collector = MetricsCollector()
+        metrics.add_hooks(collector)
+        with MockNotionServer(rate_limited=0.1, seed=2) as server:
+            self.upload(server)
+        text = collector.to_prometheus()
+
+        sample = re.compile(r'^md2notionpage_[a-z_]+(\{([a-z_]+="[^"]*",?)*\})? [0-9.e+-]+$')
+        for line in text.splitlines():
+            self.assertTrue(line.startswith("# ") or sample.match(line), line)
+        self.assertIn('md2notionpage_retries_total{endpoint="blocks.children.append",status="429"}', text)
+        self.assertIn('md2notionpage_stage_seconds_count{stage="upload"} 1', text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "md2notionpage.prom")
+            collector.write_prometheus(path)
+            with open(path, encoding="utf-8") as file:
+                self.assertEqual(file.read(), text)
+            self.assertEqual(os.listdir(directory), ["md2notionpage.prom"])
+
+    def test_failing_hook_does_not_stop_the_upload(self):
+        collector = MetricsCollector()
+        metrics.add_hooks(FailingHooks())
+        metrics.add_hooks(collector)
+        with MockNotionServer() as server, self.assertLogs("md2notionpage.metrics", level="ERROR"):
+            self.upload(server)
+            self.assertEqual(collector.summary()["requests_total"], server.request_count)
+
+    def test_removed_hooks_are_not_called(self):
+        collector = MetricsCollector()
+        metrics.add_hooks(collector)
+        metrics.remove_hooks(collector)
+        with MockNotionServer() as server, patch("md2notionpage.metrics.request_info") as request_info:
+            self.upload(server)
+
+        request_info.assert_not_called()
+        self.assertEqual(collector.summary()["requests_total"], 0)
+
+    def test_endpoint_names(self):
+        with MockNotionServer() as server:
+            notion = server.client()
+        self.assertEqual(endpoint_name(notion.pages.create), "pages.create")
+        self.assertEqual(endpoint_name(notion.blocks.children.append), "blocks.children.append")
+        self.assertEqual(endpoint_name(notion.file_uploads.send), "file_uploads.send")
+
+
+if __name__ == "__main__":
+    unittest.main()
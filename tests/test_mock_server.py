@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch
+from notion_client.errors import APIResponseError
+from md2notionpage import md2notionpage, sync_notion_page_from_md
+from md2notionpage.core import parse_md, iter_split_blocks, block_children
+from md2notionpage.mock_server import MockNotionServer
+from md2notionpage.sync import block_fingerprint
+
+
+class TestMockServer(unittest.TestCase):
+
+    markdown = "\n\n".join(f"## Section {i}\n\nText **{i}**\n\n- Item\n - Nested\n  - Deeper\n   - Deepest" for i in range(80))
+
+    def tree(self, server, parent_id):
+        return [(block_fingerprint(server.blocks[block_id]), self.tree(server, block_id)) for block_id in server.children[parent_id]]
+
+    def expected_tree(self, blocks):
+        return [(block_fingerprint(block), self.expected_tree(block_children(block))) for block in blocks]
+
+    def upload(self, server, markdown):
+        with patch("md2notionpage.core.notion", server.client()):
+            return md2notionpage(markdown, "Title", "parent-id")
+
+    def test_upload_builds_the_page(self):
+        with MockNotionServer() as server:
+            url = self.upload(server, self.markdown)
+            page_id, = server.pages
+
+            self.assertTrue(url.startswith(server.base_url))
+            self.assertEqual(self.tree(server, page_id), self.expected_tree(iter_split_blocks(parse_md(self.markdown))))
+            self.assertGreater(server.request_count, 4)
+
+    def test_rate_limited_requests_are_retried(self):
+        with MockNotionServer(rate_limited=0.1, seed=2) as server:
+            self.upload(server, self.markdown)
+            page_id, = server.pages
+
+            self.assertGreater(server.rate_limited_count, 0)
+            self.assertEqual(self.tree(server, page_id), self.expected_tree(iter_split_blocks(parse_md(self.markdown))))
+
+    def test_sync_lists_pages(self):
+        with MockNotionServer() as server:
+            self.upload(server, self.markdown)
+            page_id, = server.pages
+            with patch("md2notionpage.core.notion", server.client()):
+                changes = sync_notion_page_from_md(self.markdown, page_id)
+
+            self.assertEqual(changes["updated"] + changes["inserted"] + changes["deleted"], 0)
+
+    def test_failed_requests_are_retried(self):
+        with MockNotionServer() as server:
+            server.fail_next(2, status=502)
+            self.upload(server, self.markdown)
+            page_id, = server.pages
+
+            self.assertEqual(server.failure_count, 2)
+            self.assertEqual([request["status"] for request in server.requests[:3]], [502, 502, 200])
+            self.assertEqual(self.tree(server, page_id), self.expected_tree(iter_split_blocks(parse_md(self.markdown))))
+
+    def test_requests_beyond_the_rate_are_rate_limited(self):
+        now = [0.0]
+        server = MockNotionServer(rate_limit=2, burst=3, clock=lambda: now[0])
+        try:
+            statuses = [server.handle("GET", "/v1/databases/missing", {})[0] for _ in range(5)]
+            now[0] = 1.0
+            statuses += [server.handle("GET", "/v1/databases/missing", {})[0] for _ in range(3)]
+        finally:
+            server.httpd.server_close()
+
+        self.assertEqual(statuses, [404, 404, 404, 429, 429, 404, 404, 429])
+        self.assertEqual(server.handle("GET", "/v1/databases/missing", {})[2], {"Retry-After": "1"})
+
+    def test_requests_over_the_limits_are_rejected(self):
+        paragraph = {"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": "x"}}]}}
+        def nested(depth):
+            item = {"type": "bulleted_list_item", "bulleted_list_item": {"rich_text": []}}
+            if depth:
+                item["bulleted_list_item"]["children"] = [nested(depth - 1)]
+            return item
+        invalid = [
+            [paragraph] * 101,
+            [nested(3)],
+            [{"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": "x" * 2001}}]}}],
+            [{"type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": "x"}}] * 101}}],
+            [{"type": "equation", "equation": {"expression": "x" * 1001}}],
+        ]
+        with MockNotionServer() as server:
+            notion = server.client()
+            page = notion.pages.create(parent={"page_id": "parent-id"}, properties={}, children=[nested(2)])
+            for children in invalid:
+                with self.assertRaises(APIResponseError) as context:
+                    notion.blocks.children.append(block_id=page["id"], children=children)
+                self.assertEqual(context.exception.code, "validation_error")
+
+            self.assertEqual(server.rejected_count, len(invalid))
+            self.assertEqual(server.block_count(), 3)
+
+    def test_oversized_request_body_is_rejected(self):
+        server = MockNotionServer()
+        try:
+            status, response, _ = server.handle("POST", "/v1/pages", {"parent": {"page_id": "parent-id"}}, size=500001)
+        finally:
+            server.httpd.server_close()
+
+        self.assertEqual((status, response["code"]), (400, "validation_error"))
+        self.assertEqual(server.pages, {})
+
+    def test_database_pages_and_updates(self):
+        with MockNotionServer() as server:
+            notion = server.client()
+            database_id = server.add_database(title_property="Task")
+            database = notion.databases.retrieve(database_id=database_id)
+            page = notion.pages.create(parent={"database_id": database_id},
+                                       properties={"Task": {"title": [{"text": {"content": "Title"}}]}})
+            notion.pages.update(page_id=page["id"], in_trash=True)
+            with self.assertRaises(APIResponseError):
+                notion.pages.create(parent={"database_id": database_id}, properties={"Name": {"title": []}})
+
+            self.assertEqual(database["properties"]["Task"]["type"], "title")
+            self.assertTrue(notion.pages.retrieve(page_id=page["id"])["in_trash"])
+            self.assertEqual([request["method"] for request in server.requests], ["GET", "POST", "PATCH", "POST", "GET"])
+
+
+if __name__ == "__main__":
+    unittest.main()
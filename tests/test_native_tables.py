@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+from md2notionpage import md2notionpage, sync_notion_page_from_md
+from md2notionpage.core import parse_md, iter_split_blocks, block_json_size, json_size, to_notion_block
+from md2notionpage.mock_server import MockNotionServer
+
+
+def table_markdown(rows):
+    return "| Name | Value |\n|---|---|\n" + "\n".join(f"| **Row {i}** | {i} |" for i in range(rows))
+
+
+class TestNativeTables(unittest.TestCase):
+
+    def test_table_block(self):
+        table, = parse_md("| a | *b* |\n| --- | --- |\n| 1 |\n| [x](https://example.com) | 2 |", table_mode="native")
+        rows = table["table"]["children"]
+
+        self.assertEqual(table["type"], "table")
+        self.assertEqual(table["table"]["table_width"], 2)
+        self.assertTrue(table["table"]["has_column_header"])
+        self.assertEqual([row["type"] for row in rows], ["table_row"] * 3)
+        self.assertTrue(rows[0]["table_row"]["cells"][1][0]["annotations"]["italic"])
+        # Short rows are padded to the width of the table
+        self.assertEqual(rows[1]["table_row"]["cells"][1], [])
+        self.assertEqual(rows[2]["table_row"]["cells"][0][0]["text"]["link"]["url"], "https://example.com")
+
+    def test_table_without_header(self):
+        table, = parse_md("| a | b |\n| 1 | 2 |", table_mode="native")
+        self.assertFalse(table["table"]["has_column_header"])
+        self.assertEqual(len(table["table"]["children"]), 2)
+
+    def test_alignment_row(self):
+        markdown = "| Left | Right | Center |\n| :--- | ---: |:-:|\n| a | 1 | x |\n| b | 2 | y |\n\nAfter"
+        table, paragraph = parse_md(markdown, table_mode="native")
+        rows = table["table"]["children"]
+
+        self.assertTrue(table["table"]["has_column_header"])
+        self.assertEqual([row["table_row"]["cells"][0][0]["text"]["content"] for row in rows], ["Left", "a", "b"])
+        self.assertEqual(paragraph["type"], "paragraph")
+
+        equation, _ = parse_md(markdown)
+        self.assertIn("\\textbf{Left}", equation["equation"]["expression"])
+        self.assertNotIn("---", equation["equation"]["expression"])
+
+    def test_latex_is_the_default(self):
+        self.assertEqual([block["type"] for block in parse_md(table_markdown(3))], ["equation"])
+
+    def test_invalid_table_mode(self):
+        with self.assertRaises(ValueError):
+            parse_md(table_markdown(3), table_mode="html")
+
+    def test_json_size_of_compact_table(self):
+        table, = parse_md(table_markdown(50) + " é |", compact=True, table_mode="native")
+        self.assertEqual(block_json_size(table), json_size(to_notion_block(table)))
+
+    def test_long_cells_are_split(self):
+        table, = iter_split_blocks(parse_md("| a | b |\n| " + "word " * 1000 + "| 2 |", table_mode="native"))
+        cell = table["table"]["children"][1]["table_row"]["cells"][0]
+
+        self.assertGreater(len(cell), 1)
+        self.assertTrue(all(len(seg["text"]["content"]) <= 2000 for seg in cell))
+
+    def test_rows_are_appended_in_batches(self):
+        markdown = "# Report\n\n" + table_markdown(2000) + "\n\nEnd"
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                md2notionpage(markdown, "Title", "parent-id", table_mode="native")
+            page_id, = server.pages
+            table_id = server.children[page_id][1]
+            appended = [len(request["body"]["children"]) for request in server.requests if request["path"] == f"/v1/blocks/{table_id}/children"]
+
+            self.assertEqual([server.blocks[block_id]["type"] for block_id in server.children[page_id]], ["heading_1", "table", "paragraph"])
+            self.assertEqual(len(server.children[table_id]), 2001)
+            self.assertEqual(sum(appended), 2001 - 100)
+            self.assertTrue(all(count <= 100 for count in appended))
+            self.assertEqual(server.rejected_count, 0)
+
+    def test_sync_updates_changed_rows(self):
+        markdown = table_markdown(150)
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                md2notionpage(markdown, "Title", "parent-id", table_mode="native")
+                page_id, = server.pages
+                unchanged = sync_notion_page_from_md(markdown, page_id, table_mode="native")
+                changed = sync_notion_page_from_md(markdown.replace("| 120 |", "| 121 |"), page_id, table_mode="native")
+
+            self.assertEqual(unchanged["updated"] + unchanged["inserted"] + unchanged["deleted"], 0)
+            self.assertEqual((changed["updated"], changed["inserted"], changed["deleted"]), (1, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import threading
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from md2notionpage import md2notionpage, md2notionpage_async
+from md2notionpage.core import parse_md, plan_block, iter_upload_batches, block_children, count_blocks
+
+
+class FakeNotion:
+    """
+    Stand-in for the Notion client that checks the request limits and rebuilds the uploaded block tree.
+    """
+
+    def __init__(self, test):
+        self.test = test
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.children = {}
+        self.requests = []
+
+    def store(self, parent_id, blocks):
+        self.check_request(blocks)
+        results = []
+        with self.lock:
+            self.requests.append(parent_id)
+            for block in blocks:
+                block_id = f"block-{next(self.ids)}"
+                self.children.setdefault(parent_id, []).append((block_id, block))
+                results.append({"id": block_id})
+        return {"results": results}
+
+    def check_request(self, blocks, depth=0):
+        self.test.assertLessEqual(len(blocks), 100)
+        self.test.assertLessEqual(depth, 2)
+        if depth == 0:
+            self.test.assertLessEqual(sum(count_blocks(block) for block in blocks), 1000)
+        for block in blocks:
+            children = block_children(block)
+            if children:
+                self.check_request(children, depth + 1)
+
+    def create(self, **kwargs):
+        self.store("page-id", kwargs["children"])
+        return {"id": "page-id", "url": "https://notion.so/page"}
+
+    def append(self, block_id, children):
+        return self.store(block_id, children)
+
+    def tree(self, parent_id="page-id"):
+        """
+        Return the blocks uploaded under a parent with the children appended later put back in place.
+        """
+        blocks = []
+        for block_id, block in self.children.get(parent_id, []):
+            children = block_children(block) + self.tree(block_id)
+            body = {key: value for key, value in block[block["type"]].items() if key != "children"}
+            if children:
+                body["children"] = children
+            blocks.append(dict(block, **{block["type"]: body}))
+        return blocks
+
+    def client(self):
+        fake = MagicMock()
+        fake.pages.create.side_effect = self.create
+        fake.blocks.children.append.side_effect = self.append
+        return fake
+
+    def async_client(self):
+        fake = MagicMock()
+        fake.pages.create = AsyncMock(side_effect=self.create)
+        fake.blocks.children.append = AsyncMock(side_effect=self.append)
+        return fake
+
+
+def outline(depth, width, prefix=""):
+    """
+    Return Markdown for a bulleted outline with width items on each of depth levels.
+    """
+    lines = []
+    for i in range(width):
+        lines.append(" " * prefix.count(".") + f"- Item {prefix}{i}")
+        if depth > 1:
+            lines.extend(outline(depth - 1, width, f"{prefix}{i}."))
+    return lines
+
+
+class TestNesting(unittest.TestCase):
+
+    def upload(self, markdown):
+        fake = FakeNotion(self)
+        with patch("md2notionpage.core.notion", fake.client()):
+            url = md2notionpage(markdown, "title", "parent123")
+        self.assertEqual(url, "https://notion.so/page")
+        return fake
+
+    def test_shallow_blocks_are_sent_as_they_are(self):
+        block = parse_md("- a\n - b\n  - c")[0]
+        self.assertEqual(plan_block(block), (block, []))
+
+    def test_deep_outline_is_rebuilt(self):
+        markdown = "\n".join(outline(6, 3))
+        fake = self.upload(markdown)
+        self.assertEqual(fake.tree(), parse_md(markdown))
+
+    def test_wide_children_are_split(self):
+        markdown = "- Parent\n" + "\n".join(f" - Child {i}" for i in range(250))
+        fake = self.upload(markdown)
+        self.assertEqual(fake.tree(), parse_md(markdown))
+        # The parent is created with its first 100 children, the rest is appended to it
+        self.assertEqual(len(fake.requests), 4)
+
+    def test_requests_of_a_wide_deep_outline(self):
+        markdown = "\n".join(outline(6, 3))
+        fake = self.upload(markdown)
+        self.assertEqual(fake.tree(), parse_md(markdown))
+        # The page, its 3 top-level items, then one request for each block whose children are too deep
+        # to be sent along with it: the 3 items of level 1 and the 9 of level 2. The last 3 levels are
+        # sent with the 27 blocks of level 3.
+        self.assertEqual(len(fake.requests), 1 + 1 + 3 + 9 + 27)
+
+        markdown = "- Top\n" + "\n".join(f" - Leaf {i}" for i in range(20)) + "\n" + "\n".join(outline(5, 2, "0.")) + "\n" + "\n".join(f" - Leaf {i}" for i in range(20, 40))
+        fake = self.upload(markdown)
+        self.assertEqual(fake.tree(), parse_md(markdown))
+        # The deep items and the leaves after them go to Top in a single request
+        self.assertEqual(len(fake.requests), 1 + 1 + 1 + 2 + 4)
+
+    def test_children_are_appended_as_soon_as_their_parent_is_created(self):
+        fake = FakeNotion(self)
+        deeper = threading.Event()
+        waited = []
+
+        def append(block_id, children):
+            text = children[0]["bulleted_list_item"]["rich_text"][0]["text"]["content"]
+            if text == "Item 0.0.0":
+                deeper.set()
+            elif text == "Item 1.0":
+                # The subtree of the first item goes on while its sibling is slow
+                waited.append(deeper.wait(5))
+            return fake.append(block_id, children)
+
+        client = fake.client()
+        client.blocks.children.append.side_effect = append
+        markdown = "\n".join(outline(5, 2))
+        with patch("md2notionpage.core.notion", client):
+            md2notionpage(markdown, "title", "parent123")
+
+        self.assertEqual(waited, [True])
+        self.assertEqual(fake.tree(), parse_md(markdown))
+
+    def test_total_blocks_per_request_are_limited(self):
+        markdown = "\n".join(outline(3, 12))
+        fake = self.upload(markdown)
+        self.assertEqual(fake.tree(), parse_md(markdown))
+
+    def test_first_batch_stops_before_deferred_children(self):
+        blocks = parse_md("Intro\n" + "\n".join(outline(4, 2)))
+        batches = list(iter_upload_batches(blocks, plain_first_batch=True))
+        self.assertEqual([len(batch) for batch in batches], [1, 2])
+        self.assertFalse(any(deferred for _, deferred in batches[0]))
+
+    def test_async_deep_outline_is_rebuilt(self):
+        markdown = "\n".join(outline(5, 3))
+        fake = FakeNotion(self)
+        with patch("md2notionpage.async_core.async_notion", fake.async_client()):
+            url = asyncio.run(md2notionpage_async(markdown, "title", "parent123"))
+        self.assertEqual(url, "https://notion.so/page")
+        self.assertEqual(fake.tree(), parse_md(markdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
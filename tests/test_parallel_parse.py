@@ -0,0 +1,49 @@
+import os
+import unittest
+from unittest.mock import patch
+from md2notionpage.core import parse_md, parse_md_parallel, iter_line_chunks
+
+
+class TestParallelParse(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        example = os.path.join(os.path.dirname(__file__), "..", "example.md")
+        with open(example, encoding="utf-8") as file:
+            cls.example = file.read()
+
+    def test_same_blocks_as_serial_parser(self):
+        markdown = "\n\n".join([self.example] * 20)
+        self.assertEqual(parse_md_parallel(markdown, workers=2, chunk_size=50), parse_md(markdown))
+
+    def test_chunks_do_not_split_open_blocks(self):
+        lines = [
+            "- a", " - b", "", " - c",
+            "", "| x | y |", "|---|---|", "| 1 | 2 |", "",
+            "", "    code", "", "    more", "",
+            "", "Text", "", "Last",
+        ]
+        chunks = list(iter_line_chunks(lines, chunk_size=1))
+
+        self.assertEqual(sum(chunks, []), lines)
+        # Not before the nested item " - c", nor after the blank line that ends the table
+        self.assertEqual([chunk[0] for chunk in chunks], ["- a", "| x | y |", "    code", "    more", "", "Text", "Last"])
+
+    def test_nested_list_continues_after_paragraphs(self):
+        markdown = "- a\n - b\n\nText\n\n - c\n\nMore\n\n- d\n\nEnd"
+        self.assertEqual(parse_md_parallel(markdown, workers=2, chunk_size=1), parse_md(markdown))
+
+    def test_placeholders_are_numbered_across_chunks(self):
+        markdown = "\n\n".join(f"```python\nprint({i})\n\nx = {i}\n```\n\n$$\nx_{i}\n$$" for i in range(30))
+        self.assertEqual(parse_md_parallel(markdown, workers=2, chunk_size=5), parse_md(markdown))
+
+    def test_short_text_is_parsed_in_process(self):
+        with patch("md2notionpage.core.ProcessPoolExecutor") as pool:
+            blocks = parse_md_parallel(self.example)
+
+        pool.assert_not_called()
+        self.assertEqual(blocks, parse_md(self.example))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from md2notionpage.core import parse_md, process_inline_formatting, iter_split_blocks, set_parse_cache_size, clear_parse_cache, parse_cache_info
+
+
+class TestParseCache(unittest.TestCase):
+
+    markdown = "\n".join([
+        "> **Note:** generated file, do not edit.",
+        "",
+        "```python\nprint('x')\n```",
+        "",
+        "| A | B |\n|---|---|\n| 1 | 2 |",
+        "",
+        "Text",
+    ] * 50)
+
+    def tearDown(self):
+        set_parse_cache_size()
+
+    def test_repeated_lines_hit_the_cache(self):
+        clear_parse_cache()
+        parse_md(self.markdown)
+        info = parse_cache_info()
+
+        self.assertEqual(info["inline"].misses, 2)
+        self.assertEqual(info["inline"].hits, 98)
+        self.assertEqual((info["code"].hits, info["code"].misses), (49, 1))
+        self.assertEqual((info["table"].hits, info["table"].misses), (49, 1))
+
+    def test_same_blocks_as_without_cache(self):
+        set_parse_cache_size(0)
+        uncached = parse_md(self.markdown)
+        set_parse_cache_size()
+        parse_md(self.markdown)
+
+        self.assertEqual(parse_md(self.markdown), uncached)
+
+    def test_returned_list_is_a_copy(self):
+        rich_text = process_inline_formatting("**bold** text")
+        rich_text.append({"type": "text", "text": {"content": "more"}})
+
+        self.assertEqual(len(process_inline_formatting("**bold** text")), 2)
+
+    def test_splitting_does_not_modify_cached_results(self):
+        line = " ".join(["**word**"] * 600)
+        before = process_inline_formatting(line)
+        list(iter_split_blocks(parse_md(line)))
+
+        self.assertEqual(process_inline_formatting(line), before)
+        self.assertTrue(all(seg["text"]["content"] == "word" for seg in before if seg.get("annotations", {}).get("bold")))
+
+    def test_cache_is_bounded(self):
+        set_parse_cache_size(10)
+        parse_md("\n\n".join(f"Line {i}" for i in range(100)))
+
+        self.assertEqual(parse_cache_info()["inline"].currsize, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from md2notionpage import md2notionpage
+from md2notionpage.core import BackgroundIterator
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.fake_notion = MagicMock()
+        self.fake_notion.pages.create.return_value = {"id": "page-id", "url": "url"}
+
+    def test_same_requests_as_sequential_upload(self):
+        markdown = "\n".join(f"- Item {i}" for i in range(250))
+
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            md2notionpage(markdown, "title", "parent123")
+        sequential = self.fake_notion.mock_calls
+
+        self.fake_notion.reset_mock()
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            md2notionpage(markdown, "title", "parent123", pipeline=True)
+        pipelined = self.fake_notion.mock_calls
+
+        appended = self.fake_notion.blocks.children.append.call_args_list
+        self.assertEqual([len(c[1]["children"]) for c in appended], [100, 50])
+        self.assertEqual(pipelined, sequential)
+
+    def test_producer_error_is_raised_in_consumer(self):
+        def items():
+            yield 1
+            raise RuntimeError("parse failed")
+
+        pipeline = BackgroundIterator(items())
+        self.assertEqual(next(pipeline), 1)
+        with self.assertRaises(RuntimeError):
+            next(pipeline)
+        pipeline.close()
+
+    def test_queue_is_bounded(self):
+        produced = []
+
+        def items():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        pipeline = BackgroundIterator(items(), maxsize=2)
+        time.sleep(0.1)
+        # Two items queued plus at most one waiting to be put
+        self.assertLessEqual(len(produced), 3)
+        pipeline.close()
+
+    def test_failed_upload_stops_producer(self):
+        self.fake_notion.blocks.children.append.side_effect = RuntimeError("upload failed")
+        markdown = "\n".join(f"Line {i}" for i in range(5000))
+        threads_before = threading.active_count()
+
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            with self.assertRaises(RuntimeError):
+                md2notionpage(markdown, "title", "parent123", pipeline=True)
+
+        self.assertEqual(self.fake_notion.blocks.children.append.call_count, 1)
+        self.assertEqual(threading.active_count(), threads_before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import httpx
+from notion_client.errors import APIResponseError
+from md2notionpage import ratelimit
+from md2notionpage.ratelimit import RateLimiter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def rate_limited_error(retry_after=None):
+    headers = httpx.Headers({"retry-after": retry_after} if retry_after is not None else {})
+    return APIResponseError(code="rate_limited", status=429, message="Rate limited", headers=headers, raw_body_text="")
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(rate=3.0, burst=2, clock=self.clock)
+
+    def test_burst_then_average_rate(self):
+        self.assertEqual(self.limiter.reserve(), 0.0)
+        self.assertEqual(self.limiter.reserve(), 0.0)
+        # The bucket is empty: requests queue up one interval apart
+        self.assertAlmostEqual(self.limiter.reserve(), 1 / 3)
+        self.assertAlmostEqual(self.limiter.reserve(), 2 / 3)
+
+        self.clock.now += 10
+        self.assertEqual(self.limiter.reserve(), 0.0)
+
+    def test_rate_limited_honors_retry_after_and_backs_off(self):
+        self.limiter.rate_limited(retry_after=5)
+
+        self.assertEqual(self.limiter.rate, 1.5)
+        self.assertGreaterEqual(self.limiter.reserve(), 5)
+
+        for _ in range(100):
+            self.limiter.succeeded()
+        self.assertEqual(self.limiter.rate, 3.0)
+
+    def test_back_off_stops_at_min_rate(self):
+        for _ in range(10):
+            self.limiter.rate_limited()
+
+        self.assertEqual(self.limiter.rate, self.limiter.min_rate)
+
+    def test_retry_after_header(self):
+        self.assertEqual(ratelimit.retry_after_seconds(rate_limited_error("2")), 2.0)
+        self.assertIsNone(ratelimit.retry_after_seconds(rate_limited_error()))
+
+
+class TestSend(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter(rate=1000.0, burst=10)
+        self.limiter.rate_limited = MagicMock(wraps=self.limiter.rate_limited)
+
+    def test_retries_rate_limited_requests(self):
+        request = MagicMock(side_effect=[rate_limited_error("0"), rate_limited_error("0"), {"ok": True}])
+
+        with patch.object(ratelimit, "rate_limiter", self.limiter):
+            self.assertEqual(ratelimit.send(request, "block-id", children=[]), {"ok": True})
+
+        self.assertEqual(request.call_count, 3)
+        request.assert_called_with("block-id", children=[])
+        self.assertEqual(self.limiter.rate_limited.call_args_list[0][0], (0.0,))
+
+    def test_gives_up_after_max_retries(self):
+        request = MagicMock(side_effect=rate_limited_error("0"))
+
+        with patch.object(ratelimit, "rate_limiter", self.limiter), patch.object(ratelimit, "retry_policy", ratelimit.RetryPolicy(max_retries=2)):
+            with self.assertRaises(APIResponseError):
+                ratelimit.send(request)
+
+        self.assertEqual(request.call_count, 3)
+
+    def test_other_errors_are_raised(self):
+        error = APIResponseError(code="validation_error", status=400, message="bad", headers=httpx.Headers(), raw_body_text="")
+        request = MagicMock(side_effect=error)
+
+        with patch.object(ratelimit, "rate_limiter", self.limiter):
+            with self.assertRaises(APIResponseError):
+                ratelimit.send(request)
+
+        self.assertEqual(request.call_count, 1)
+
+    def test_send_async(self):
+        request = AsyncMock(side_effect=[rate_limited_error("0"), {"ok": True}])
+
+        with patch.object(ratelimit, "rate_limiter", self.limiter):
+            self.assertEqual(asyncio.run(ratelimit.send_async(request, "page-id")), {"ok": True})
+
+        self.assertEqual(request.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
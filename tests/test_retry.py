@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import httpx
+from notion_client.errors import APIResponseError, RequestTimeoutError
+from md2notionpage import md2notionpage, ratelimit
+from md2notionpage.core import parse_resume_token
+
+
+def api_error(status, code):
+    return APIResponseError(code=code, status=status, message=code, headers=httpx.Headers(), raw_body_text="")
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.fake_notion = MagicMock()
+        self.fake_notion.pages.create.return_value = {"id": "page-id", "url": "https://notion.so/page"}
+        self.fake_notion.pages.retrieve.return_value = {"id": "page-id", "url": "https://notion.so/page"}
+        self.markdown = "\n".join(f"Line {i}" for i in range(450))
+        patcher = patch.object(ratelimit, "retry_policy", ratelimit.RetryPolicy(max_retries=3, base_delay=0.001))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transient_errors_are_retried(self):
+        self.fake_notion.blocks.children.append.side_effect = [
+            {}, api_error(503, "service_unavailable"), api_error(502, "notionhq_client_response_error"), {}, {}, {},
+        ]
+
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            url = md2notionpage(self.markdown, "title", "parent123")
+
+        self.assertEqual(url, "https://notion.so/page")
+        # The first batch goes with the page, four more are appended
+        self.assertEqual(self.fake_notion.blocks.children.append.call_count, 6)
+
+    def test_failed_append_carries_resume_token(self):
+        self.fake_notion.blocks.children.append.side_effect = [{}, api_error(504, "gateway_timeout")]
+
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            with self.assertRaises(APIResponseError) as context:
+                md2notionpage(self.markdown, "title", "parent123")
+
+        # A 504 may have been carried out, so appending is not retried
+        self.assertEqual(self.fake_notion.blocks.children.append.call_count, 2)
+        self.assertEqual(parse_resume_token(context.exception.resume_token), ("page-id", 2))
+
+    def test_resume_continues_on_the_same_page(self):
+        with patch("md2notionpage.core.notion", self.fake_notion):
+            url = md2notionpage(self.markdown, "title", "parent123", resume_token="page-id:2")
+
+        self.assertEqual(url, "https://notion.so/page")
+        self.fake_notion.pages.create.assert_not_called()
+        self.fake_notion.pages.retrieve.assert_called_once_with("page-id")
+        calls = self.fake_notion.blocks.children.append.call_args_list
+        self.assertEqual([len(c[1]["children"]) for c in calls], [100, 100, 50])
+        self.assertEqual(calls[0][1]["children"][0]["paragraph"]["rich_text"][0]["text"]["content"], "Line 200")
+
+    def test_invalid_resume_token(self):
+        with self.assertRaises(ValueError):
+            parse_resume_token("page-id")
+
+    def test_is_transient(self):
+        self.assertTrue(ratelimit.is_transient(api_error(503, "service_unavailable")))
+        self.assertFalse(ratelimit.is_transient(api_error(500, "internal_server_error")))
+        self.assertTrue(ratelimit.is_transient(api_error(500, "internal_server_error"), idempotent=True))
+        self.assertFalse(ratelimit.is_transient(api_error(400, "validation_error"), idempotent=True))
+        self.assertTrue(ratelimit.is_transient(httpx.ConnectError("refused")))
+        self.assertFalse(ratelimit.is_transient(RequestTimeoutError()))
+        self.assertTrue(ratelimit.is_transient(RequestTimeoutError(), idempotent=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
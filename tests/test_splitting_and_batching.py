@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import MagicMock, patch
-from md2notionpage.core import split_rich_text
+from md2notionpage.core import split_rich_text, iter_split_blocks, parse_md
 from md2notionpage import md2notionpage
 from copy import deepcopy
 
@@ -50,6 +50,100 @@ class TestSplittingAndBatching(unittest.TestCase):
                     self.assertTrue(rt.get("annotations", {}).get("bold"))
 
 
+    # 2b) Words landing in the same chunk are coalesced into one slice,
+    #     the text is preserved verbatim and annotations are shared, not copied
+
+    def test_coalesces_words_per_chunk(self):
+        annotations = {"bold": True, "italic": False}
+        text = "word " * 1000
+        seg = {
+            "type": "text",
+            "text": {"content": text, "link": None},
+            "annotations": annotations,
+            "plain_text": text,
+        }
+
+        chunks = split_rich_text([seg], 2000)
+
+        self.assertEqual(len(chunks), 3)
+        for chunk in chunks:
+            self.assertEqual(len(chunk), 1)
+            self.assertLessEqual(len(chunk[0]["text"]["content"]), 2000)
+            self.assertIs(chunk[0]["annotations"], annotations)
+            self.assertEqual(chunk[0]["plain_text"], chunk[0]["text"]["content"])
+        self.assertEqual("".join(c[0]["text"]["content"] for c in chunks), text)
+        # Source segment is left untouched
+        self.assertEqual(seg["text"]["content"], text)
+
+    def test_mixed_segments_keep_order(self):
+        segs = [
+            self.make_text_seg("x" * 1500 + " "),
+            {"type": "equation", "equation": {"expression": "e" * 600}},
+            self.make_text_seg(" tail"),
+        ]
+
+        chunks = split_rich_text(segs, 2000)
+
+        # An equation that does not fit is placed in a chunk of its own
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[0][0]["text"]["content"], "x" * 1500 + " ")
+        self.assertEqual(chunks[1][0]["type"], "equation")
+        self.assertEqual(chunks[2][0]["text"]["content"], " tail")
+
+
+    # 2c) Other block types keep one block with several rich text objects,
+    #     code is cut at line ends
+
+    def test_long_code_block_is_cut_at_lines(self):
+        code = "".join(f"SELECT {i} FROM generated_table WHERE id = {i};\n" for i in range(200))
+        unsplit, = parse_md(f"```sql\n{code}```")
+        blocks = list(iter_split_blocks([unsplit]))
+
+        self.assertEqual(len(blocks), 1)
+        rich_text = blocks[0]["code"]["rich_text"]
+        self.assertGreater(len(rich_text), 1)
+        self.assertEqual("".join(rt["text"]["content"] for rt in rich_text), unsplit["code"]["rich_text"][0]["text"]["content"])
+        for rt in rich_text:
+            self.assertLessEqual(len(rt["text"]["content"]), 2000)
+        self.assertTrue(all(rt["text"]["content"].endswith("\n") for rt in rich_text[:-1]))
+
+    def test_huge_code_block_becomes_consecutive_blocks(self):
+        code = "x" * 250000
+        blocks = list(iter_split_blocks(parse_md("Log:\n\n" + "\n".join("    " + code[i:i + 100] for i in range(0, len(code), 100)))))
+
+        code_blocks = [block for block in blocks if block["type"] == "code"]
+        self.assertEqual(len(code_blocks), 2)
+        self.assertEqual([len(block["code"]["rich_text"]) for block in code_blocks][0], 100)
+        self.assertTrue(all(block["code"]["language"] == "plain text" for block in code_blocks))
+
+    def test_long_quote_heading_and_list_items(self):
+        text = "word " * 1000
+        for markdown, block_type in [(f"> {text}", "quote"), (f"# {text}", "heading_1"), (f"- {text}", "bulleted_list_item"), (f"1. {text}", "numbered_list_item")]:
+            blocks = list(iter_split_blocks(parse_md(markdown)))
+            self.assertEqual([block["type"] for block in blocks], [block_type])
+            rich_text = blocks[0][block_type]["rich_text"]
+            self.assertEqual(len(rich_text), 3)
+            self.assertTrue(all(len(rt["text"]["content"]) <= 2000 for rt in rich_text))
+
+    def test_nested_items_and_captions_are_split(self):
+        markdown = "- parent\n - " + "word " * 1000 + "\n\n![" + "caption " * 300 + "](https://i.png)"
+        item, image = iter_split_blocks(parse_md(markdown))
+
+        child, = item["bulleted_list_item"]["children"]
+        self.assertEqual(len(child["bulleted_list_item"]["rich_text"]), 3)
+        self.assertEqual(len(image["image"]["caption"]), 2)
+
+    def test_paragraph_children_stay_with_last_part(self):
+        block = {"object": "block", "type": "paragraph", "paragraph": {
+            "rich_text": [self.make_text_seg("a" * 3000)],
+            "children": [{"object": "block", "type": "paragraph", "paragraph": {"rich_text": [self.make_text_seg("child")]}}],
+        }}
+        first, last = iter_split_blocks([block])
+
+        self.assertNotIn("children", first["paragraph"])
+        self.assertEqual(last["paragraph"]["children"], block["paragraph"]["children"])
+
+
     # 3) Batching logic: more than 100 blocks triggers multiple append calls
 
     def test_batching_over_100_blocks(self):
@@ -62,12 +156,13 @@ class TestSplittingAndBatching(unittest.TestCase):
 
             md2notionpage(big_md, "batch-test", "parent123", "")
 
-            # Notion allows max 100 children per call -> expect 3 calls:
-            # 100 + 100 + 50
+            # Notion allows max 100 children per call -> expect 100 blocks
+            # sent with the page and 2 append calls: 100 + 50
+            self.assertEqual(len(fake_notion.pages.create.call_args[1]["children"]), 100)
             self.assertEqual(
                 fake_notion.blocks.children.append.call_count,
-                3,
-                "Batching should call append() 3 times for 250 blocks",
+                2,
+                "Batching should call append() 2 times for 250 blocks",
             )
 
 
@@ -0,0 +1,202 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, patch
+from md2notionpage import md2notionpage, cli, spool as spool_module
+from md2notionpage.cache import PublishCache
+from md2notionpage.core import page_request_arguments
+from md2notionpage.mock_server import MockNotionServer
+from md2notionpage.spool import SpoolWriter, iter_spool, replay_spool
+from md2notionpage.sync import block_fingerprint
+
+
+outline = "\n".join(" " * depth + f"- Level {depth}" for depth in range(6))
+markdown = ("# Report\n\n" + "\n\n".join(f"Paragraph {i}" for i in range(150)) + "\n\n" + outline + "\n\n"
+            + "| Name | Value |\n|---|---|\n" + "\n".join(f"| Row {i} | {i} |" for i in range(300)) + "\n\nEnd")
+
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "img"))
+        with open(os.path.join(self.directory, "img", "chart.png"), "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\n" + os.urandom(100))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def tree(self, server, parent_id):
+        return [(block_fingerprint(server.blocks[block_id]), self.tree(server, block_id)) for block_id in server.children[parent_id]]
+
+    def spool(self, pages, **kwargs):
+        spool_file = io.StringIO()
+        fake_notion = MagicMock()
+        with patch("md2notionpage.core.notion", fake_notion), SpoolWriter(spool_file) as spool:
+            refs = [md2notionpage(text, title, "parent-id", spool=spool, **kwargs) for title, text in pages]
+        self.assertEqual(fake_notion.mock_calls, [])
+        spool_file.seek(0)
+        return spool_file, refs
+
+    def test_spool_holds_the_requests(self):
+        spool_file, refs = self.spool([("Title", markdown)], table_mode="native")
+        header = json.loads(spool_file.getvalue().splitlines()[0])
+        create, *appends = iter_spool(spool_file)
+
+        self.assertEqual(header, {"op": "spool", "version": 1})
+        self.assertEqual(refs, ["page-1"])
+        self.assertEqual(create["op"], "pages.create")
+        self.assertEqual(dict(create["args"], children=[]), page_request_arguments("Title", "parent-id"))
+        self.assertEqual(len(create["args"]["children"]), 100)
+        self.assertTrue(all(append["op"] == "blocks.children.append" for append in appends))
+        # The deferred children of the outline and the table rows go to blocks named by earlier requests
+        named = {ref for append in appends for ref in append.get("refs", ()) if ref}
+        deferred = [append for append in appends if append["level"] > 0]
+        self.assertTrue(deferred)
+        self.assertTrue(all(append["block_id"] in named for append in deferred))
+        self.assertTrue(all(len(append["args"]["children"]) <= 100 for append in appends))
+
+    def test_replay_builds_the_same_page(self):
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                md2notionpage(markdown, "Title", "parent-id", table_mode="native")
+            page_id, = server.pages
+            expected = self.tree(server, page_id)
+            request_count = server.request_count
+
+        spool_file, _ = self.spool([("Title", markdown)], table_mode="native")
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                (title, url), = replay_spool(spool_file)
+            page_id, = server.pages
+
+            self.assertEqual(title, "Title")
+            self.assertTrue(url.startswith(server.base_url))
+            self.assertEqual(self.tree(server, page_id), expected)
+            self.assertEqual(server.request_count, request_count)
+            self.assertEqual(server.rejected_count, 0)
+
+    def test_replay_pages_concurrently(self):
+        pages = [(f"Page {i}", f"# Page {i}\n\n" + outline * i) for i in range(6)]
+        spool_file, refs = self.spool(pages)
+        with MockNotionServer(latency=0.01) as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                results = replay_spool(spool_file, workers=3)
+
+            self.assertEqual(refs, [f"page-{i}" for i in range(1, 7)])
+            self.assertEqual([title for title, _ in results], [title for title, _ in pages])
+            self.assertEqual(len({url for _, url in results}), 6)
+            self.assertEqual(len(server.pages), 6)
+
+    def test_local_images_are_uploaded_on_replay(self):
+        pages = [("Chart", "![Chart](img/chart.png)"), ("Missing", "![Missing](img/missing.png)")]
+        spool_file, _ = self.spool(pages, image_dir=self.directory)
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                (_, url), (_, error) = replay_spool(spool_file, return_exceptions=True)
+            page_id = next(iter(server.pages))
+            image, = [server.blocks[block_id]["image"] for block_id in server.children[page_id]]
+
+            self.assertTrue(url.startswith(server.base_url))
+            self.assertIsInstance(error, FileNotFoundError)
+            self.assertEqual(image["type"], "file")
+            self.assertEqual(len(server.files), 1)
+
+    def test_failed_page_is_not_written(self):
+        spool_file = io.StringIO()
+        spool = SpoolWriter(spool_file)
+        unlocked = []
+
+        def batches(fail):
+            for i in range(3):
+                # Other pages can be written while this one is built
+                unlocked.append(spool.lock.acquire(blocking=False))
+                spool.lock.release()
+                if fail and i == 2:
+                    raise RuntimeError("parse error")
+                yield [({"type": "paragraph", "paragraph": {"rich_text": []}}, None)]
+
+        with self.assertRaises(RuntimeError):
+            spool.write_page(page_request_arguments("Broken", "parent-id"), batches(True), "Broken")
+        ref = spool.write_page(page_request_arguments("Title", "parent-id"), batches(False), "Title")
+        spool_file.seek(0)
+        records = list(iter_spool(spool_file))
+
+        self.assertTrue(all(unlocked))
+        self.assertEqual({record["page"] for record in records}, {ref})
+        self.assertEqual([record["op"] for record in records], ["pages.create", "blocks.children.append", "blocks.children.append"])
+        self.assertEqual(spool.request_count, 3)
+
+    def test_replay_resumes_from_the_progress_file(self):
+        pages = [("First", "# First\n\n" + outline), ("Report", markdown)]
+        spool_file, _ = self.spool(pages, table_mode="native")
+        progress_path = os.path.join(self.directory, "out.progress")
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                replay_spool(spool_file, workers=1)
+            expected = [self.tree(server, page_id) for page_id in server.pages]
+            request_count = server.request_count
+
+        sent = []
+
+        def send_until_failure(request, *args, **kwargs):
+            sent.append(request)
+            if len(sent) == 12:
+                # An append is not retried on a 500, which interrupts the second page
+                server.fail_next(status=500)
+            return real_send(request, *args, **kwargs)
+
+        real_send = spool_module.send
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                spool_file.seek(0)
+                with patch("md2notionpage.spool.send", send_until_failure):
+                    (_, first_url), (_, error) = replay_spool(spool_file, workers=1, return_exceptions=True, progress=progress_path)
+                spool_file.seek(0)
+                results = replay_spool(spool_file, workers=1, progress=progress_path)
+
+            self.assertIsInstance(error, Exception)
+            self.assertEqual(results[0], ("First", first_url))
+            self.assertEqual([self.tree(server, page_id) for page_id in server.pages], expected)
+            # Only the failed request was sent twice
+            self.assertEqual(server.request_count, request_count + 1)
+
+            spool_file.seek(0)
+            self.assertEqual(replay_spool(spool_file, progress=progress_path), results)
+            self.assertEqual(server.request_count, request_count + 1)
+
+    def test_spool_cannot_be_resumed_or_cached(self):
+        with self.assertRaises(ValueError):
+            md2notionpage("Text", "Title", "parent-id", spool=SpoolWriter(io.StringIO()), resume_token="page-id:1")
+        with self.assertRaises(ValueError):
+            md2notionpage("Text", "Title", "parent-id", spool=SpoolWriter(io.StringIO()), cache=PublishCache(os.path.join(self.directory, "cache.json")))
+
+    def test_not_a_spool_file(self):
+        with self.assertRaises(ValueError):
+            replay_spool(io.StringIO('{"object": "page"}\n'))
+
+    def test_cli_spools_and_replays(self):
+        markdown_file = os.path.join(self.directory, "notes.md")
+        spool_path = os.path.join(self.directory, "out.ndjson")
+        with open(markdown_file, "w", encoding="utf-8") as file:
+            file.write(markdown)
+
+        out = io.StringIO()
+        with patch("sys.argv", ["md2notionpage", markdown_file, "parent-id", "--spool", spool_path]), redirect_stdout(out):
+            cli.main()
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()), redirect_stdout(out):
+                cli.replay([spool_path, "--workers", "2"])
+
+            self.assertEqual(len(server.pages), 1)
+        self.assertIn(f"Notion requests written to {spool_path}", out.getvalue())
+        self.assertIn("Notion page created: notes -> ", out.getvalue())
+        self.assertIn("1 page(s) created, 0 failed.", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
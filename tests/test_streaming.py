@@ -0,0 +1,145 @@
+import io
+import os
+import unittest
+from random import Random
+from unittest.mock import MagicMock, patch
+from md2notionpage import md2notionpage
+from md2notionpage.core import parse_md, iter_notion_blocks
+
+EXAMPLE_MD = os.path.join(os.path.dirname(__file__), os.pardir, "example.md")
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_matches_parse_md(self):
+        with open(EXAMPLE_MD, encoding="utf-8") as file:
+            markdown = file.read()
+
+        with open(EXAMPLE_MD, encoding="utf-8") as file:
+            streamed = list(iter_notion_blocks(file))
+
+        self.assertEqual(streamed, parse_md(markdown))
+
+    def test_multiline_blocks_are_buffered_until_complete(self):
+        markdown = "\n".join([
+            "```python", "x = 1", "", "y = 2", "```",
+            "$$", "a^2", "$$",
+            "| A | B |", "|---|---|", "| 1 | 2 |",
+            "",
+            "- one", "  - two", "- three",
+        ])
+
+        streamed = list(iter_notion_blocks(markdown.split("\n")))
+
+        self.assertEqual(streamed, parse_md(markdown))
+        self.assertEqual(streamed[0]["code"]["rich_text"][0]["text"]["content"], "x = 1\n\ny = 2")
+        self.assertEqual(streamed[1]["equation"]["expression"], "a^2")
+
+    def test_whitespace_at_the_ends_matches_parse_md(self):
+        cases = [
+            "para\n    \n", "para   ", "a\n\n\n    x\n     ", "  \n\t\n  lead\n\ntrail \t\n \n\n",
+            "- item\n   \n  ", "```\ncode\n```\n   \n", "    x\n", "\n \n", "",
+        ]
+        for markdown in cases:
+            self.assertEqual(list(iter_notion_blocks(markdown)), parse_md(markdown), repr(markdown))
+            self.assertEqual(list(iter_notion_blocks(io.StringIO(markdown))), parse_md(markdown), repr(markdown))
+
+    def test_code_and_latex_delimiters_match_parse_md(self):
+        cases = [
+            "```py\n```python\nprint(1)\n```", "end $$\n$$ y $$", "$$$$\nx$$", "x $$ a $$ b $$\nc $$",
+            "x```py\ncode```x```js\nmore\n```", "``````js\nx\n```python\ny\n```", "```py\nx```\nc $$a$$ $$\nb\n$$",
+            "$$\n```py\nx\n$$\n```", "a $$b$$ c\n```py\n```",
+        ]
+        for markdown in cases:
+            self.assertEqual(list(iter_notion_blocks(markdown)), parse_md(markdown), repr(markdown))
+
+        def blocks_or_error(parse, markdown):
+            # Text after a placeholder on its line fails both parsers alike
+            try:
+                return list(parse(markdown))
+            except ValueError as e:
+                return str(e)
+
+        random = Random(0)
+        lines = ["```py", "```", "x```", "``````js", "$$", "$$$", "end $$", "$$ y $$", "a $$b$$ c", "text", "- a", ""]
+        for _ in range(2000):
+            markdown = "\n".join(random.choice(lines) for _ in range(random.randint(1, 10)))
+            self.assertEqual(blocks_or_error(iter_notion_blocks, markdown), blocks_or_error(parse_md, markdown), repr(markdown))
+
+    def test_yields_before_input_is_exhausted(self):
+        read = []
+
+        def lines():
+            for i in range(1000):
+                read.append(i)
+                yield f"Line {i}\n"
+
+        blocks = iter_notion_blocks(lines())
+        first = next(blocks)
+
+        self.assertEqual(first["paragraph"]["rich_text"][0]["text"]["content"], "Line 0")
+        self.assertLess(len(read), 5)
+
+    def test_yields_after_a_nested_list(self):
+        read = []
+
+        def lines():
+            yield "- a"
+            yield " - b"
+            yield ""
+            for i in range(5000):
+                read.append(i)
+                yield f"Paragraph {i}"
+
+        blocks = iter_notion_blocks(lines())
+        first, second = next(blocks), next(blocks)
+
+        self.assertEqual(first["bulleted_list_item"]["children"][0]["bulleted_list_item"]["rich_text"][0]["text"]["content"], "b")
+        self.assertEqual(second["paragraph"]["rich_text"][0]["text"]["content"], "Paragraph 0")
+        self.assertLess(len(read), 5)
+
+    def test_text_ends_a_nested_list(self):
+        markdown = "- a\n - b\nText\n - c\n  - d\n1. e\n - f"
+        blocks = parse_md(markdown)
+
+        self.assertEqual([block["type"] for block in blocks], ["bulleted_list_item", "paragraph", "bulleted_list_item", "numbered_list_item"])
+        self.assertEqual(len(blocks[0]["bulleted_list_item"]["children"]), 1)
+        self.assertEqual(blocks[2]["bulleted_list_item"]["children"][0]["bulleted_list_item"]["rich_text"][0]["text"]["content"], "d")
+        self.assertEqual(list(iter_notion_blocks(markdown)), blocks)
+
+    def test_upload_starts_before_input_is_read(self):
+        fake_notion = MagicMock()
+        fake_notion.pages.create.return_value = {"id": "page-id", "url": "url"}
+        read_at_first_request = []
+        read = []
+
+        def lines():
+            for i in range(250):
+                read.append(i)
+                yield f"Line {i}\n"
+
+        def create(**kwargs):
+            read_at_first_request.append(len(read))
+            return {"id": "page-id", "url": "url"}
+
+        fake_notion.pages.create.side_effect = create
+
+        with patch("md2notionpage.core.notion", fake_notion):
+            md2notionpage(lines(), "title", "parent123")
+
+        self.assertEqual(fake_notion.blocks.children.append.call_count, 2)
+        self.assertLess(read_at_first_request[0], 250)
+
+    def test_accepts_file_object(self):
+        fake_notion = MagicMock()
+        fake_notion.pages.create.return_value = {"id": "page-id", "url": "url"}
+
+        with patch("md2notionpage.core.notion", fake_notion):
+            md2notionpage(io.StringIO("# Title\n\nText\n"), "title", "parent123")
+
+        children = fake_notion.pages.create.call_args[1]["children"]
+        self.assertEqual([block["type"] for block in children], ["heading_1", "paragraph"])
+
+
+if __name__ == "__main__":
+    unittest.main()
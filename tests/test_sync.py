@@ -0,0 +1,186 @@
+import itertools
+import unittest
+from unittest.mock import MagicMock, patch
+from md2notionpage import md2notionpage, sync_notion_page_from_md
+from md2notionpage.core import parse_md, block_children
+from md2notionpage.mock_server import MockNotionServer
+from md2notionpage.sync import block_fingerprint
+
+
+class FakeNotion:
+    """
+    Stand-in for the Notion client that keeps a block tree and answers the requests a sync sends
+    the way Notion does: listed blocks have IDs, full annotations and has_children instead of children.
+    """
+
+    def __init__(self):
+        self.ids = itertools.count()
+        self.children = {"page-id": []}
+        self.client = MagicMock()
+        self.client.blocks.children.list.side_effect = self.list
+        self.client.blocks.children.append.side_effect = self.append
+        self.client.blocks.update.side_effect = self.update
+        self.client.blocks.delete.side_effect = self.delete
+
+    def writes(self):
+        """
+        Return the number of requests that changed the page.
+        """
+        blocks = self.client.blocks
+        return blocks.update.call_count + blocks.delete.call_count + blocks.children.append.call_count
+
+    def store(self, block):
+        block_id = f"block-{next(self.ids)}"
+        body = {key: value for key, value in block[block["type"]].items() if key != "children"}
+        for key in ("rich_text", "caption"):
+            if key in body:
+                body[key] = [self.annotate(seg) for seg in body[key]]
+        self.children[block_id] = []
+        for child in block_children(block):
+            self.children[block_id].append(self.store(child))
+        return {"object": "block", "id": block_id, "type": block["type"], block["type"]: body}
+
+    def annotate(self, seg):
+        seg = dict(seg)
+        seg.setdefault("annotations", {"bold": False, "italic": False, "strikethrough": False, "underline": False, "code": False, "color": "default"})
+        seg.setdefault("plain_text", "")
+        return seg
+
+    def listed(self, block):
+        return dict(block, has_children=bool(self.children[block["id"]]))
+
+    def list(self, block_id, page_size=100, start_cursor=None):
+        start = int(start_cursor or 0)
+        blocks = self.children[block_id]
+        results = [self.listed(block) for block in blocks[start:start + page_size]]
+        more = start + page_size < len(blocks)
+        return {"results": results, "has_more": more, "next_cursor": str(start + page_size) if more else None}
+
+    def append(self, block_id, children, after=None, position=None):
+        siblings = self.children[block_id]
+        if after:
+            index = [block["id"] for block in siblings].index(after) + 1
+        elif position == {"type": "start"}:
+            index = 0
+        else:
+            index = len(siblings)
+        stored = [self.store(block) for block in children]
+        siblings[index:index] = stored
+        return {"results": stored}
+
+    def update(self, block_id, **kwargs):
+        for siblings in self.children.values():
+            for i, block in enumerate(siblings):
+                if block["id"] == block_id:
+                    (block_type, body), = kwargs.items()
+                    siblings[i] = dict(self.store({"type": block_type, block_type: body}), id=block_id)
+                    return siblings[i]
+
+    def delete(self, block_id):
+        for siblings in self.children.values():
+            siblings[:] = [block for block in siblings if block["id"] != block_id]
+        return {}
+
+    def tree(self, parent_id="page-id"):
+        return [(block_fingerprint(block), self.tree(block["id"])) for block in self.children[parent_id]]
+
+
+def expected_tree(blocks):
+    return [(block_fingerprint(block), expected_tree(block_children(block))) for block in blocks]
+
+
+handbook = "\n\n".join(f"## Section {i}\n\nParagraph {i} with **bold** and `code`.\n\n- Point {i}\n - Detail {i}" for i in range(60))
+
+
+class TestSync(unittest.TestCase):
+
+    def sync(self, fake, markdown):
+        with patch("md2notionpage.core.notion", fake.client):
+            changes = sync_notion_page_from_md(markdown, "page-id")
+        self.assertEqual(fake.tree(), expected_tree(parse_md(markdown)))
+        return changes
+
+    def setUp(self):
+        self.fake = FakeNotion()
+        self.sync(self.fake, handbook)
+        self.fake.client.reset_mock()
+
+    def test_parsed_and_listed_blocks_have_same_fingerprint(self):
+        changes = self.sync(self.fake, handbook)
+        self.assertEqual(changes["updated"] + changes["inserted"] + changes["deleted"], 0)
+        self.assertEqual(self.fake.writes(), 0)
+
+    def test_changed_paragraph_is_updated_in_place(self):
+        changes = self.sync(self.fake, handbook.replace("Paragraph 30 ", "Paragraph thirty "))
+        self.assertEqual(changes["updated"], 1)
+        self.assertEqual(self.fake.writes(), 1)
+
+    def test_inserted_and_deleted_blocks(self):
+        markdown = handbook.replace("## Section 10\n", "## Section 10\n\nNew paragraph.\n").replace("Paragraph 20 with **bold** and `code`.\n\n", "")
+        changes = self.sync(self.fake, markdown)
+        self.assertEqual((changes["inserted"], changes["deleted"], changes["updated"]), (1, 1, 0))
+        self.assertEqual(self.fake.writes(), 2)
+
+    def test_insert_at_start(self):
+        changes = self.sync(self.fake, "# Title\n\n" + handbook)
+        self.assertEqual(changes["inserted"], 1)
+
+    def test_nested_change(self):
+        changes = self.sync(self.fake, handbook.replace(" - Detail 5\n", " - Detail five\n  - Deeper\n"))
+        self.assertEqual(changes["updated"], 1)
+        self.assertEqual(changes["inserted"], 1)
+
+    def test_child_pages_are_kept(self):
+        self.fake.children["page-id"].append({"object": "block", "id": "sub-page", "type": "child_page", "child_page": {"title": "Sub"}})
+        self.fake.children["sub-page"] = []
+        with patch("md2notionpage.core.notion", self.fake.client):
+            sync_notion_page_from_md("Only text", "page-id")
+        self.assertEqual([block["type"] for block in self.fake.children["page-id"]], ["paragraph", "child_page"])
+
+
+class TestSyncState(unittest.TestCase):
+
+    markdown = "\n\n".join(f"## Section {i}\n\n- Item {i}\n - Nested {i}\n  - Deeper {i}" for i in range(60))
+
+    def sync(self, server, markdown, state):
+        start = server.request_count
+        with patch("md2notionpage.core.notion", server.client()):
+            changes = sync_notion_page_from_md(markdown, self.page_id, state=state)
+        return changes, server.request_count - start
+
+    def test_unchanged_nested_children_are_not_listed(self):
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                md2notionpage(self.markdown, "Title", "parent-id")
+            self.page_id, = server.pages
+            state = {}
+
+            _, first_requests = self.sync(server, self.markdown, state)
+            changes, requests = self.sync(server, self.markdown, state)
+            _, stateless_requests = self.sync(server, self.markdown, None)
+
+            # The 120 top-level blocks are listed in two requests, and nothing else is read
+            self.assertEqual(requests, 2)
+            self.assertEqual(stateless_requests, first_requests)
+            self.assertGreater(first_requests, 120)
+            self.assertEqual(changes["unchanged"], 240)
+            self.assertEqual(changes["updated"] + changes["inserted"] + changes["deleted"], 0)
+
+    def test_changed_nested_children_are_synced(self):
+        with MockNotionServer() as server:
+            with patch("md2notionpage.core.notion", server.client()):
+                md2notionpage(self.markdown, "Title", "parent-id")
+            self.page_id, = server.pages
+            state = {}
+            self.sync(server, self.markdown, state)
+
+            changes, requests = self.sync(server, self.markdown.replace("  - Deeper 7", "  - Deepest 7"), state)
+
+            self.assertEqual(changes["updated"], 1)
+            # The page, then the changed item and its nested item are listed, and one block is updated
+            self.assertEqual(requests, 2 + 2 + 1)
+            self.assertEqual(self.sync(server, self.markdown.replace("  - Deeper 7", "  - Deepest 7"), state)[1], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()